@@ -1,15 +1,23 @@
 """
 Analytics API Endpoints
 """
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import Optional
 from datetime import datetime, timedelta
+from app.core.config import settings
+from app.data.mock_database import mock_db
+from app.ml.interactions import INTERACTION_WEIGHTS
+from app.services.redis_service import redis_service
 
 router = APIRouter()
 
+# Interaction types the models weight, plus searches (not stored as interactions)
+TRACKED_EVENT_TYPES = set(INTERACTION_WEIGHTS) | {"search"}
+
 
 @router.post("/track")
 async def track_event(
+    request: Request,
     user_id: str,
     event_type: str,
     product_id: Optional[str] = None,
@@ -24,8 +32,41 @@ async def track_event(
     - click: Click on product
     - add_to_cart: Add to shopping cart
     - purchase: Complete purchase
+    - wishlist: Add to wishlist
+    - review: Product review
     - search: Search query
+    
+    Events feed the training data and model fold-ins, so only known
+    users and event types are accepted, and volume is capped per client
+    address as well as per user (user ids are caller-supplied).
     """
+    if event_type not in TRACKED_EVENT_TYPES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown event type; expected one of {sorted(TRACKED_EVENT_TYPES)}"
+        )
+    if not user_id.strip():
+        raise HTTPException(status_code=400, detail="Events need a signed-in user")
+    if mock_db.get_user_by_id(user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    client = request.client.host if request.client else "unknown"
+    if not await redis_service.allow_event(
+        f"track:client:{client}", settings.TRACK_EVENTS_PER_CLIENT_PER_MINUTE
+    ) or not await redis_service.allow_event(
+        f"track:{user_id}", settings.TRACK_EVENTS_PER_MINUTE
+    ):
+        raise HTTPException(status_code=429, detail="Too many events")
+    
+    # Product events feed the recommendation models (fold-in of new users)
+    if product_id and event_type != "search":
+        if mock_db.get_product_by_id(product_id) is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        mock_db.add_interaction(user_id, product_id, event_type)
+    
+    # Recent activity stream; also schedules a refresh of the user's homepage
+    await redis_service.track_user_activity(user_id, event_type, product_id)
+    
     # In production, save to database and send to analytics platform
     return {
         "success": True,
@@ -48,8 +48,14 @@ async def register(user_data: UserCreate):
             "preferred_categories": list(user_data.preferred_categories) if user_data.preferred_categories else []
         }
         
-        # Create user in mock database
-        new_user = mock_db.create_user(user_dict)
+        # Create user in mock database (a concurrent registration may have won)
+        try:
+            new_user = mock_db.create_user(user_dict)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User with this email already exists"
+            )
         
         # Parse created_at safely
         try:
@@ -1,12 +1,13 @@
 """
 Products API Endpoints
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import Optional, List
 from app.schemas.product import ProductResponse, ProductListResponse
 from app.services.redis_service import redis_service
+from app.services.product_serializer import product_serializer, response_json
 from app.data.mock_database import mock_db
-from datetime import datetime
+from app.data.product_repository import product_repository
 
 router = APIRouter()
 
@@ -20,7 +21,9 @@ async def list_products(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     search: Optional[str] = None,
-    language: str = Query("en", description="Language: en or sw")
+    language: str = Query("en", description="Language: en or sw"),
+    sort: str = Query("default", description="Sort: default, newest, price_asc, price_desc, rating"),
+    after: Optional[str] = Query(None, description="Keyset cursor '<sort_key>,<id>' (next_cursor of the previous page); replaces page")
 ):
     """
     List products with filtering and pagination
@@ -30,68 +33,42 @@ async def list_products(
     - Regional filtering (county)
     - Price range filtering
     - Search
+    - Sorting, with page numbers or keyset cursors for deep scrolling
     - Bilingual display (English/Swahili)
     """
     try:
-        offset = (page - 1) * page_size
-        products = mock_db.get_products(
+        offset = 0 if after else (page - 1) * page_size
+        # Page and total count from a single index query; one extra row tells us has_next
+        products, total = mock_db.search_products(
             category=category,
             county=county,
             search=search,
             min_price=min_price,
             max_price=max_price,
-            limit=page_size,
-            offset=offset
+            limit=page_size + 1,
+            offset=offset,
+            sort=sort,
+            after=after
         )
+        has_next = len(products) > page_size
+        products = products[:page_size]
         
-        # Convert to response format
-        product_responses = []
-        for p in products:
-            product_responses.append(ProductResponse(
-                id=p["id"],
-                name=p["name"] if language == "en" else p.get("name_sw", p["name"]),
-                name_sw=p.get("name_sw", p["name"]),
-                description=p["description"] if language == "en" else p.get("description_sw", p["description"]),
-                description_sw=p.get("description_sw", p["description"]),
-                category=p["category"],
-                brand=p.get("vendor_name", ""),
-                tags=p.get("tags", []),
-                price=p["price"],
-                currency=p.get("currency", "KES"),
-                stock_quantity=p.get("stock", 0),
-                discount_percentage=0,
-                in_stock=p.get("stock", 0) > 0,
-                images=p.get("images", []),
-                thumbnail=p.get("images", [""])[0] if p.get("images") else None,
-                average_rating=p.get("rating", 0.0),
-                review_count=p.get("review_count", 0),
-                view_count=0,
-                purchase_count=0,
-                is_featured=False,
-                is_local_vendor=True,
-                created_at=datetime.fromisoformat(p["created_at"].replace("Z", "+00:00"))
-            ))
+        # View counts for the whole page in one round trip
+        view_counts = await redis_service.get_view_counts([p["id"] for p in products])
         
-        # Get total count for pagination
-        all_products = mock_db.get_products(
-            category=category,
-            county=county,
-            search=search,
-            min_price=min_price,
-            max_price=max_price,
-            limit=10000,
-            offset=0
-        )
-        total = len(all_products)
-        
-        return ProductListResponse(
-            products=product_responses,
+        # Cached per-product JSON; only the view counts are spliced in per request
+        body = response_json(
+            product_serializer.products_json(mock_db.get_product_views(products), language, view_counts),
             total=total,
             page=page,
             page_size=page_size,
-            has_next=(offset + page_size) < total,
-            has_prev=page > 1
+            has_next=has_next,
+            has_prev=page > 1 or after is not None,
+            next_cursor=mock_db.product_cursor(products[-1], sort) if has_next else None
         )
+        return Response(content=body, media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -108,37 +85,16 @@ async def get_product(
     """
     try:
         # Track view
-        await redis_service.increment_view_count(product_id)
+        view_count = await redis_service.increment_view_count(product_id)
         
-        # Get product from mock database
-        product = mock_db.get_product_by_id(product_id)
+        products = await product_repository.get_product_views_by_ids([product_id])
         
-        if not product:
+        if not products:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        return ProductResponse(
-            id=product["id"],
-            name=product["name"] if language == "en" else product.get("name_sw", product["name"]),
-            name_sw=product.get("name_sw", product["name"]),
-            description=product["description"] if language == "en" else product.get("description_sw", product["description"]),
-            description_sw=product.get("description_sw", product["description"]),
-            category=product["category"],
-            brand=product.get("vendor_name", ""),
-            tags=product.get("tags", []),
-            price=product["price"],
-            currency=product.get("currency", "KES"),
-            stock_quantity=product.get("stock", 0),
-            discount_percentage=0,
-            in_stock=product.get("stock", 0) > 0,
-            images=product.get("images", []),
-            thumbnail=product.get("images", [""])[0] if product.get("images") else None,
-            average_rating=product.get("rating", 0.0),
-            review_count=product.get("review_count", 0),
-            view_count=0,
-            purchase_count=0,
-            is_featured=False,
-            is_local_vendor=True,
-            created_at=datetime.fromisoformat(product["created_at"].replace("Z", "+00:00"))
+        return Response(
+            content=product_serializer.product_json(products[0], language, view_count),
+            media_type="application/json"
         )
     except HTTPException:
         raise
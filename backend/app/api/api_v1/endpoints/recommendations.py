@@ -1,7 +1,7 @@
 """
 Recommendation API Endpoints
 """
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
 from typing import List, Optional
 from app.schemas.recommendation import (
     RecommendationRequest,
@@ -12,18 +12,44 @@ from app.schemas.recommendation import (
 )
 from app.schemas.product import ProductResponse
 from app.services.recommendation_service import recommendation_service
+from app.services.inference_executor import InferenceOverloaded
 from app.services.redis_service import redis_service
 from app.data.mock_database import mock_db
+from app.data.product_repository import product_repository
+from app.services.product_serializer import product_serializer, response_json
+from app.services.recommendation_cache import (
+    get_cached_personalized,
+    get_cached_similar,
+    get_cached_trending
+)
+from app.services.homepage_service import homepage_materializer
+from app.core.config import settings
 from datetime import datetime
 
 router = APIRouter()
 
+# Cached recommendation lists hold this many items so every limit shares one entry
+MAX_RECOMMENDATIONS = settings.RECOMMENDATION_CANDIDATES
+
+
+async def _hydrate(items: List[dict]) -> List[tuple]:
+    """(recommendation, ProductView) pairs for items whose product exists, in one lookup"""
+    views = await product_repository.get_product_views_by_ids(
+        [item.get("product_id", "") for item in items]
+    )
+    by_id = {v.id: v for v in views}
+    return [
+        (item, by_id[item["product_id"]])
+        for item in items
+        if item.get("product_id") in by_id
+    ]
+
 
 @router.post("/personalized", response_model=RecommendationResponse)
 async def get_personalized_recommendations(
     user_id: str = Query(..., description="User ID"),
-    limit: int = Query(10, ge=1, le=50, description="Number of recommendations"),
-    algorithm: str = Query("hybrid", description="Algorithm: user_based, item_based, hybrid, matrix_factorization")
+    limit: int = Query(10, ge=1, le=MAX_RECOMMENDATIONS, description="Number of recommendations"),
+    algorithm: str = Query("hybrid", description="Algorithm: user_based, item_based, hybrid, matrix_factorization, als")
 ):
     """
     Get personalized product recommendations for a user
@@ -33,6 +59,7 @@ async def get_personalized_recommendations(
     - **item_based**: Recommendations based on similar products
     - **hybrid**: Combines collaborative and content-based filtering (recommended)
     - **matrix_factorization**: SVD-based latent feature model
+    - **als**: Implicit-feedback ALS (interactions as confidence, not ratings)
     """
     try:
         # Get user interactions to understand preferences
@@ -44,61 +71,35 @@ async def get_personalized_recommendations(
         
         # Get recommendations from ML service (fallback to mock if not available)
         try:
-            recommendations = await recommendation_service.get_personalized_recommendations(
-                user_id=user_id,
-                n_recommendations=limit,
-                algorithm=algorithm
-            )
+            recommendations = await get_cached_personalized(user_id, algorithm)
         except:
             recommendations = None
+        if recommendations:
+            recommendations = recommendations[:limit]
         
         # If ML service not available, use simple recommendation based on preferences
         if not recommendations:
             # Filter products by user's preferred categories or get trending
             if preferred_categories:
-                products = mock_db.get_products(category=preferred_categories[0], limit=limit)
+                products = mock_db.get_product_views(
+                    mock_db.get_products(category=preferred_categories[0], limit=limit)
+                )
             else:
-                products = mock_db.get_trending_products(limit=limit)
+                products = mock_db.get_product_views(mock_db.get_trending_products(limit=limit))
         else:
-            # Map recommendation IDs to products
-            product_ids = [r.get('product_id', '') for r in recommendations if isinstance(r, dict)]
-            products = [mock_db.get_product_by_id(pid) for pid in product_ids if pid]
-            products = [p for p in products if p]  # Remove None values
-        
-        # Convert to ProductResponse format
-        product_responses = []
-        for p in products[:limit]:
-            if p:
-                product_responses.append(ProductResponse(
-                    id=p["id"],
-                    name=p["name"],
-                    name_sw=p.get("name_sw", p["name"]),
-                    description=p["description"],
-                    description_sw=p.get("description_sw", p["description"]),
-                    category=p["category"],
-                    brand=p.get("vendor_name", ""),
-                    tags=p.get("tags", []),
-                    price=p["price"],
-                    currency=p.get("currency", "KES"),
-                    stock_quantity=p.get("stock", 0),
-                    discount_percentage=0,
-                    in_stock=p.get("stock", 0) > 0,
-                    images=p.get("images", []),
-                    thumbnail=p.get("images", [""])[0] if p.get("images") else None,
-                    average_rating=p.get("rating", 0.0),
-                    review_count=p.get("review_count", 0),
-                    view_count=0,
-                    purchase_count=0,
-                    is_featured=False,
-                    is_local_vendor=True,
-                    created_at=datetime.fromisoformat(p["created_at"].replace("Z", "+00:00"))
-                ))
+            # Map recommendation IDs to products in one bulk lookup
+            products = [p for _, p in await _hydrate(
+                [r for r in recommendations if isinstance(r, dict)]
+            )]
         
-        return RecommendationResponse(
-            products=product_responses,
+        # Cached ProductResponse JSON, emitted without re-validation
+        body = response_json(
+            product_serializer.products_json(products[:limit]),
             algorithm_used=algorithm if recommendations else "preference_based",
+            confidence_scores=None,
             explanation=f"Personalized recommendations based on your preferences and activity"
         )
+        return Response(content=body, media_type="application/json")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -116,21 +117,15 @@ async def get_similar_products(
     Perfect for "You may also like" sections and product pages
     """
     try:
-        # Check cache
-        cached_similar = await redis_service.get_similar_products(product_id)
-        if cached_similar:
-            return RecommendationResponse(
-                products=[],
-                algorithm_used=algorithm,
-                explanation="Products similar to this item"
-            )
+        similar_products = await get_cached_similar(product_id, algorithm)
         
-        # Get similar products
-        similar_products = await recommendation_service.get_similar_products(
-            product_id=product_id,
-            n_similar=limit,
-            algorithm=algorithm
-        )
+        if similar_products is None and recommendation_service.model_version == 0:
+            # No bundle serving yet: mock results, answered live and never cached
+            similar_products = await recommendation_service.get_similar_products(
+                product_id=product_id,
+                n_similar=limit,
+                algorithm=algorithm
+            )
         
         if not similar_products:
             raise HTTPException(
@@ -138,16 +133,21 @@ async def get_similar_products(
                 detail="No similar products found"
             )
         
-        # Cache results
-        await redis_service.cache_similar_products(product_id, similar_products)
+        similar_products = similar_products[:limit]
+        hydrated = await _hydrate(similar_products)
         
-        return RecommendationResponse(
-            products=[],
-            algorithm_used=algorithm,
-            confidence_scores=[p['similarity'] for p in similar_products],
+        body = response_json(
+            product_serializer.products_json([p for _, p in hydrated]),
+            algorithm_used=similar_products[0].get("algorithm", algorithm),
+            confidence_scores=[item['similarity'] for item, _ in hydrated],
             explanation="Products similar to the one you're viewing"
         )
+        return Response(content=body, media_type="application/json")
     
+    except HTTPException:
+        raise
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -155,7 +155,7 @@ async def get_similar_products(
 @router.get("/trending", response_model=RecommendationResponse)
 async def get_trending_products(
     county: Optional[str] = Query(None, description="Filter by county"),
-    limit: int = Query(10, ge=1, le=50)
+    limit: int = Query(10, ge=1, le=MAX_RECOMMENDATIONS)
 ):
     """
     Get trending products based on recent user activity
@@ -163,44 +163,19 @@ async def get_trending_products(
     Supports regional filtering (county-based)
     """
     try:
-        # Get trending products from mock database
-        products = mock_db.get_trending_products(county=county, limit=limit)
-        
-        # Convert to ProductResponse format
-        product_responses = []
-        for p in products:
-            product_responses.append(ProductResponse(
-                id=p["id"],
-                name=p["name"],
-                name_sw=p.get("name_sw", p["name"]),
-                description=p["description"],
-                description_sw=p.get("description_sw", p["description"]),
-                category=p["category"],
-                brand=p.get("vendor_name", ""),
-                tags=p.get("tags", []),
-                price=p["price"],
-                currency=p.get("currency", "KES"),
-                stock_quantity=p.get("stock", 0),
-                discount_percentage=0,
-                in_stock=p.get("stock", 0) > 0,
-                images=p.get("images", []),
-                thumbnail=p.get("images", [""])[0] if p.get("images") else None,
-                average_rating=p.get("rating", 0.0),
-                review_count=p.get("review_count", 0),
-                view_count=0,
-                purchase_count=0,
-                is_featured=False,
-                is_local_vendor=True,
-                created_at=datetime.fromisoformat(p["created_at"].replace("Z", "+00:00"))
-            ))
+        # Only ids are cached; products are hydrated from the store
+        trending = await get_cached_trending(county)
+        products = [p for _, p in await _hydrate(trending[:limit])]
         
         county_text = f" in {county}" if county else " nationwide"
         
-        return RecommendationResponse(
-            products=product_responses,
+        body = response_json(
+            product_serializer.products_json(products),
             algorithm_used="trending",
+            confidence_scores=None,
             explanation=f"Most popular products{county_text} based on ratings and reviews"
         )
+        return Response(content=body, media_type="application/json")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -227,6 +202,8 @@ async def get_frequently_bought_together(
             "explanation": "Products frequently bought together"
         }
     
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -269,6 +246,8 @@ async def get_context_aware_recommendations(
             explanation="Recommendations tailored to your current context"
         )
     
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -311,40 +290,20 @@ async def get_personalized_homepage(
     """
     Get a complete personalized homepage feed
     
+    Served from the feed materialized after the last retrain or the
+    user's latest activity. Without one, sections are built live and
+    concurrently under a per-section deadline; a section that misses it
+    comes back empty and is listed in "degraded".
+    
     Includes:
-    - Personalized recommendations
-    - Trending in your area
-    - Recently viewed
-    - Seasonal picks
+    - Personalized recommendations (for_you)
+    - Context-aware picks (smart_picks)
+    - Trending in your area (trending_nearby)
+    
+    Products appear in at most one section.
     """
     try:
-        # Get multiple recommendation types
-        personalized = await recommendation_service.get_personalized_recommendations(
-            user_id, n_recommendations=10, algorithm="hybrid"
-        )
-        
-        trending = await recommendation_service.get_trending_products(
-            interactions=[],
-            time_window="24h",
-            county=county,
-            n_items=10
-        )
-        
-        # Context-aware
-        context = {"county": county, "time_of_day": "afternoon"}
-        context_aware = await recommendation_service.get_context_aware_recommendations(
-            user_id, context, n_recommendations=10
-        )
-        
-        return {
-            "sections": {
-                "for_you": personalized,
-                "trending_nearby": trending,
-                "smart_picks": context_aware,
-                "local_vendors": []  # Would filter for local vendors
-            }
-        }
+        return await homepage_materializer.get_feed(user_id, county=county)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
@@ -34,11 +34,18 @@ class Settings(BaseSettings):
     # Database
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DB_NAME: str = "ecommerce_kenya"
+    PRODUCT_CACHE_TTL: int = 30  # Seconds products fetched from MongoDB stay cached in process
+    PRODUCT_CACHE_SIZE: int = 10000
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     REDIS_PASSWORD: Optional[str] = None
     REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 1.0  # Seconds, for connect and commands
+    REDIS_HEALTH_CHECK_INTERVAL: int = 15  # Seconds between background PINGs
+    LOCAL_CACHE_ENABLED: bool = True  # In-process L1 cache in front of Redis
+    LOCAL_CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -57,9 +64,34 @@ class Settings(BaseSettings):
     MIN_RECOMMENDATIONS: int = 5
     MAX_RECOMMENDATIONS: int = 20
     MODEL_RETRAIN_INTERVAL: int = 86400  # 24 hours in seconds
+    MODEL_RETRAIN_CHECK_INTERVAL: int = 60  # Seconds between staleness checks
+    MODEL_TRAINING_EXECUTOR: str = "process"  # process or thread
+    MODEL_ARTIFACTS_DIR: str = "models"  # Published bundles, memory-mapped by every API worker
+    FOLD_IN_MAX_USERS: int = 100000  # Users folded in per engine between retrains (oldest dropped)
+    TRACK_EVENTS_PER_MINUTE: int = 120  # Tracked events accepted per user per minute
+    TRACK_EVENTS_PER_CLIENT_PER_MINUTE: int = 600  # ... and per client address
+    MAX_STORED_INTERACTIONS: int = 1000000  # In-memory interactions kept for training (oldest dropped)
+    MAX_USER_INTERACTIONS: int = 1000  # Latest interactions kept per user for fold-ins
+    INFERENCE_WORKERS: int = 4  # Threads serving model inference per API worker
+    INFERENCE_MAX_QUEUE: int = 64  # Inference calls allowed to wait before requests are shed
     MIN_RATINGS_FOR_RECOMMENDATION: int = 3
     KNN_NEIGHBORS: int = 20
     SVD_FACTORS: int = 50
+    ALS_FACTORS: int = 64
+    ALS_REGULARIZATION: float = 0.01
+    ALS_ALPHA: float = 10.0  # Confidence = 1 + alpha * interaction weight
+    ALS_ITERATIONS: int = 15
+    ALS_WARM_START_ITERATIONS: int = 5
+    ALS_CG_STEPS: int = 3
+    ALS_THREADS: int = 0  # 0 = all cores
+    SIMILAR_ITEMS_INDEX: str = "ivf"  # exact or ivf
+    IVF_MIN_ITEMS: int = 5000  # Smaller catalogs always use exact search
+    IVF_N_LISTS: int = 0  # 0 = sqrt(number of items)
+    # Lists scanned per live query: higher = better recall, slower search
+    # (~0.5 recall@10 at 8). Only lookups deeper than NEIGHBOR_TABLE_K use
+    # IVF; the neighbour tables are always built with exact search.
+    IVF_N_PROBE: int = 8
+    NEIGHBOR_TABLE_K: int = 50  # Similar items precomputed per product
     
     # Feature Flags
     ENABLE_KAFKA: bool = False
@@ -70,6 +102,30 @@ class Settings(BaseSettings):
     # Cache Configuration
     CACHE_TTL: int = 3600  # 1 hour
     TRENDING_ITEMS_CACHE_TTL: int = 300  # 5 minutes
+    SIMILAR_PRODUCTS_CACHE_TTL: int = 7200  # 2 hours; keyed by model version
+    CACHE_STALE_TTL: int = 300  # Seconds an expired entry is still served while it refreshes
+    CACHE_XFETCH_BETA: float = 1.0  # >1 refreshes earlier, 0 disables early expiration
+    CACHE_LOCK_TIMEOUT: int = 10  # Seconds a worker may hold a recompute lock
+    CACHE_LOCK_WAIT: float = 0.25  # Seconds a request waits on another worker's recompute before computing itself
+    CACHE_COMPRESSION_THRESHOLD: int = 1024  # Bytes; larger cached payloads are zlib-compressed
+    RECOMMENDATION_CANDIDATES: int = 50  # Items cached per recommendation list; any limit is a slice
+    
+    # Homepage
+    HOMEPAGE_SECTION_SIZE: int = 10
+    HOMEPAGE_SECTION_TIMEOUT: float = 0.3  # Seconds before a section is dropped from the feed
+    HOMEPAGE_MATERIALIZED_TTL: int = 21600  # 6 hours; feeds from an older model version are never served
+    HOMEPAGE_MATERIALIZE_TIMEOUT: float = 5.0  # Section deadline for the batch job
+    HOMEPAGE_MATERIALIZE_CONCURRENCY: int = 8  # Feeds built at once by the batch job
+    HOMEPAGE_ACTIVE_USER_WINDOW: int = 604800  # 7 days of activity makes a user active
+    HOMEPAGE_REFRESH_DELAY: float = 2.0  # Seconds to batch a user's activity before a refresh
+    
+    # Search Suggestions
+    SEARCH_SUGGESTIONS_MAX_QUERIES: int = 50000  # Tracked queries per language
+    SEARCH_SUGGESTIONS_PER_PREFIX: int = 10  # Completions kept per prefix
+    SEARCH_SUGGESTIONS_PREFIX_LENGTH: int = 20  # Longest prefix indexed directly
+    SEARCH_SUGGESTIONS_INDEX_QUERIES: int = 10000  # Top queries in the in-process index
+    SEARCH_SUGGESTIONS_REFRESH_INTERVAL: int = 60  # Seconds between index rebuilds
+    SEARCH_SUGGESTIONS_TTL: int = 2592000  # 30 days for idle prefix buckets
     
     # Kenya Counties (47 counties)
     KENYA_COUNTIES: List[str] = [
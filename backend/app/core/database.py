@@ -13,7 +13,7 @@ except ImportError:
     print("[WARNING] Motor/MongoDB not available - using mock data")
 
 try:
-    import redis
+    import redis.asyncio
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
@@ -54,16 +54,11 @@ class DatabaseManager:
             print("[WARNING] Redis connection skipped - redis not installed")
             return
             
-        try:
-            self.redis_client = redis.from_url(
-                settings.REDIS_URL,
-                decode_responses=True
-            )
-            self.redis_client.ping()
-            print("[SUCCESS] Redis connected successfully")
-        except Exception as e:
-            print(f"[WARNING] Redis connection failed: {e}")
-            print("   App will run without caching")
+        # Share the caching service's connection pool instead of a second client
+        from app.services.redis_service import redis_service
+        if await redis_service.connect():
+            self.redis_client = redis_service.redis_client
+        else:
             self.redis_client = None
     
     async def close_mongodb(self):
@@ -74,8 +69,10 @@ class DatabaseManager:
     
     async def close_redis(self):
         """Close Redis connection"""
+        from app.services.redis_service import redis_service
+        await redis_service.close()
         if self.redis_client:
-            self.redis_client.close()
+            self.redis_client = None
             print("[INFO] Redis disconnected")
 
 
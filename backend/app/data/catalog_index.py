@@ -0,0 +1,251 @@
+"""
+Catalog Index
+Inverted index and columnar filters over the product catalog
+"""
+import bisect
+import re
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Product fields searched, in both languages
+SEARCH_FIELDS = ("name", "name_sw", "description", "description_sw")
+
+# Sort order -> (numeric sort key of a product, descending). Ties are broken
+# by product id, so (sort key, id) identifies a position in every order.
+SORT_ORDERS = {
+    "default": (None, False),  # Catalog order; the key is the catalog position
+    "newest": (lambda p: _timestamp(p.get("created_at")), True),
+    "price_asc": (lambda p: float(p["price"]), False),
+    "price_desc": (lambda p: float(p["price"]), True),
+    "rating": (lambda p: float(p.get("rating", 0.0)), True)
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _timestamp(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens (Unicode-aware, so Swahili text works unchanged)"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class CatalogIndex:
+    """
+    Read-only query index over a list of products
+
+    Every filter resolves to a sorted array of catalog positions:
+    category and county through posting lists, search through a token
+    inverted index, and price through a numpy column. Intersecting them
+    gives the full match set, so one query returns both the requested
+    page and the total match count.
+    
+    Results come back in one of SORT_ORDERS. Each order is precomputed as
+    a rank per product, so a page is the `limit` lowest ranks among the
+    matches (argpartition, not a full sort). Besides offsets, pages can
+    be requested with a keyset cursor "<sort key>,<id>" naming the last
+    product already seen, which costs the same at any depth.
+
+    Search matches each query token anywhere inside a product token (all
+    query tokens must match), so "phone" still finds "smartphone". Only
+    the vocabulary is scanned, never the products.
+    """
+
+    def __init__(self, products: List[Dict]):
+        """
+        Args:
+            products: Catalog in display order (dicts are referenced, not copied)
+        """
+        self.products = products
+        self.prices = np.array([p["price"] for p in products], dtype=np.float64)
+        self.categories = self._postings(p.get("category") for p in products)
+        self.counties = self._postings(p.get("county") for p in products)
+
+        token_postings: Dict[str, List[int]] = {}
+        for position, product in enumerate(products):
+            tokens = set()
+            for field in SEARCH_FIELDS:
+                tokens.update(tokenize(product.get(field) or ""))
+            for tag in product.get("tags", []):
+                tokens.update(tokenize(tag))
+            for token in tokens:
+                token_postings.setdefault(token, []).append(position)
+
+        self.vocabulary = sorted(token_postings)
+        self.token_postings = [
+            np.array(token_postings[token], dtype=np.int64) for token in self.vocabulary
+        ]
+        self.positions = {p["id"]: position for position, p in enumerate(products)}
+        self._sort_keys: Dict[str, np.ndarray] = {}
+        self._sorted: Dict[str, List[Tuple[float, str]]] = {}
+        self._ranks: Dict[str, np.ndarray] = {}
+        for sort, (key, descending) in SORT_ORDERS.items():
+            keys = np.array(
+                [key(p) if key else position for position, p in enumerate(products)],
+                dtype=np.float64
+            )
+            # Ordering tuples negate descending keys so every order sorts ascending
+            entries = sorted(
+                ((-k if descending else k, p["id"]), position)
+                for position, (k, p) in enumerate(zip(keys.tolist(), products))
+            )
+            ranks = np.empty(len(products), dtype=np.int64)
+            ranks[[position for _, position in entries]] = np.arange(len(products))
+            self._sort_keys[sort] = keys
+            self._sorted[sort] = [entry for entry, _ in entries]
+            self._ranks[sort] = ranks
+        
+        # Newline-joined vocabulary: substring search runs as str.find in C,
+        # and a match offset maps back to its token through _token_starts
+        self._vocabulary_text = "\n".join(self.vocabulary)
+        self._token_starts = []
+        offset = 0
+        for token in self.vocabulary:
+            self._token_starts.append(offset)
+            offset += len(token) + 1
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    @staticmethod
+    def _postings(values) -> Dict[str, np.ndarray]:
+        postings: Dict[str, List[int]] = {}
+        for position, value in enumerate(values):
+            if value is not None:
+                postings.setdefault(value, []).append(position)
+        return {value: np.array(p, dtype=np.int64) for value, p in postings.items()}
+
+    def _substring_postings(self, fragment: str) -> np.ndarray:
+        """Positions of products with a token containing fragment"""
+        matches = []
+        position = self._vocabulary_text.find(fragment)
+        while position != -1:
+            token = bisect.bisect_right(self._token_starts, position) - 1
+            matches.append(self.token_postings[token])
+            if token + 1 == len(self._token_starts):
+                break
+            # Skip to the next token so each token is counted once
+            position = self._vocabulary_text.find(fragment, self._token_starts[token + 1])
+
+        if not matches:
+            return _EMPTY
+        if len(matches) == 1:
+            return matches[0]
+        return np.unique(np.concatenate(matches))
+
+    def match(
+        self,
+        category: Optional[str] = None,
+        county: Optional[str] = None,
+        search: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Sorted catalog positions of products passing every given filter
+
+        Args:
+            category: Exact category
+            county: Exact county
+            search: Free text; every token must occur in some product token
+            min_price: Inclusive lower price bound
+            max_price: Inclusive upper price bound
+
+        Returns:
+            int64 array of positions
+        """
+        postings = []
+        if category:
+            postings.append(self.categories.get(category, _EMPTY))
+        if county:
+            postings.append(self.counties.get(county, _EMPTY))
+        if search:
+            postings.extend(self._substring_postings(token) for token in tokenize(search))
+
+        if postings:
+            # Intersect the shortest lists first
+            postings.sort(key=len)
+            positions = postings[0]
+            for posting in postings[1:]:
+                if len(positions) == 0:
+                    break
+                positions = np.intersect1d(positions, posting, assume_unique=True)
+        else:
+            positions = np.arange(len(self.products), dtype=np.int64)
+
+        if min_price is not None or max_price is not None:
+            prices = self.prices[positions]
+            keep = np.ones(len(positions), dtype=bool)
+            if min_price is not None:
+                keep &= prices >= min_price
+            if max_price is not None:
+                keep &= prices <= max_price
+            positions = positions[keep]
+        return positions
+
+    def cursor(self, product: Dict, sort: str = "default") -> str:
+        """Keyset cursor "<sort key>,<id>" resuming after product"""
+        position = self.positions[product["id"]]
+        key = self._sort_keys[sort][position]
+        key = int(key) if sort == "default" else float(key)
+        return f"{key},{product['id']}"
+
+    def _cursor_rank(self, sort: str, after: str) -> int:
+        """First rank that comes after the cursor (the product need not still exist)"""
+        try:
+            key, product_id = after.split(",", 1)
+            key = float(key)
+        except ValueError:
+            raise ValueError(f"Invalid cursor {after!r}, expected '<sort_key>,<id>'")
+        if SORT_ORDERS[sort][1]:
+            key = -key
+        return bisect.bisect_right(self._sorted[sort], (key, product_id))
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        county: Optional[str] = None,
+        search: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 20,
+        offset: int = 0,
+        sort: str = "default",
+        after: Optional[str] = None
+    ) -> Tuple[List[Dict], int]:
+        """
+        One page of matching products plus the total number of matches
+
+        Args:
+            limit: Page size
+            offset: Matches to skip (ignored by callers using after)
+            sort: One of SORT_ORDERS
+            after: Keyset cursor from cursor(); only matches after it are paged
+
+        Returns:
+            (products on the page, total matches ignoring offset/after)
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort {sort!r}, expected one of {sorted(SORT_ORDERS)}")
+
+        positions = self.match(category, county, search, min_price, max_price)
+        total = len(positions)
+
+        ranks = self._ranks[sort][positions]
+        if after:
+            keep = ranks >= self._cursor_rank(sort, after)
+            positions, ranks = positions[keep], ranks[keep]
+
+        end = offset + limit
+        if end < len(ranks):
+            # Only the first `end` ranks are needed, in order
+            selected = np.argpartition(ranks, end - 1)[:end]
+            positions, ranks = positions[selected], ranks[selected]
+        page = positions[np.argsort(ranks)][offset:end]
+        return [self.products[i] for i in page.tolist()], total
@@ -2,9 +2,17 @@
 Mock Database with Real Product Data
 Provides realistic data for development and deployment without external dependencies
 """
-from typing import List, Dict, Optional
+from typing import Callable, Deque, List, Dict, Optional, Tuple
+from collections import deque
 from datetime import datetime
+import itertools
 import random
+import threading
+
+from app.core.config import settings
+from app.data.catalog_index import CatalogIndex
+from app.data.product_view import ProductView
+from app.services.product_serializer import product_serializer
 
 # Mock Users Database
 MOCK_USERS = [
@@ -448,47 +456,196 @@ MOCK_INTERACTIONS = [
 
 
 class MockDatabase:
-    """Mock database class to simulate database operations"""
+    """
+    Indexed in-memory store standing in for MongoDB
+    
+    Seeded from the MOCK_* data above (copied, so the seed lists never
+    change). Users and products are hash-indexed by id and users by email,
+    interactions are indexed per user, and ids come from counters, so
+    every lookup is O(1) whatever the data size. Writes hold a lock and
+    are safe from multiple threads; reads take no lock.
+    """
+    
+    def __init__(
+        self,
+        users: Optional[List[Dict]] = None,
+        products: Optional[List[Dict]] = None,
+        vendors: Optional[List[Dict]] = None,
+        interactions: Optional[List[Dict]] = None,
+        max_interactions: Optional[int] = None,
+        max_user_interactions: Optional[int] = None
+    ):
+        """
+        Args:
+            users: Seed users (defaults to MOCK_USERS)
+            products: Seed products in catalog order (defaults to MOCK_PRODUCTS)
+            vendors: Seed vendors (defaults to MOCK_VENDORS)
+            interactions: Seed interactions (defaults to MOCK_INTERACTIONS)
+            max_interactions: Interactions kept in total, oldest dropped
+                (defaults to MAX_STORED_INTERACTIONS)
+            max_user_interactions: Interactions kept per user, oldest
+                dropped (defaults to MAX_USER_INTERACTIONS)
+        """
+        self._lock = threading.RLock()
+        
+        self._users: Dict[str, Dict] = {}
+        self._users_by_email: Dict[str, str] = {}
+        self._products: Dict[str, Dict] = {}
+        # Catalog order, shared with the catalog index
+        self._product_list: List[Dict] = []
+        # Display-ready view of each product, rebuilt when it is replaced
+        self._views: Dict[str, ProductView] = {}
+        self._vendors = [dict(v) for v in (MOCK_VENDORS if vendors is None else vendors)]
+        # Tracked events arrive without limit, so interactions are bounded
+        self._interactions: Deque[Dict] = deque(
+            maxlen=max_interactions or settings.MAX_STORED_INTERACTIONS
+        )
+        self._interactions_by_user: Dict[str, Deque[Dict]] = {}
+        self._max_user_interactions = max_user_interactions or settings.MAX_USER_INTERACTIONS
+        self._orders: List[Dict] = [dict(o) for o in MOCK_ORDERS]
+        # Callbacks run with each interaction added through add_interaction()
+        self._interaction_listeners: List[Callable[[Dict], None]] = []
+        
+        # Catalog query index and trending order, rebuilt after product writes
+        self._catalog_index: Optional[CatalogIndex] = None
+        self._trending: Optional[List[Dict]] = None
+        
+        for user in (MOCK_USERS if users is None else users):
+            self._index_user(dict(user))
+        for product in (MOCK_PRODUCTS if products is None else products):
+            self._index_product(dict(product))
+        for interaction in (MOCK_INTERACTIONS if interactions is None else interactions):
+            self._index_interaction(dict(interaction))
+        
+        # Continue numbering after the highest seeded id
+        self._user_ids = itertools.count(self._next_number(self._users, "user_"))
+        self._order_ids = itertools.count(len(self._orders) + 1)
     
     @staticmethod
-    def get_user_by_email(email: str) -> Optional[Dict]:
+    def _next_number(records: Dict[str, Dict], prefix: str) -> int:
+        numbers = [
+            int(record_id[len(prefix):])
+            for record_id in records
+            if record_id.startswith(prefix) and record_id[len(prefix):].isdigit()
+        ]
+        return max(numbers, default=0) + 1
+    
+    def _index_user(self, user: Dict):
+        self._users[user["id"]] = user
+        self._users_by_email[user["email"]] = user["id"]
+    
+    def _index_product(self, product: Dict):
+        if product["id"] in self._products:
+            # Replace in place so catalog order is kept
+            position = self._product_list.index(self._products[product["id"]])
+            self._product_list[position] = product
+            # The old view's cached JSON would only be dropped on its next read
+            product_serializer.invalidate(product["id"])
+        else:
+            self._product_list.append(product)
+        self._products[product["id"]] = product
+        self._views[product["id"]] = ProductView(product)
+        self._catalog_index = None
+        self._trending = None
+    
+    def _index_interaction(self, interaction: Dict):
+        self._interactions.append(interaction)
+        user_interactions = self._interactions_by_user.get(interaction["user_id"])
+        if user_interactions is None:
+            user_interactions = deque(maxlen=self._max_user_interactions)
+            self._interactions_by_user[interaction["user_id"]] = user_interactions
+        user_interactions.append(interaction)
+    
+    def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Find user by email"""
-        for user in MOCK_USERS:
-            if user["email"] == email:
-                return user.copy()
-        return None
+        user = self._users.get(self._users_by_email.get(email))
+        return user.copy() if user else None
     
-    @staticmethod
-    def get_user_by_id(user_id: str) -> Optional[Dict]:
+    def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """Find user by ID"""
-        for user in MOCK_USERS:
-            if user["id"] == user_id:
-                return user.copy()
-        return None
+        user = self._users.get(user_id)
+        return user.copy() if user else None
     
-    @staticmethod
-    def create_user(user_data: Dict) -> Dict:
-        """Create a new user"""
-        new_user = {
-            "id": f"user_{len(MOCK_USERS) + 1:03d}",
-            "email": user_data["email"],
-            "username": user_data["username"],
-            "full_name": user_data.get("full_name", ""),
-            "password_hash": user_data["password_hash"],
-            "phone_number": user_data.get("phone_number", ""),
-            "county": user_data.get("county", "Nairobi"),
-            "city": user_data.get("city", ""),
-            "preferred_language": user_data.get("preferred_language", "en"),
-            "preferred_categories": user_data.get("preferred_categories", []),
-            "is_active": True,
-            "is_verified": False,
-            "created_at": datetime.utcnow().isoformat() + "Z"
-        }
-        MOCK_USERS.append(new_user)
+    def create_user(self, user_data: Dict) -> Dict:
+        """
+        Create a new user
+        
+        Raises:
+            ValueError: If the email is already registered
+        """
+        with self._lock:
+            if user_data["email"] in self._users_by_email:
+                raise ValueError("Email already registered")
+            new_user = {
+                "id": f"user_{next(self._user_ids):03d}",
+                "email": user_data["email"],
+                "username": user_data["username"],
+                "full_name": user_data.get("full_name", ""),
+                "password_hash": user_data["password_hash"],
+                "phone_number": user_data.get("phone_number", ""),
+                "county": user_data.get("county", "Nairobi"),
+                "city": user_data.get("city", ""),
+                "preferred_language": user_data.get("preferred_language", "en"),
+                "preferred_categories": user_data.get("preferred_categories", []),
+                "is_active": True,
+                "is_verified": False,
+                "created_at": datetime.utcnow().isoformat() + "Z"
+            }
+            self._index_user(new_user)
         return new_user.copy()
     
-    @staticmethod
+    def add_product(self, product: Dict) -> Dict:
+        """Insert or replace a product (by id)"""
+        with self._lock:
+            self._index_product(dict(product))
+        return product.copy()
+    
+    def catalog_index(self) -> CatalogIndex:
+        """Query index over the product catalog"""
+        index = self._catalog_index
+        if index is None:
+            with self._lock:
+                if self._catalog_index is None:
+                    self._catalog_index = CatalogIndex(list(self._product_list))
+                index = self._catalog_index
+        return index
+    
+    def search_products(
+        self,
+        category: Optional[str] = None,
+        county: Optional[str] = None,
+        search: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 20,
+        offset: int = 0,
+        sort: str = "default",
+        after: Optional[str] = None
+    ) -> Tuple[List[Dict], int]:
+        """
+        Get one page of filtered products and the total number of matches
+        
+        Pass `after` (a cursor from product_cursor()) instead of an offset
+        for keyset pagination.
+        """
+        return self.catalog_index().query(
+            category=category,
+            county=county,
+            search=search,
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit,
+            offset=offset,
+            sort=sort,
+            after=after
+        )
+    
+    def product_cursor(self, product: Dict, sort: str = "default") -> str:
+        """Keyset cursor for the page that starts after product"""
+        return self.catalog_index().cursor(product, sort)
+    
     def get_products(
+        self,
         category: Optional[str] = None,
         county: Optional[str] = None,
         search: Optional[str] = None,
@@ -498,91 +655,108 @@ class MockDatabase:
         offset: int = 0
     ) -> List[Dict]:
         """Get products with filters"""
-        products = MOCK_PRODUCTS.copy()
-        
-        # Apply filters
-        if category:
-            products = [p for p in products if p["category"] == category]
-        
-        if county:
-            products = [p for p in products if p["county"] == county]
-        
-        if search:
-            search_lower = search.lower()
-            products = [
-                p for p in products
-                if search_lower in p["name"].lower() or 
-                   search_lower in p["description"].lower() or
-                   any(search_lower in tag.lower() for tag in p.get("tags", []))
-            ]
-        
-        if min_price:
-            products = [p for p in products if p["price"] >= min_price]
-        
-        if max_price:
-            products = [p for p in products if p["price"] <= max_price]
-        
-        # Apply pagination
-        return products[offset:offset + limit]
+        products, _ = self.search_products(
+            category, county, search, min_price, max_price, limit, offset
+        )
+        return products
     
-    @staticmethod
-    def get_product_by_id(product_id: str) -> Optional[Dict]:
+    def get_product_by_id(self, product_id: str) -> Optional[Dict]:
         """Get product by ID"""
-        for product in MOCK_PRODUCTS:
-            if product["id"] == product_id:
-                return product.copy()
-        return None
+        product = self._products.get(product_id)
+        return product.copy() if product else None
     
-    @staticmethod
-    def get_trending_products(county: Optional[str] = None, limit: int = 10) -> List[Dict]:
+    def get_products_by_ids(self, product_ids: List[str]) -> List[Dict]:
+        """
+        Get many products in one call, in the order of product_ids
+        
+        Unknown ids are skipped. The stored dicts are returned without
+        copying, so callers must not modify them.
+        """
+        products = self._products
+        return [products[pid] for pid in product_ids if pid in products]
+    
+    def get_product_views(self, products: List[Dict]) -> List[ProductView]:
+        """Views for products returned by this store"""
+        views = self._views
+        return [views[p["id"]] for p in products if p["id"] in views]
+    
+    def get_product_views_by_ids(self, product_ids: List[str]) -> List[ProductView]:
+        """Views in the order of product_ids, skipping unknown ids"""
+        views = self._views
+        return [views[pid] for pid in product_ids if pid in views]
+    
+    def get_all_products(self) -> List[Dict]:
+        """Get every product (model training input)"""
+        return [p.copy() for p in list(self._product_list)]
+    
+    def get_trending_products(self, county: Optional[str] = None, limit: int = 10) -> List[Dict]:
         """Get trending products (sorted by rating and review count)"""
-        products = MOCK_PRODUCTS.copy()
+        trending = self._trending
+        if trending is None:
+            # Sort by rating * review_count (engagement metric), once per catalog change
+            trending = sorted(
+                list(self._product_list),
+                key=lambda p: p["rating"] * p["review_count"],
+                reverse=True
+            )
+            self._trending = trending
         
         if county:
-            products = [p for p in products if p["county"] == county]
-        
-        # Sort by rating * review_count (engagement metric)
-        products.sort(key=lambda p: p["rating"] * p["review_count"], reverse=True)
-        
-        return products[:limit]
+            return [p for p in trending if p["county"] == county][:limit]
+        return trending[:limit]
     
-    @staticmethod
-    def get_vendors(county: Optional[str] = None) -> List[Dict]:
+    def get_vendors(self, county: Optional[str] = None) -> List[Dict]:
         """Get vendors"""
-        vendors = MOCK_VENDORS.copy()
+        vendors = self._vendors.copy()
         
         if county:
             vendors = [v for v in vendors if v["county"] == county]
         
         return vendors
     
-    @staticmethod
-    def get_user_interactions(user_id: str) -> List[Dict]:
+    def get_user_interactions(self, user_id: str) -> List[Dict]:
         """Get user interactions for recommendations"""
-        return [i for i in MOCK_INTERACTIONS if i["user_id"] == user_id]
+        # Deques cannot be copied while another thread appends
+        with self._lock:
+            return list(self._interactions_by_user.get(user_id, []))
     
-    @staticmethod
-    def add_interaction(user_id: str, product_id: str, interaction_type: str):
-        """Add a new interaction"""
-        MOCK_INTERACTIONS.append({
+    def get_all_interactions(self) -> List[Dict]:
+        """Get every stored interaction (model training input)"""
+        with self._lock:
+            return list(self._interactions)
+    
+    def add_interaction(self, user_id: str, product_id: str, interaction_type: str):
+        """Add a new interaction and notify interaction listeners"""
+        interaction = {
             "user_id": user_id,
             "product_id": product_id,
             "interaction_type": interaction_type,
             "timestamp": datetime.utcnow().isoformat() + "Z"
-        })
+        }
+        with self._lock:
+            self._index_interaction(interaction)
+        
+        for listener in self._interaction_listeners:
+            try:
+                listener(interaction)
+            except Exception as e:
+                print(f"[WARNING] Interaction listener failed: {e}")
     
-    @staticmethod
-    def create_order(order_data: Dict) -> Dict:
+    def add_interaction_listener(self, listener: Callable[[Dict], None]):
+        """Register a callback for new interactions (e.g. model fold-in)"""
+        self._interaction_listeners.append(listener)
+    
+    def create_order(self, order_data: Dict) -> Dict:
         """Create a new order"""
-        order = {
-            "id": f"ORD-{datetime.utcnow().strftime('%Y%m%d')}-{len(MOCK_ORDERS) + 1:03d}",
-            **order_data,
-            "status": "pending",
-            "created_at": datetime.utcnow().isoformat() + "Z"
-        }
-        MOCK_ORDERS.append(order)
+        with self._lock:
+            order = {
+                "id": f"ORD-{datetime.utcnow().strftime('%Y%m%d')}-{next(self._order_ids):03d}",
+                **order_data,
+                "status": "pending",
+                "created_at": datetime.utcnow().isoformat() + "Z"
+            }
+            self._orders.append(order)
         return order.copy()
 
 # Global instance
 mock_db = MockDatabase()
-
@@ -0,0 +1,87 @@
+"""
+Product Repository
+Bulk product lookups from MongoDB when connected, otherwise the mock database
+"""
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import db_manager
+from app.data.mock_database import mock_db
+from app.data.product_view import ProductView
+from app.services.local_cache import MISS, NamespaceCache
+
+
+class ProductRepository:
+    """
+    Hydrates product ids into product documents
+    
+    With MongoDB connected, ids missing from a short-lived in-process
+    cache are fetched with a single $in query; otherwise the mock
+    database's id index is used. Each product's ProductView is built once
+    when it is fetched. Returned dicts are shared and must not be modified.
+    """
+    
+    def __init__(self):
+        self._cache = NamespaceCache(settings.PRODUCT_CACHE_SIZE, settings.PRODUCT_CACHE_TTL)
+    
+    async def _fetch(self, product_ids: List[str]) -> Optional[Dict[str, Tuple[Dict, ProductView]]]:
+        """
+        id -> (product, view) from MongoDB through the cache
+        
+        Returns:
+            Found entries, or None when MongoDB is not connected or failed
+        """
+        database = db_manager.mongodb_db
+        if database is None:
+            return None
+        
+        found: Dict[str, Tuple[Dict, ProductView]] = {}
+        missing = []
+        for pid in dict.fromkeys(product_ids):
+            entry = self._cache.get(pid)
+            if entry is MISS:
+                missing.append(pid)
+            else:
+                found[pid] = entry
+        
+        if missing:
+            try:
+                cursor = database.products.find({"id": {"$in": missing}}, {"_id": 0})
+                async for product in cursor:
+                    entry = (product, ProductView(product))
+                    found[product["id"]] = entry
+                    self._cache.set(product["id"], entry)
+            except Exception as e:
+                print(f"[WARNING] Product lookup failed, using mock data: {e}")
+                return None
+        return found
+    
+    async def get_products_by_ids(self, product_ids: List[str]) -> List[Dict]:
+        """
+        Get products in the order of product_ids, skipping unknown ids
+        
+        Args:
+            product_ids: Product IDs (duplicates are returned once per occurrence)
+            
+        Returns:
+            List of product dicts
+        """
+        if not product_ids:
+            return []
+        found = await self._fetch(product_ids)
+        if found is None:
+            return mock_db.get_products_by_ids(product_ids)
+        return [found[pid][0] for pid in product_ids if pid in found]
+    
+    async def get_product_views_by_ids(self, product_ids: List[str]) -> List[ProductView]:
+        """Like get_products_by_ids, but display-ready ProductViews"""
+        if not product_ids:
+            return []
+        found = await self._fetch(product_ids)
+        if found is None:
+            return mock_db.get_product_views_by_ids(product_ids)
+        return [found[pid][1] for pid in product_ids if pid in found]
+
+
+# Global instance
+product_repository = ProductRepository()
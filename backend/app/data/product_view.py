@@ -0,0 +1,104 @@
+"""
+Product View
+Immutable, display-ready product records shared by every endpoint
+"""
+from datetime import datetime
+from typing import Dict
+
+from app.schemas.product import ProductResponse
+
+LANGUAGES = ("en", "sw")
+
+
+class ProductView:
+    """
+    Read-only projection of a stored product for API responses
+
+    Built once when a product is stored: language fallbacks, the
+    thumbnail and created_at parsing are resolved up front, so mapping a
+    product for a response does no per-request lookups or parsing.
+    Instances cannot be modified; build a new view when the product changes.
+    """
+
+    __slots__ = (
+        "id", "name_en", "name_sw", "description_en", "description_sw",
+        "category", "brand", "tags", "price", "currency", "stock_quantity",
+        "in_stock", "images", "thumbnail", "average_rating", "review_count",
+        "county", "created_at"
+    )
+
+    def __init__(self, product: Dict):
+        """
+        Args:
+            product: Stored product document
+        """
+        images = tuple(product.get("images", []))
+        stock = product.get("stock", 0)
+        name = product["name"]
+        description = product["description"]
+        values = {
+            "id": product["id"],
+            # Swahili text falls back to English
+            "name_en": name,
+            "name_sw": product.get("name_sw", name),
+            "description_en": description,
+            "description_sw": product.get("description_sw", description),
+            "category": product["category"],
+            "brand": product.get("vendor_name", ""),
+            "tags": tuple(product.get("tags", [])),
+            "price": product["price"],
+            "currency": product.get("currency", "KES"),
+            "stock_quantity": stock,
+            "in_stock": stock > 0,
+            "images": images,
+            "thumbnail": images[0] if images else None,
+            "average_rating": product.get("rating", 0.0),
+            "review_count": product.get("review_count", 0),
+            "county": product.get("county"),
+            "created_at": datetime.fromisoformat(product["created_at"].replace("Z", "+00:00"))
+        }
+        for field, value in values.items():
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"ProductView({self.id!r})"
+
+    def name(self, language: str = "en") -> str:
+        """Display name (any language other than "en" shows Swahili)"""
+        return self.name_en if language == "en" else self.name_sw
+
+    def description(self, language: str = "en") -> str:
+        return self.description_en if language == "en" else self.description_sw
+
+    def to_response(self, language: str = "en", view_count: int = 0) -> ProductResponse:
+        """ProductResponse localized to language"""
+        return ProductResponse(
+            id=self.id,
+            name=self.name(language),
+            name_sw=self.name_sw,
+            description=self.description(language),
+            description_sw=self.description_sw,
+            category=self.category,
+            brand=self.brand,
+            tags=list(self.tags),
+            price=self.price,
+            currency=self.currency,
+            stock_quantity=self.stock_quantity,
+            discount_percentage=0,
+            in_stock=self.in_stock,
+            images=list(self.images),
+            thumbnail=self.thumbnail,
+            average_rating=self.average_rating,
+            review_count=self.review_count,
+            view_count=view_count,
+            purchase_count=0,
+            is_featured=False,
+            is_local_vendor=True,
+            created_at=self.created_at
+        )
@@ -80,6 +80,34 @@ async def startup_event():
         print(f"[WARNING] Database connection error: {e}")
         print("   App will continue with mock data")
     
+    # Train recommendation models in the background; retrained when stale
+    try:
+        from app.services.recommendation_service import recommendation_service
+        from app.data.mock_database import mock_db
+        recommendation_service.start_background_training(
+            lambda: (mock_db.get_all_interactions(), mock_db.get_all_products())
+        )
+        
+        # Fold new interactions into the served models as they arrive
+        # (on an inference worker, off the event loop)
+        def fold_in_interaction(interaction: dict):
+            user_id = interaction["user_id"]
+            recommendation_service.schedule_fold_in(
+                user_id,
+                lambda: mock_db.get_user_interactions(user_id),
+                mock_db.get_product_by_id(interaction["product_id"])
+            )
+        
+        mock_db.add_interaction_listener(fold_in_interaction)
+        
+        # Rebuild materialized homepages after retrains and user activity
+        from app.services.homepage_service import homepage_materializer
+        from app.services.redis_service import redis_service
+        recommendation_service.add_bundle_listener(homepage_materializer.schedule_all)
+        redis_service.add_activity_listener(homepage_materializer.schedule_refresh)
+    except Exception as e:
+        print(f"[WARNING] Background model training not started: {e}")
+    
     print("=" * 60)
     print("[SUCCESS] Application ready!")
     print(f"[INFO] API Docs: http://localhost:8000/docs")
@@ -93,6 +121,19 @@ async def shutdown_event():
     print("=" * 60)
     print("[SHUTDOWN] Shutting down gracefully...")
     
+    try:
+        from app.services.recommendation_service import recommendation_service
+        await recommendation_service.stop_background_training()
+        recommendation_service.inference.shutdown()
+    except:
+        pass
+    
+    try:
+        from app.services.homepage_service import homepage_materializer
+        await homepage_materializer.close()
+    except:
+        pass
+    
     try:
         from app.core.database import db_manager
         await db_manager.close_mongodb()
@@ -129,8 +170,13 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    from app.services.redis_service import redis_service
+    from app.services.recommendation_service import recommendation_service
     return {
         "status": "healthy",
-        "environment": settings.ENVIRONMENT
+        "environment": settings.ENVIRONMENT,
+        "redis_connected": redis_service.is_connected(),
+        "local_cache": redis_service.cache_stats(),
+        "inference": recommendation_service.inference.stats()
     }
 
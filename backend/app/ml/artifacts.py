@@ -0,0 +1,285 @@
+"""
+Model Artifacts
+Versioned on-disk model format: a directory of .npy arrays plus a JSON manifest
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from scipy import sparse
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from app.ml.id_registry import IdRegistry
+
+
+ARTIFACT_FORMAT = "recommendation-model"
+ARTIFACT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+# "<path>.current" names the version directory currently served for path
+CURRENT_SUFFIX = ".current"
+
+# How long a superseded version stays on disk for readers that resolved it
+# just before a save switched the symlink
+ARTIFACT_RETAIN_SECONDS = 60
+
+# Components stored for each sparse CSR matrix
+_CSR_PARTS = ("data", "indices", "indptr")
+
+
+class ModelArtifact:
+    """
+    A saved model directory opened for reading
+
+    Arrays are memory-mapped on access, so every process that loads the
+    same artifact shares one page-cached copy of the data and load time
+    does not depend on model size.
+    """
+
+    def __init__(self, path: str, manifest: Dict, mmap_mode: Optional[str] = 'r'):
+        """
+        Args:
+            path: Artifact directory
+            manifest: Parsed manifest.json
+            mmap_mode: np.load mmap mode ('r' read-only, 'c' copy-on-write,
+                None to read arrays into private memory)
+        """
+        self.path = path
+        self.manifest = manifest
+        self.mmap_mode = mmap_mode
+
+    @property
+    def kind(self) -> str:
+        return self.manifest["kind"]
+
+    @property
+    def metadata(self) -> Dict:
+        return self.manifest["metadata"]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.manifest["arrays"]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manifest["arrays"])
+
+    def _load(self, filename: str) -> np.ndarray:
+        return np.load(
+            os.path.join(self.path, filename),
+            mmap_mode=self.mmap_mode,
+            allow_pickle=False
+        )
+
+    def __getitem__(self, name: str):
+        """Dense array or CSR matrix stored under name"""
+        entry = self.manifest["arrays"][name]
+        if entry["type"] == "csr":
+            data, indices, indptr = (
+                self._load(f"{name}.{part}.npy") for part in _CSR_PARTS
+            )
+            return sparse.csr_matrix(
+                (data, indices, indptr), shape=tuple(entry["shape"]), copy=False
+            )
+        return self._load(f"{name}.npy")
+
+    def arrays(self, prefix: str) -> Dict:
+        """Arrays stored under 'prefix.<name>', keyed by <name>"""
+        start = prefix + "."
+        return {
+            name[len(start):]: self[name]
+            for name in self
+            if name.startswith(start)
+        }
+
+    def registry(self, name: str) -> IdRegistry:
+        """IdRegistry stored with ids_to_array()"""
+        return IdRegistry(self[name].tolist())
+
+
+def ids_to_array(ids: IdRegistry) -> np.ndarray:
+    """Fixed-width string array of a registry's ids (no pickling needed)"""
+    return np.array(ids.to_list(), dtype=np.str_)
+
+
+def prefixed(prefix: str, arrays: Dict) -> Dict:
+    """Namespace a component's arrays inside one artifact"""
+    return {f"{prefix}.{name}": array for name, array in arrays.items()}
+
+
+def _write_array(path: str, name: str, array) -> Dict:
+    """Write one array (or CSR matrix) and return its manifest entry"""
+    if sparse.issparse(array):
+        array = sparse.csr_matrix(array)
+        for part in _CSR_PARTS:
+            np.save(os.path.join(path, f"{name}.{part}.npy"), getattr(array, part))
+        return {
+            "type": "csr",
+            "shape": list(array.shape),
+            "dtype": array.dtype.str,
+            "nnz": int(array.nnz)
+        }
+
+    array = np.ascontiguousarray(array)
+    np.save(os.path.join(path, f"{name}.npy"), array, allow_pickle=False)
+    return {"type": "dense", "shape": list(array.shape), "dtype": array.dtype.str}
+
+
+def _version_time(version_path: str) -> float:
+    """Save time (seconds) encoded in a versioned directory name"""
+    stamp = version_path.rsplit(".v", 1)[1].split("-", 1)[0]
+    return int(stamp) / 1e9
+
+
+def _artifact_versions(path: str):
+    """Versioned directories written for the artifact at path, oldest first"""
+    parent, name = os.path.split(os.path.abspath(path))
+    prefix = f"{name}.v"
+    if not os.path.isdir(parent):
+        return []
+    return sorted(
+        os.path.join(parent, entry) for entry in os.listdir(parent)
+        if entry.startswith(prefix) and os.path.isdir(os.path.join(parent, entry))
+    )
+
+
+def write_json_atomic(path: str, data, retries: int = 5):
+    """
+    Write JSON to path through a temporary file and os.replace
+
+    Readers see the old file or the new one, never a partial write. On
+    Windows, replacing a file another process has open raises
+    PermissionError for a moment, so the replace is retried briefly.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    for attempt in range(retries):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if attempt == retries - 1:
+                os.remove(tmp_path)
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+def resolve_artifact(path: str) -> str:
+    """
+    Directory holding the current version of the artifact at path
+
+    Follows the "<path>.current" pointer written by save_artifact; a plain
+    directory at path (saved before versioning) is returned as is.
+    """
+    path = os.path.abspath(path)
+    try:
+        with open(f"{path}{CURRENT_SUFFIX}") as f:
+            version = json.load(f)
+    except FileNotFoundError:
+        return os.path.realpath(path)
+    return os.path.join(os.path.dirname(path), version)
+
+
+def save_artifact(path: str, kind: str, arrays: Dict, metadata: Optional[Dict] = None) -> str:
+    """
+    Write a model artifact directory
+
+    Each save writes a new versioned directory next to path
+    ("<path>.v<timestamp>-<pid>") and then points "<path>.current" at it
+    with a single os.replace (a plain file rather than a symlink, so it
+    works on Windows too). Readers resolve the pointer once and see the
+    old version or the new one, never a half-written or missing one. A
+    superseded version is deleted once it has been replaced for
+    ARTIFACT_RETAIN_SECONDS, so readers that resolved it just before the
+    switch can still open its arrays.
+
+    Args:
+        path: Artifact path (a directory saved before versioning is
+            migrated on the first save)
+        kind: Model type stored in the manifest
+        arrays: Name -> numpy array or scipy sparse matrix
+        metadata: JSON-serializable model parameters
+
+    Returns:
+        The new version's directory
+    """
+    path = os.path.abspath(path)
+    version_path = f"{path}.v{time.time_ns():020d}-{os.getpid()}"
+    os.makedirs(version_path)
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "kind": kind,
+        "created_at": datetime.utcnow().isoformat(),
+        "arrays": {
+            name: _write_array(version_path, name, array)
+            for name, array in arrays.items()
+        },
+        "metadata": metadata or {}
+    }
+    with open(os.path.join(version_path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    previous = resolve_artifact(path)
+    write_json_atomic(f"{path}{CURRENT_SUFFIX}", os.path.basename(version_path))
+
+    # Earlier layouts kept the artifact at path itself (a directory, or a
+    # symlink to a version); the pointer now takes precedence over both
+    if os.path.islink(path):
+        os.remove(path)
+    elif os.path.isdir(path):
+        previous = f"{path}.v{0:020d}-legacy"
+        os.rename(path, previous)
+
+    versions = _artifact_versions(path)
+    now = time.time()
+    for old_path, newer_path in zip(versions, versions[1:]):
+        if old_path in (version_path, previous):
+            continue
+        # Superseded when the next version was saved
+        if now - _version_time(newer_path) > ARTIFACT_RETAIN_SECONDS:
+            # Fails on Windows while a reader still maps the files;
+            # retried on the next save
+            shutil.rmtree(old_path, ignore_errors=True)
+    return version_path
+
+
+def load_artifact(path: str, kind: str, mmap_mode: Optional[str] = 'r') -> ModelArtifact:
+    """
+    Open a model artifact directory
+
+    Args:
+        path: Artifact path, or one of its version directories
+        kind: Expected model type
+        mmap_mode: np.load mmap mode for the arrays
+
+    Returns:
+        ModelArtifact
+    """
+    # Resolve the version once, so a concurrent save cannot mix the manifest
+    # of one version with arrays of another
+    path = resolve_artifact(path)
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a model artifact")
+    if manifest.get("version") != ARTIFACT_VERSION:
+        raise ValueError(
+            f"Unsupported model artifact version {manifest.get('version')} "
+            f"(expected {ARTIFACT_VERSION})"
+        )
+    if manifest.get("kind") != kind:
+        raise ValueError(f"{path} holds a {manifest.get('kind')} model, not {kind}")
+
+    return ModelArtifact(path, manifest, mmap_mode)
+
+
+def format_datetime(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
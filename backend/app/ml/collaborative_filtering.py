@@ -3,13 +3,26 @@ Collaborative Filtering Recommendation Engine
 Implements User-Based and Item-Based Collaborative Filtering
 """
 import numpy as np
-import pandas as pd
 from sklearn.neighbors import NearestNeighbors
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import List, Tuple, Optional
-import joblib
 from datetime import datetime
 
+from app.ml.artifacts import (
+    format_datetime,
+    ids_to_array,
+    load_artifact,
+    parse_datetime,
+    save_artifact
+)
+from app.ml.id_registry import IdRegistry
+from app.ml.interactions import InteractionMatrix, build_interaction_matrix
+from app.ml.neighbor_table import NeighborTable, lookup_neighbors
+from app.ml.topk import top_k
+from app.ml.vector_index import VectorIndex, build_vector_index
+
+
+ARTIFACT_KIND = 'collaborative_filtering'
+
 
 class CollaborativeFilteringEngine:
     """
@@ -17,24 +30,33 @@ class CollaborativeFilteringEngine:
     Supports both user-based and item-based filtering
     """
     
-    def __init__(self, n_neighbors: int = 20, metric: str = 'cosine'):
+    def __init__(
+        self,
+        n_neighbors: int = 20,
+        metric: str = 'cosine',
+        neighbor_k: int = 50
+    ):
         """
         Initialize the collaborative filtering engine
         
         Args:
             n_neighbors: Number of nearest neighbors to consider
-            metric: Distance metric (cosine, euclidean, etc.)
+            metric: Distance metric for user similarity (cosine, euclidean, etc.)
+            neighbor_k: Similar items precomputed per product
         """
         self.n_neighbors = n_neighbors
         self.metric = metric
+        self.neighbor_k = neighbor_k
         self.user_model = None
-        self.item_model = None
+        self.item_index = None
+        self.neighbor_table = None
         self.user_item_matrix = None
-        self.user_ids = []
-        self.product_ids = []
+        self.item_user_matrix = None
+        self.user_ids = IdRegistry()
+        self.product_ids = IdRegistry()
         self.trained_at = None
         
-    def prepare_interaction_matrix(self, interactions: List[dict]) -> pd.DataFrame:
+    def prepare_interaction_matrix(self, interactions: List[dict]) -> InteractionMatrix:
         """
         Prepare user-item interaction matrix from interaction data
         
@@ -42,76 +64,42 @@ class CollaborativeFilteringEngine:
             interactions: List of interaction dictionaries
             
         Returns:
-            User-item matrix DataFrame
+            Sparse user-item InteractionMatrix
         """
-        df = pd.DataFrame(interactions)
-        
-        # Create ratings based on interaction types
-        interaction_weights = {
-            'view': 1.0,
-            'click': 1.5,
-            'add_to_cart': 3.0,
-            'wishlist': 2.5,
-            'purchase': 5.0,
-            'review': 4.0
-        }
-        
-        # Apply weights
-        df['weighted_rating'] = df.apply(
-            lambda row: interaction_weights.get(row['interaction_type'], 1.0) * 
-                       (row.get('rating', 3.0) / 3.0),
-            axis=1
-        )
-        
-        # Create pivot table (user-item matrix)
-        user_item_matrix = df.pivot_table(
-            index='user_id',
-            columns='product_id',
-            values='weighted_rating',
-            aggfunc='mean',
-            fill_value=0
-        )
-        
-        return user_item_matrix
+        return build_interaction_matrix(interactions)
+    
+    def _set_matrix(self, interaction_matrix: InteractionMatrix):
+        """Store the shared interaction matrix and its id maps"""
+        self.user_item_matrix = interaction_matrix.matrix
+        self.item_user_matrix = interaction_matrix.item_user_matrix()
+        self.user_ids = interaction_matrix.user_ids
+        self.product_ids = interaction_matrix.product_ids
     
-    def train_user_based(self, user_item_matrix: pd.DataFrame):
+    def train_user_based(self, interaction_matrix: InteractionMatrix):
         """
         Train user-based collaborative filtering model
         
         Args:
-            user_item_matrix: User-item interaction matrix
+            interaction_matrix: Sparse user-item interaction matrix
         """
-        self.user_item_matrix = user_item_matrix
-        self.user_ids = user_item_matrix.index.tolist()
-        self.product_ids = user_item_matrix.columns.tolist()
+        self._set_matrix(interaction_matrix)
         
         # Train KNN model on user similarities
-        self.user_model = NearestNeighbors(
-            n_neighbors=min(self.n_neighbors, len(self.user_ids)),
-            metric=self.metric,
-            algorithm='brute'
-        )
-        self.user_model.fit(user_item_matrix.values)
+        self._fit_user_model()
         self.trained_at = datetime.utcnow()
         
-    def train_item_based(self, user_item_matrix: pd.DataFrame):
+    def train_item_based(self, interaction_matrix: InteractionMatrix):
         """
         Train item-based collaborative filtering model
         
         Args:
-            user_item_matrix: User-item interaction matrix
+            interaction_matrix: Sparse user-item interaction matrix
         """
-        self.user_item_matrix = user_item_matrix
-        self.user_ids = user_item_matrix.index.tolist()
-        self.product_ids = user_item_matrix.columns.tolist()
+        self._set_matrix(interaction_matrix)
         
-        # Train KNN model on item similarities
-        self.item_model = NearestNeighbors(
-            n_neighbors=min(self.n_neighbors, len(self.product_ids)),
-            metric=self.metric,
-            algorithm='brute'
-        )
-        self.item_model.fit(user_item_matrix.T.values)
+        # Index item vectors for cosine similarity lookups
+        self.item_index = build_vector_index(self.item_user_matrix)
+        self.neighbor_table = NeighborTable.build(self.item_index, self.neighbor_k)
         self.trained_at = datetime.utcnow()
     
     def recommend_user_based(
@@ -139,30 +127,33 @@ class CollaborativeFilteringEngine:
         
         # Get user index
         user_idx = self.user_ids.index(user_id)
-        user_vector = self.user_item_matrix.iloc[user_idx].values.reshape(1, -1)
+        user_vector = self.user_item_matrix[user_idx]
         
         # Find similar users
         distances, indices = self.user_model.kneighbors(user_vector)
         
         # Get items from similar users
         similar_user_indices = indices[0][1:]  # Exclude the user themselves
-        similar_users_matrix = self.user_item_matrix.iloc[similar_user_indices]
+        similar_users_matrix = self.user_item_matrix[similar_user_indices]
         
         # Calculate weighted average of similar users' ratings
         similarities = 1 - distances[0][1:]  # Convert distance to similarity
-        weighted_ratings = (similar_users_matrix.T * similarities).sum(axis=1) / similarities.sum()
+        weighted_ratings = np.asarray(
+            similar_users_matrix.T @ similarities
+        ).ravel() / similarities.sum()
         
         # Exclude already interacted items if requested
+        exclude = None
         if exclude_interacted:
-            user_interactions = self.user_item_matrix.iloc[user_idx]
-            weighted_ratings[user_interactions > 0] = -np.inf
+            start, end = self.user_item_matrix.indptr[user_idx:user_idx + 2]
+            exclude = self.user_item_matrix.indices[start:end]
         
         # Get top N recommendations
-        top_indices = np.argsort(weighted_ratings.values)[::-1][:n_recommendations]
+        top_indices, top_scores = top_k(weighted_ratings, n_recommendations, exclude=exclude)
         recommendations = [
-            (self.product_ids[idx], float(weighted_ratings.values[idx]))
-            for idx in top_indices
-            if weighted_ratings.values[idx] > 0
+            (self.product_ids[idx], float(score))
+            for idx, score in zip(top_indices, top_scores)
+            if score > 0
         ]
         
         return recommendations
@@ -182,23 +173,21 @@ class CollaborativeFilteringEngine:
         Returns:
             List of (product_id, similarity_score) tuples
         """
-        if self.item_model is None:
+        if self.item_index is None:
             raise ValueError("Item-based model not trained. Call train_item_based first.")
         
         if product_id not in self.product_ids:
             return []
         
-        # Get product index
+        # Find similar items (cosine similarity, excluding the item itself)
         product_idx = self.product_ids.index(product_id)
-        product_vector = self.user_item_matrix.T.iloc[product_idx].values.reshape(1, -1)
-        
-        # Find similar items
-        distances, indices = self.item_model.kneighbors(product_vector)
+        indices, similarities = lookup_neighbors(
+            self.neighbor_table, self.item_index, product_idx, n_recommendations
+        )
         
-        # Convert to similarity scores
         similar_items = [
-            (self.product_ids[idx], float(1 - distances[0][i]))
-            for i, idx in enumerate(indices[0][1:n_recommendations+1])
+            (self.product_ids[idx], float(similarity))
+            for idx, similarity in zip(indices, similarities)
         ]
         
         return similar_items
@@ -218,15 +207,32 @@ class CollaborativeFilteringEngine:
         Returns:
             List of (product_id, score) tuples
         """
-        if self.item_model is None:
+        if self.item_index is None:
             raise ValueError("Item-based model not trained.")
         
+        basket = [
+            self.product_ids.index(pid) for pid in product_ids if pid in self.product_ids
+        ]
+        if not basket:
+            return []
+        
+        depth = n_recommendations * 2
+        if depth <= self.neighbor_table.k:
+            # Merge the precomputed neighbour rows of every basket item
+            indices, scores = self.neighbor_table.merge(
+                basket, n_recommendations, depth=depth, exclude=basket
+            )
+            return [
+                (self.product_ids[idx], float(score))
+                for idx, score in zip(indices, scores)
+            ]
+        
         all_recommendations = {}
         
         # Get recommendations for each item in basket
         for pid in product_ids:
             if pid in self.product_ids:
-                recs = self.recommend_item_based(pid, n_recommendations * 2)
+                recs = self.recommend_item_based(pid, depth)
                 for rec_pid, score in recs:
                     if rec_pid not in product_ids:  # Exclude items already in basket
                         if rec_pid in all_recommendations:
@@ -243,29 +249,56 @@ class CollaborativeFilteringEngine:
         
         return sorted_recommendations
     
-    def save_model(self, filepath: str):
-        """Save trained model to disk"""
-        model_data = {
-            'user_model': self.user_model,
-            'item_model': self.item_model,
+    def _fit_user_model(self):
+        """Fit the KNN model over user rows of the interaction matrix"""
+        self.user_model = NearestNeighbors(
+            n_neighbors=min(self.n_neighbors, len(self.user_ids)),
+            metric=self.metric,
+            algorithm='brute'
+        )
+        self.user_model.fit(self.user_item_matrix)
+    
+    def save_model(self, path: str) -> str:
+        """Save as a memory-mappable artifact; returns the version directory"""
+        arrays = {
+            'user_ids': ids_to_array(self.user_ids),
+            'product_ids': ids_to_array(self.product_ids),
             'user_item_matrix': self.user_item_matrix,
-            'user_ids': self.user_ids,
-            'product_ids': self.product_ids,
+            'item_user_matrix': self.item_user_matrix
+        }
+        metadata = {
             'n_neighbors': self.n_neighbors,
             'metric': self.metric,
-            'trained_at': self.trained_at
+            'neighbor_k': self.neighbor_k,
+            'user_based': self.user_model is not None,
+            'trained_at': format_datetime(self.trained_at)
         }
-        joblib.dump(model_data, filepath)
+        if self.item_index is not None:
+            index_arrays, metadata['index'] = self.item_index.to_artifact()
+            arrays.update(index_arrays)
+            arrays.update(self.neighbor_table.to_artifact())
+        return save_artifact(path, ARTIFACT_KIND, arrays, metadata)
     
-    def load_model(self, filepath: str):
-        """Load trained model from disk"""
-        model_data = joblib.load(filepath)
-        self.user_model = model_data['user_model']
-        self.item_model = model_data['item_model']
-        self.user_item_matrix = model_data['user_item_matrix']
-        self.user_ids = model_data['user_ids']
-        self.product_ids = model_data['product_ids']
-        self.n_neighbors = model_data['n_neighbors']
-        self.metric = model_data['metric']
-        self.trained_at = model_data['trained_at']
-
+    def load_model(self, path: str):
+        """Load a saved model; arrays are memory-mapped, not copied"""
+        artifact = load_artifact(path, ARTIFACT_KIND)
+        metadata = artifact.metadata
+        self.user_item_matrix = artifact['user_item_matrix']
+        self.item_user_matrix = artifact['item_user_matrix']
+        self.user_ids = artifact.registry('user_ids')
+        self.product_ids = artifact.registry('product_ids')
+        self.n_neighbors = metadata['n_neighbors']
+        self.metric = metadata['metric']
+        self.neighbor_k = metadata['neighbor_k']
+        self.trained_at = parse_datetime(metadata['trained_at'])
+        
+        # Brute-force KNN only keeps a reference to the matrix, so refitting is free
+        self.user_model = None
+        if metadata['user_based']:
+            self._fit_user_model()
+        
+        self.item_index = None
+        self.neighbor_table = None
+        if 'index' in metadata:
+            self.item_index = VectorIndex.from_artifact(artifact, metadata['index'])
+            self.neighbor_table = NeighborTable.from_artifact(artifact)
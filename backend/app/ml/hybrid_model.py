@@ -3,12 +3,39 @@ Hybrid Recommendation Model using LightFM
 Combines collaborative filtering with content-based features
 """
 import numpy as np
+from scipy import sparse
+from collections import OrderedDict
 from lightfm import LightFM
-from lightfm.data import Dataset
 from typing import List, Tuple, Optional, Dict
-import joblib
 from datetime import datetime
-import pandas as pd
+
+from app.ml.artifacts import (
+    format_datetime,
+    ids_to_array,
+    load_artifact,
+    parse_datetime,
+    prefixed,
+    save_artifact
+)
+from app.ml.id_registry import IdRegistry
+from app.ml.interactions import InteractionMatrix, remember_fold_in
+from app.ml.neighbor_table import NeighborTable, lookup_neighbors
+from app.ml.topk import top_k
+from app.ml.vector_index import VectorIndex, build_vector_index
+
+
+ARTIFACT_KIND = 'hybrid'
+# Vectors the similar-items index is built from (older artifacts indexed
+# the identity-feature embeddings only, and are re-indexed on load)
+INDEX_SPACE = 'item_representations'
+
+# Fitted LightFM arrays; everything else is constructor parameters
+LIGHTFM_STATE = (
+    'item_embeddings', 'item_embedding_gradients', 'item_embedding_momentum',
+    'item_biases', 'item_bias_gradients', 'item_bias_momentum',
+    'user_embeddings', 'user_embedding_gradients', 'user_embedding_momentum',
+    'user_biases', 'user_bias_gradients', 'user_bias_momentum'
+)
 
 
 class HybridRecommendationEngine:
@@ -23,7 +50,11 @@ class HybridRecommendationEngine:
         learning_rate: float = 0.05,
         n_epochs: int = 30,
         n_components: int = 30,
-        random_state: int = 42
+        random_state: int = 42,
+        index_params: Optional[Dict] = None,
+        neighbor_k: int = 50,
+        fold_in_regularization: float = 1.0,
+        max_folded_users: int = 100000
     ):
         """
         Initialize hybrid model
@@ -34,104 +65,105 @@ class HybridRecommendationEngine:
             n_epochs: Number of training epochs
             n_components: Number of latent dimensions
             random_state: Random seed
+            index_params: Options for the similar-items vector index
+            neighbor_k: Similar items precomputed per product
+            fold_in_regularization: Ridge penalty when folding in new users
+            max_folded_users: Fold-in users kept until the next retrain
         """
         self.loss = loss
         self.learning_rate = learning_rate
         self.n_epochs = n_epochs
         self.n_components = n_components
         self.random_state = random_state
+        self.index_params = index_params or {}
+        self.neighbor_k = neighbor_k
+        self.fold_in_regularization = fold_in_regularization
+        self.max_folded_users = max_folded_users
         
         self.model = None
-        self.dataset = None
-        self.user_id_map = {}
-        self.product_id_map = {}
+        self.item_features_matrix = None
+        self.feature_names = []
+        self.user_ids = IdRegistry()
+        self.product_ids = IdRegistry()
+        self.item_index = None
+        self.neighbor_table = None
         self.trained_at = None
+        self._reset_fold_in()
+        
+    def _reset_fold_in(self):
+        """Drop fold-in state (it is only valid for the current model)"""
+        # New users: id -> embedding solved against the item representations
+        self.folded_users: Dict[str, np.ndarray] = OrderedDict()
+        # New items: id -> row of folded_item_embeddings / folded_item_biases
+        self.folded_product_ids: Dict[str, int] = {}
+        self.folded_item_embeddings = np.empty((0, self.n_components), dtype=np.float32)
+        self.folded_item_biases = np.empty(0, dtype=np.float32)
+        # Fold-in items' share of the user fold-in normal equations (F^T F, F^T b)
+        self.folded_item_gram = np.zeros((self.n_components, self.n_components), dtype=np.float32)
+        self.folded_item_bias_projection = np.zeros(self.n_components, dtype=np.float32)
+        self._fold_in_basis = None
         
     def prepare_data(
         self,
-        interactions: List[dict],
+        interaction_matrix: InteractionMatrix,
         product_features: List[dict]
-    ) -> Tuple[Dataset, any, any]:
+    ) -> Tuple[sparse.coo_matrix, sparse.csr_matrix]:
         """
         Prepare data for LightFM training
         
         Args:
-            interactions: List of user-product interactions
+            interaction_matrix: Shared sparse user-item interaction matrix
             product_features: List of product metadata
             
         Returns:
-            Tuple of (dataset, interactions_matrix, item_features_matrix)
+            Tuple of (interactions_matrix, item_features_matrix)
         """
-        # Create dataset
-        self.dataset = Dataset()
-        
-        # Get unique users and items
-        user_ids = list(set(i['user_id'] for i in interactions))
-        product_ids = list(set(i['product_id'] for i in interactions))
-        
-        # Extract product features
-        all_features = set()
-        for product in product_features:
-            features = [
-                f"category:{product.get('category', 'unknown')}",
-                f"brand:{product.get('brand', 'unknown')}",
-                f"price_range:{self._get_price_range(product.get('price', 0))}",
-                f"rating:{int(product.get('average_rating', 0))}"
-            ]
-            all_features.update(features)
-        
-        # Fit dataset
-        self.dataset.fit(
-            users=user_ids,
-            items=product_ids,
-            item_features=list(all_features)
+        self.user_ids = interaction_matrix.user_ids
+        self.product_ids = interaction_matrix.product_ids
+        n_items = len(self.product_ids)
+        
+        # LightFM trains on binary interactions
+        interactions_matrix = interaction_matrix.matrix.tocoo(copy=True)
+        interactions_matrix.data = np.ones_like(interactions_matrix.data)
+        
+        # Extract product features for products seen in interactions
+        product_feature_map = {
+            product['id']: self._get_product_features(product)
+            for product in product_features
+            if product['id'] in self.product_ids
+        }
+        self.feature_names = sorted(
+            set(f for features in product_feature_map.values() for f in features)
         )
+        feature_index = {name: n_items + i for i, name in enumerate(self.feature_names)}
+        
+        # Identity feature per item plus metadata features, rows normalized to 1
+        rows = list(range(n_items))
+        cols = list(range(n_items))
+        for pid, features in product_feature_map.items():
+            item_idx = self.product_ids.index(pid)
+            for feature in features:
+                rows.append(item_idx)
+                cols.append(feature_index[feature])
+        
+        item_features_matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n_items, n_items + len(self.feature_names))
+        )
+        row_sums = np.asarray(item_features_matrix.sum(axis=1)).ravel()
+        item_features_matrix = sparse.diags(1.0 / row_sums).dot(item_features_matrix).tocsr()
+        self.item_features_matrix = item_features_matrix.astype(np.float32)
         
-        # Build interactions matrix
-        interaction_data = [
-            (i['user_id'], i['product_id'], self._get_interaction_weight(i))
-            for i in interactions
-        ]
-        interactions_matrix, _ = self.dataset.build_interactions(interaction_data)
-        
-        # Build item features matrix
-        product_feature_map = {}
-        for product in product_features:
-            pid = product['id']
-            features = [
-                f"category:{product.get('category', 'unknown')}",
-                f"brand:{product.get('brand', 'unknown')}",
-                f"price_range:{self._get_price_range(product.get('price', 0))}",
-                f"rating:{int(product.get('average_rating', 0))}"
-            ]
-            product_feature_map[pid] = features
-        
-        item_features_data = [
-            (pid, features)
-            for pid, features in product_feature_map.items()
-        ]
-        item_features_matrix = self.dataset.build_item_features(item_features_data)
-        
-        # Store mappings
-        self.user_id_map, _, self.product_id_map, _ = self.dataset.mapping()
-        
-        return self.dataset, interactions_matrix, item_features_matrix
+        return interactions_matrix, self.item_features_matrix
     
-    def _get_interaction_weight(self, interaction: dict) -> float:
-        """Calculate weight for an interaction"""
-        weights = {
-            'view': 1.0,
-            'click': 1.5,
-            'add_to_cart': 3.0,
-            'wishlist': 2.5,
-            'purchase': 5.0,
-            'review': 4.0
-        }
-        
-        base_weight = weights.get(interaction['interaction_type'], 1.0)
-        rating_multiplier = interaction.get('rating', 3.0) / 3.0
-        
-        return base_weight * rating_multiplier
+    def _get_product_features(self, product: dict) -> List[str]:
+        """Metadata features for a product"""
+        return [
+            f"category:{product.get('category', 'unknown')}",
+            f"brand:{product.get('brand', 'unknown')}",
+            f"price_range:{self._get_price_range(product.get('price', 0))}",
+            f"rating:{int(product.get('average_rating', 0))}"
+        ]
     
     def _get_price_range(self, price: float) -> str:
         """Categorize price into ranges"""
@@ -169,9 +201,127 @@ class HybridRecommendationEngine:
             epochs=self.n_epochs,
             verbose=False
         )
+        self._reset_fold_in()
+        self._build_item_index()
         
         self.trained_at = datetime.utcnow()
     
+    def _build_item_index(self):
+        """
+        Index the item representations (identity plus metadata features,
+        the vectors recommend() scores with) for similarity search, and
+        materialize the neighbour table from it
+        """
+        _, embeddings, _, _ = self._get_fold_in_basis()
+        self.item_index = build_vector_index(embeddings, **self.index_params)
+        self.neighbor_table = NeighborTable.build(self.item_index, self.neighbor_k)
+    
+    def _get_fold_in_basis(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Trained item representations and their normal-equation terms
+        
+        Returns:
+            Tuple of (item_biases, item_embeddings, Q^T Q, Q^T b), built at
+            train/load time and kept until the next retrain
+        """
+        if self._fold_in_basis is None:
+            biases, embeddings = self.model.get_item_representations(
+                self.item_features_matrix
+            )
+            self._fold_in_basis = (
+                biases,
+                embeddings,
+                embeddings.T @ embeddings,
+                embeddings.T @ biases
+            )
+        return self._fold_in_basis
+    
+    def fold_in_user(self, user_id: str, interactions: List[dict]) -> bool:
+        """
+        Fit an embedding for a user the model has not seen
+        
+        Solves the ridge least-squares problem that makes the user's
+        scores best reproduce their (binary) interactions against the
+        fixed item representations, fold-in items included:
+        (Q^T Q + lambda I) u = sum of interacted q_i - Q^T b.
+        Costs one n_components-sized linear solve.
+        
+        Args:
+            user_id: New user ID (trained users keep their learned embedding)
+            interactions: All of the user's interactions
+            
+        Returns:
+            True if the user now has a fold-in embedding
+        """
+        if self.model is None or user_id in self.user_ids:
+            return False
+        
+        product_ids = {i['product_id'] for i in interactions}
+        trained = self.product_ids.indices(product_ids)
+        trained = trained[trained >= 0]
+        folded = [
+            self.folded_product_ids[pid] for pid in product_ids
+            if pid in self.folded_product_ids
+        ]
+        if len(trained) == 0 and not folded:
+            return False
+        
+        _, embeddings, gram, bias_projection = self._get_fold_in_basis()
+        target = (
+            embeddings[trained].sum(axis=0)
+            + self.folded_item_embeddings[folded].sum(axis=0)
+            - bias_projection
+            - self.folded_item_bias_projection
+        )
+        regularization = self.fold_in_regularization * np.eye(gram.shape[0])
+        embedding = np.linalg.solve(
+            gram + self.folded_item_gram + regularization, target
+        ).astype(np.float32)
+        remember_fold_in(self.folded_users, user_id, embedding, self.max_folded_users)
+        return True
+    
+    def fold_in_item(self, product: dict) -> bool:
+        """
+        Represent a new product by its metadata feature embeddings
+        
+        Args:
+            product: Product dictionary (id, category, brand, price, ...)
+            
+        Returns:
+            True if the product was added as a fold-in item
+        """
+        product_id = product['id']
+        if (
+            self.model is None
+            or product_id in self.product_ids
+            or product_id in self.folded_product_ids
+        ):
+            return False
+        
+        n_items = len(self.product_ids)
+        feature_index = {name: n_items + i for i, name in enumerate(self.feature_names)}
+        rows = [
+            feature_index[feature] for feature in self._get_product_features(product)
+            if feature in feature_index
+        ]
+        if not rows:
+            return False
+        
+        # Same row normalization as training, without an identity feature
+        embedding = self.model.item_embeddings[rows].mean(axis=0)
+        bias = self.model.item_biases[rows].mean()
+        
+        # Rows are added before the id, so readers running concurrently
+        # (inference threads) never see an id without its row
+        row = len(self.folded_item_biases)
+        self.folded_item_embeddings = np.vstack([self.folded_item_embeddings, embedding])
+        self.folded_item_biases = np.append(self.folded_item_biases, np.float32(bias))
+        self.folded_product_ids[product_id] = row
+        # Fold-ins are serialized, so only fold_in_user reads these
+        self.folded_item_gram = self.folded_item_gram + np.outer(embedding, embedding)
+        self.folded_item_bias_projection = self.folded_item_bias_projection + embedding * bias
+        return True
+    
     def recommend(
         self,
         user_id: str,
@@ -192,30 +342,53 @@ class HybridRecommendationEngine:
         if self.model is None:
             raise ValueError("Model not trained. Call train() first.")
         
-        if user_id not in self.user_id_map:
+        # Fold-in rows may be appended concurrently; score only rows for these ids
+        folded_ids = list(self.folded_product_ids)
+        folded_embeddings = self.folded_item_embeddings[:len(folded_ids)]
+        folded_biases = self.folded_item_biases[:len(folded_ids)]
+        if item_features_matrix is None:
+            item_features_matrix = self.item_features_matrix
+        
+        folded_user = self.folded_users.get(user_id)
+        if folded_user is not None:
+            # Fold-in user: score the trained item representations directly
+            user_embedding = folded_user
+            user_bias = 0.0
+            item_biases, item_embeddings, _, _ = self._get_fold_in_basis()
+            scores = item_embeddings @ user_embedding + item_biases
+        elif user_id in self.user_ids:
+            user_idx = self.user_ids.index(user_id)
+            user_embedding = self.model.user_embeddings[user_idx]
+            user_bias = self.model.user_biases[user_idx]
+            
+            # Predict scores for all items
+            scores = self.model.predict(
+                user_idx,
+                np.arange(len(self.product_ids)),
+                item_features=item_features_matrix
+            )
+        else:
             return []
         
-        user_idx = self.user_id_map[user_id]
-        
-        # Get all product indices
-        n_items = len(self.product_id_map)
-        
-        # Predict scores for all items
-        scores = self.model.predict(
-            user_idx,
-            np.arange(n_items),
-            item_features=item_features_matrix
-        )
+        # Fold-in items are scored after the trained ones
+        if folded_ids:
+            scores = np.concatenate([
+                scores,
+                folded_embeddings @ user_embedding
+                + folded_biases + user_bias
+            ])
         
         # Get top N recommendations
-        top_indices = np.argsort(-scores)[:n_recommendations]
+        top_indices, top_scores = top_k(scores, n_recommendations)
         
         # Map back to product IDs
-        idx_to_product = {v: k for k, v in self.product_id_map.items()}
+        n_items = len(self.product_ids)
         recommendations = [
-            (idx_to_product[idx], float(scores[idx]))
-            for idx in top_indices
-            if idx in idx_to_product
+            (
+                self.product_ids[idx] if idx < n_items else folded_ids[idx - n_items],
+                float(score)
+            )
+            for idx, score in zip(top_indices, top_scores)
         ]
         
         return recommendations
@@ -237,59 +410,115 @@ class HybridRecommendationEngine:
         Returns:
             List of (product_id, similarity_score) tuples
         """
-        if self.model is None or product_id not in self.product_id_map:
+        if self.model is None:
             return []
         
-        product_idx = self.product_id_map[product_id]
-        
-        # Get item embeddings
-        item_embeddings = self.model.item_embeddings
-        target_embedding = item_embeddings[product_idx]
-        
-        # Calculate similarities
-        from sklearn.metrics.pairwise import cosine_similarity
-        similarities = cosine_similarity(
-            target_embedding.reshape(1, -1),
-            item_embeddings
-        )[0]
-        
-        # Get top N similar items (excluding the item itself)
-        top_indices = np.argsort(-similarities)[1:n_similar+1]
+        # Fold-in rows may be appended concurrently; use only rows for these ids
+        folded_ids = list(self.folded_product_ids)
+        folded_embeddings = self.folded_item_embeddings[:len(folded_ids)]
+        
+        if product_id in self.product_ids:
+            # Cosine similarity over item representations (excluding the item itself)
+            product_idx = self.product_ids.index(product_id)
+            indices, similarities = lookup_neighbors(
+                self.neighbor_table, self.item_index, product_idx, n_similar
+            )
+            query = self._get_fold_in_basis()[1][product_idx]
+            exclude_row = -1
+        elif product_id in self.folded_product_ids:
+            # Fold-in item: search with its metadata embedding
+            exclude_row = self.folded_product_ids[product_id]
+            query = folded_embeddings[exclude_row]
+            indices, similarities = self.item_index.search(query[None, :], n_similar)
+            valid = indices[0] >= 0
+            indices, similarities = indices[0][valid], similarities[0][valid]
+        else:
+            return []
         
-        idx_to_product = {v: k for k, v in self.product_id_map.items()}
         similar_items = [
-            (idx_to_product[idx], float(similarities[idx]))
-            for idx in top_indices
-            if idx in idx_to_product
+            (self.product_ids[idx], float(similarity))
+            for idx, similarity in zip(indices, similarities)
         ]
         
+        # Fold-in items are not in the index: score them exactly, in the
+        # same cosine space, and merge
+        if folded_ids:
+            norms = np.linalg.norm(folded_embeddings, axis=1) * np.linalg.norm(query)
+            folded_similarities = folded_embeddings @ query / np.maximum(norms, 1e-12)
+            if exclude_row >= 0:
+                folded_similarities[exclude_row] = -np.inf
+            top, top_scores = top_k(folded_similarities, n_similar)
+            similar_items += [
+                (folded_ids[row], float(similarity))
+                for row, similarity in zip(top, top_scores)
+                if np.isfinite(similarity)
+            ]
+            similar_items.sort(key=lambda item: item[1], reverse=True)
+            similar_items = similar_items[:n_similar]
+        
         return similar_items
     
-    def save_model(self, filepath: str):
-        """Save trained model to disk"""
-        model_data = {
-            'model': self.model,
-            'dataset': self.dataset,
-            'user_id_map': self.user_id_map,
-            'product_id_map': self.product_id_map,
+    def save_model(self, path: str) -> str:
+        """Save as a memory-mappable artifact; returns the version directory"""
+        arrays = {
+            'user_ids': ids_to_array(self.user_ids),
+            'product_ids': ids_to_array(self.product_ids),
+            'item_features_matrix': self.item_features_matrix
+        }
+        metadata = {
+            'feature_names': self.feature_names,
             'loss': self.loss,
             'learning_rate': self.learning_rate,
             'n_epochs': self.n_epochs,
             'n_components': self.n_components,
-            'trained_at': self.trained_at
+            'random_state': self.random_state,
+            'neighbor_k': self.neighbor_k,
+            'index_space': INDEX_SPACE,
+            'trained_at': format_datetime(self.trained_at)
         }
-        joblib.dump(model_data, filepath)
+        if self.model is not None:
+            arrays.update(prefixed('lightfm', {
+                name: getattr(self.model, name) for name in LIGHTFM_STATE
+            }))
+            metadata['lightfm'] = {
+                key: value for key, value in self.model.get_params().items()
+                if key != 'random_state'
+            }
+            index_arrays, metadata['index'] = self.item_index.to_artifact()
+            arrays.update(index_arrays)
+            arrays.update(self.neighbor_table.to_artifact())
+        return save_artifact(path, ARTIFACT_KIND, arrays, metadata)
     
-    def load_model(self, filepath: str):
-        """Load trained model from disk"""
-        model_data = joblib.load(filepath)
-        self.model = model_data['model']
-        self.dataset = model_data['dataset']
-        self.user_id_map = model_data['user_id_map']
-        self.product_id_map = model_data['product_id_map']
-        self.loss = model_data['loss']
-        self.learning_rate = model_data['learning_rate']
-        self.n_epochs = model_data['n_epochs']
-        self.n_components = model_data['n_components']
-        self.trained_at = model_data['trained_at']
-
+    def load_model(self, path: str):
+        """Load a saved model; arrays are memory-mapped, not copied"""
+        # LightFM's prediction kernels need writable buffers: map copy-on-write,
+        # which still shares the page cache as long as nothing is written
+        artifact = load_artifact(path, ARTIFACT_KIND, mmap_mode='c')
+        metadata = artifact.metadata
+        self.item_features_matrix = artifact['item_features_matrix']
+        self.feature_names = metadata['feature_names']
+        self.user_ids = artifact.registry('user_ids')
+        self.product_ids = artifact.registry('product_ids')
+        self.loss = metadata['loss']
+        self.learning_rate = metadata['learning_rate']
+        self.n_epochs = metadata['n_epochs']
+        self.n_components = metadata['n_components']
+        self.random_state = metadata['random_state']
+        self.neighbor_k = metadata['neighbor_k']
+        self.trained_at = parse_datetime(metadata['trained_at'])
+        
+        self.model = None
+        self.item_index = None
+        self.neighbor_table = None
+        if 'lightfm' in metadata:
+            self.model = LightFM(random_state=self.random_state, **metadata['lightfm'])
+            for name, array in artifact.arrays('lightfm').items():
+                setattr(self.model, name, array)
+            self.item_index = VectorIndex.from_artifact(artifact, metadata['index'])
+            self.neighbor_table = NeighborTable.from_artifact(artifact)
+        
+        self._reset_fold_in()
+        if self.model is not None:
+            self._get_fold_in_basis()
+            if metadata.get('index_space') != INDEX_SPACE:
+                self._build_item_index()
@@ -0,0 +1,63 @@
+"""
+ID Registry
+Constant-time mapping between external string ids and matrix indices
+"""
+import numpy as np
+from typing import Dict, Iterable, Iterator, List
+
+
+class IdRegistry:
+    """
+    Bidirectional id <-> index map built once at train/load time
+
+    Forward lookups (id -> index) go through a dict, reverse lookups
+    (index -> id) through an array, so both are O(1) per id and batches
+    of indices can be mapped back without a Python loop.
+    """
+
+    def __init__(self, ids: Iterable[str] = ()):
+        """
+        Args:
+            ids: Ids in index order (position i maps to index i)
+        """
+        self._ids: List[str] = list(ids)
+        self._index: Dict[str, int] = {id_: i for i, id_ in enumerate(self._ids)}
+        if len(self._index) != len(self._ids):
+            raise ValueError("IdRegistry ids must be unique")
+        self._array = np.array(self._ids, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, id_: str) -> bool:
+        return id_ in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def __getitem__(self, idx: int) -> str:
+        """Id stored at a matrix index"""
+        return self._ids[idx]
+
+    def index(self, id_: str) -> int:
+        """Matrix index of an id (raises KeyError if unknown)"""
+        return self._index[id_]
+
+    def get(self, id_: str, default: int = -1) -> int:
+        """Matrix index of an id, or default if unknown"""
+        return self._index.get(id_, default)
+
+    def indices(self, ids: Iterable[str]) -> np.ndarray:
+        """Matrix indices for a batch of ids (-1 where unknown)"""
+        return np.fromiter(
+            (self._index.get(id_, -1) for id_ in ids),
+            dtype=np.int64
+        )
+
+    def ids_at(self, indices: Iterable[int]) -> List[str]:
+        """Ids for a batch of matrix indices"""
+        return self._array[np.asarray(indices, dtype=np.int64)].tolist()
+
+    def to_list(self) -> List[str]:
+        """Ids in index order, for persistence"""
+        return list(self._ids)
@@ -0,0 +1,433 @@
+"""
+Implicit-Feedback ALS
+Weighted alternating least squares with conjugate-gradient solves (Hu, Koren & Volinsky)
+"""
+import os
+import numpy as np
+from scipy import sparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Optional
+from datetime import datetime
+
+from app.ml.artifacts import (
+    format_datetime,
+    ids_to_array,
+    load_artifact,
+    parse_datetime,
+    save_artifact
+)
+from app.ml.id_registry import IdRegistry
+from app.ml.interactions import InteractionMatrix, interaction_vector, remember_fold_in
+from app.ml.neighbor_table import NeighborTable, lookup_neighbors
+from app.ml.topk import top_k
+from app.ml.vector_index import VectorIndex, build_vector_index
+
+
+ARTIFACT_KIND = 'implicit_als'
+
+
+def _conjugate_gradient_block(
+    confidence: sparse.csr_matrix,
+    fixed: np.ndarray,
+    gram: np.ndarray,
+    factors: np.ndarray,
+    cg_steps: int
+) -> np.ndarray:
+    """
+    Update the factors of a block of rows with a few batched CG steps
+
+    Each row u solves (Y^T Y + lambda I + Y^T (C_u - I) Y) x_u = Y^T C_u p_u
+    where only the observed entries of row u contribute to the
+    (C_u - I) term, so the cost is O(nnz * k) per step rather than
+    O(n_items * k). All rows of the block iterate together.
+
+    Args:
+        confidence: Block rows of alpha * r (the C - I part), CSR
+        fixed: Factors of the other side, shape (n_cols, k)
+        gram: Y^T Y + lambda I, shape (k, k)
+        factors: Current factors of the block rows (warm start), shape (n_rows, k)
+        cg_steps: Conjugate-gradient iterations
+
+    Returns:
+        Updated factors for the block rows
+    """
+    rows = np.repeat(np.arange(confidence.shape[0]), np.diff(confidence.indptr))
+    observed = fixed[confidence.indices]
+
+    def apply(x: np.ndarray) -> np.ndarray:
+        weights = np.einsum('ij,ij->i', observed, x[rows]) * confidence.data
+        correction = sparse.csr_matrix(
+            (weights, confidence.indices, confidence.indptr),
+            shape=confidence.shape
+        )
+        return x @ gram + correction @ fixed
+
+    # Y^T C_u p_u: observed items weighted by their confidence 1 + alpha * r
+    targets = sparse.csr_matrix(
+        (confidence.data + 1, confidence.indices, confidence.indptr),
+        shape=confidence.shape
+    ) @ fixed
+
+    x = factors.copy()
+    residual = targets - apply(x)
+    direction = residual.copy()
+    residual_norm = np.einsum('ij,ij->i', residual, residual)
+
+    for _ in range(cg_steps):
+        if residual_norm.max(initial=0) < 1e-10:
+            break
+        applied = apply(direction)
+        curvature = np.einsum('ij,ij->i', direction, applied)
+        step = np.divide(
+            residual_norm, curvature,
+            out=np.zeros_like(residual_norm), where=curvature > 0
+        )
+        x += step[:, None] * direction
+        residual -= step[:, None] * applied
+        new_norm = np.einsum('ij,ij->i', residual, residual)
+        ratio = np.divide(
+            new_norm, residual_norm,
+            out=np.zeros_like(new_norm), where=residual_norm > 0
+        )
+        direction = residual + ratio[:, None] * direction
+        residual_norm = new_norm
+
+    return x
+
+
+class ImplicitALSEngine:
+    """
+    Implicit-feedback matrix factorization trained with weighted ALS
+
+    Interaction weights are read as confidence (1 + alpha * r) in a
+    binary preference, so unobserved pairs are weak negatives instead of
+    explicit zero ratings. Works directly on the sparse CSR matrix.
+    """
+
+    def __init__(
+        self,
+        n_factors: int = 64,
+        regularization: float = 0.01,
+        alpha: float = 10.0,
+        iterations: int = 15,
+        warm_start_iterations: int = 5,
+        cg_steps: int = 3,
+        n_threads: int = 0,
+        block_size: int = 4096,
+        random_state: int = 42,
+        index_params: Optional[Dict] = None,
+        neighbor_k: int = 50,
+        max_folded_users: int = 100000
+    ):
+        """
+        Initialize the ALS engine
+
+        Args:
+            n_factors: Number of latent factors
+            regularization: L2 penalty (lambda) on the factors
+            alpha: Confidence scale applied to interaction weights
+            iterations: ALS sweeps when training from scratch
+            warm_start_iterations: ALS sweeps when starting from previous factors
+            cg_steps: Conjugate-gradient steps per solve
+            n_threads: Worker threads for the row solves (0 = all cores)
+            block_size: Rows solved together per CG batch
+            random_state: Random seed for factor initialisation
+            index_params: Options for the similar-items vector index
+            neighbor_k: Similar items precomputed per product
+            max_folded_users: Fold-in users kept until the next retrain
+        """
+        self.n_factors = n_factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.warm_start_iterations = warm_start_iterations
+        self.cg_steps = cg_steps
+        self.n_threads = n_threads
+        self.block_size = block_size
+        self.random_state = random_state
+        self.index_params = index_params or {}
+        self.neighbor_k = neighbor_k
+        self.max_folded_users = max_folded_users
+
+        self.user_item_matrix = None
+        self.user_ids = IdRegistry()
+        self.product_ids = IdRegistry()
+        self.user_factors = None
+        self.item_factors = None
+        self.item_index = None
+        self.neighbor_table = None
+        self.trained_at = None
+        # Users solved against the item factors since training: id -> (factors, items)
+        self.folded_users: Dict[str, Tuple[np.ndarray, np.ndarray]] = OrderedDict()
+        # YᵀY + λI over the item factors, shared by every fold-in solve
+        self.fold_in_gram: Optional[np.ndarray] = None
+
+    def _init_factors(
+        self,
+        ids: IdRegistry,
+        rng: np.random.Generator,
+        previous_ids: Optional[List[str]] = None,
+        previous_factors: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Random factors, copying previous factors for ids seen before
+
+        Returns:
+            Tuple of (factors, number of warm-started rows)
+        """
+        factors = rng.normal(0, 0.01, (len(ids), self.n_factors)).astype(np.float32)
+        if previous_factors is None or previous_factors.shape[1] != self.n_factors:
+            return factors, 0
+
+        previous = np.asarray(previous_factors, dtype=np.float32)
+        rows = ids.indices(previous_ids)
+        known = rows >= 0
+        factors[rows[known]] = previous[known]
+        return factors, int(known.sum())
+
+    def _solve(
+        self,
+        confidence: sparse.csr_matrix,
+        fixed: np.ndarray,
+        factors: np.ndarray,
+        executor: Optional[ThreadPoolExecutor]
+    ) -> np.ndarray:
+        """One half-sweep: refit every row of `factors` against `fixed`"""
+        gram = fixed.T @ fixed + self.regularization * np.eye(self.n_factors, dtype=np.float32)
+        starts = range(0, confidence.shape[0], self.block_size)
+
+        def solve_block(start: int) -> np.ndarray:
+            end = min(start + self.block_size, confidence.shape[0])
+            return _conjugate_gradient_block(
+                confidence[start:end], fixed, gram, factors[start:end], self.cg_steps
+            )
+
+        blocks = executor.map(solve_block, starts) if executor else map(solve_block, starts)
+        return np.vstack(list(blocks)) if len(starts) else factors
+
+    def train(
+        self,
+        interaction_matrix: InteractionMatrix,
+        warm_start: Optional[Dict] = None
+    ):
+        """
+        Fit user and item factors with alternating CG solves
+
+        Args:
+            interaction_matrix: Sparse user-item interaction matrix
+            warm_start: Previous factors from warm_start_state(); rows for
+                ids seen before start from their old values and fewer
+                sweeps are run
+        """
+        self.user_item_matrix = interaction_matrix.matrix
+        self.user_ids = interaction_matrix.user_ids
+        self.product_ids = interaction_matrix.product_ids
+        warm_start = warm_start or {}
+
+        rng = np.random.default_rng(self.random_state)
+        self.user_factors, warm_users = self._init_factors(
+            self.user_ids, rng,
+            warm_start.get('user_ids'), warm_start.get('user_factors')
+        )
+        self.item_factors, warm_items = self._init_factors(
+            self.product_ids, rng,
+            warm_start.get('product_ids'), warm_start.get('item_factors')
+        )
+        iterations = self.warm_start_iterations if warm_users or warm_items else self.iterations
+
+        confidence = self.user_item_matrix.astype(np.float32) * self.alpha
+        confidence_t = confidence.T.tocsr()
+
+        n_threads = self.n_threads or os.cpu_count() or 1
+        executor = ThreadPoolExecutor(max_workers=n_threads) if n_threads > 1 else None
+        try:
+            for _ in range(iterations):
+                self.user_factors = self._solve(
+                    confidence, self.item_factors, self.user_factors, executor
+                )
+                self.item_factors = self._solve(
+                    confidence_t, self.user_factors, self.item_factors, executor
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.item_index = build_vector_index(self.item_factors, **self.index_params)
+        self.neighbor_table = NeighborTable.build(self.item_index, self.neighbor_k)
+        self.folded_users = OrderedDict()
+        self._build_fold_in_gram()
+
+        self.trained_at = datetime.utcnow()
+
+    def _build_fold_in_gram(self):
+        """Precompute the item-only part of the fold-in normal equations"""
+        item_factors = np.asarray(self.item_factors, dtype=np.float64)
+        self.fold_in_gram = (
+            item_factors.T @ item_factors + self.regularization * np.eye(self.n_factors)
+        )
+
+    def warm_start_state(self) -> Optional[Dict]:
+        """Factors and ids to warm-start the next training run from"""
+        if self.user_factors is None:
+            return None
+        return {
+            'user_ids': self.user_ids.to_list(),
+            'product_ids': self.product_ids.to_list(),
+            'user_factors': np.asarray(self.user_factors),
+            'item_factors': np.asarray(self.item_factors)
+        }
+
+    def fold_in_user(self, user_id: str, interactions: List[dict]) -> bool:
+        """
+        Solve a user's factors against the fixed item factors
+
+        This is exactly the ALS user update, done with a direct
+        n_factors-sized solve, so new users are served immediately. YᵀY + λI
+        is precomputed at train/load time, so a fold-in costs
+        O(n_user_items·k² + k³) however large the catalog is.
+
+        Args:
+            user_id: User ID (new or already trained)
+            interactions: All of the user's interactions
+
+        Returns:
+            True if the user now has fold-in factors
+        """
+        if self.item_factors is None:
+            return False
+
+        items, weights = interaction_vector(interactions, self.product_ids)
+        if len(items) == 0:
+            return False
+
+        if self.fold_in_gram is None:
+            self._build_fold_in_gram()
+        observed = np.asarray(self.item_factors[items], dtype=np.float64)
+        confidence = self.alpha * weights
+        # Only the user's observed items add to the shared YᵀY + λI
+        lhs = self.fold_in_gram + (observed.T * confidence) @ observed
+        rhs = (confidence + 1) @ observed
+        factors = np.linalg.solve(lhs, rhs).astype(np.float32)
+        remember_fold_in(self.folded_users, user_id, (factors, items), self.max_folded_users)
+        return True
+
+    def _user_state(self, user_id: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Factors and interacted item indices of a user, fold-ins first"""
+        folded = self.folded_users.get(user_id)
+        if folded is not None:
+            return folded
+        user_idx = self.user_ids.get(user_id)
+        if user_idx < 0:
+            return None
+        start, end = self.user_item_matrix.indptr[user_idx:user_idx + 2]
+        return self.user_factors[user_idx], self.user_item_matrix.indices[start:end]
+
+    def recommend(
+        self,
+        user_id: str,
+        n_recommendations: int = 10,
+        exclude_interacted: bool = True
+    ) -> List[Tuple[str, float]]:
+        """
+        Generate recommendations from the ALS factors
+
+        Args:
+            user_id: Target user ID
+            n_recommendations: Number of recommendations
+            exclude_interacted: Exclude items user has already interacted with
+
+        Returns:
+            List of (product_id, preference_score) tuples
+        """
+        if self.item_factors is None:
+            raise ValueError("Model not trained. Call train() first.")
+
+        user_state = self._user_state(user_id)
+        if user_state is None:
+            return []
+
+        user_factors, interacted = user_state
+        scores = self.item_factors @ user_factors
+
+        top_indices, top_scores = top_k(
+            scores, n_recommendations,
+            exclude=interacted if exclude_interacted else None
+        )
+        return [
+            (self.product_ids[idx], float(score))
+            for idx, score in zip(top_indices, top_scores)
+            if score > 0
+        ]
+
+    def get_similar_items(
+        self,
+        product_id: str,
+        n_similar: int = 10
+    ) -> List[Tuple[str, float]]:
+        """
+        Find similar items by cosine similarity of item factors
+
+        Args:
+            product_id: Target product ID
+            n_similar: Number of similar items to return
+
+        Returns:
+            List of (product_id, similarity_score) tuples
+        """
+        if self.item_index is None or product_id not in self.product_ids:
+            return []
+
+        product_idx = self.product_ids.index(product_id)
+        indices, similarities = lookup_neighbors(
+            self.neighbor_table, self.item_index, product_idx, n_similar
+        )
+        return [
+            (self.product_ids[idx], float(similarity))
+            for idx, similarity in zip(indices, similarities)
+        ]
+
+    def save_model(self, path: str) -> str:
+        """Save factors as a memory-mappable artifact; returns the version directory"""
+        arrays = {
+            'user_ids': ids_to_array(self.user_ids),
+            'product_ids': ids_to_array(self.product_ids),
+            'user_item_matrix': self.user_item_matrix,
+            'user_factors': self.user_factors,
+            'item_factors': self.item_factors
+        }
+        metadata = {
+            'n_factors': self.n_factors,
+            'regularization': self.regularization,
+            'alpha': self.alpha,
+            'neighbor_k': self.neighbor_k,
+            'trained_at': format_datetime(self.trained_at)
+        }
+        if self.item_index is not None:
+            index_arrays, metadata['index'] = self.item_index.to_artifact()
+            arrays.update(index_arrays)
+            arrays.update(self.neighbor_table.to_artifact())
+        return save_artifact(path, ARTIFACT_KIND, arrays, metadata)
+
+    def load_model(self, path: str):
+        """Load saved factors; arrays are memory-mapped, not copied"""
+        artifact = load_artifact(path, ARTIFACT_KIND)
+        metadata = artifact.metadata
+        self.user_item_matrix = artifact['user_item_matrix']
+        self.user_ids = artifact.registry('user_ids')
+        self.product_ids = artifact.registry('product_ids')
+        self.user_factors = artifact['user_factors']
+        self.item_factors = artifact['item_factors']
+        self.n_factors = metadata['n_factors']
+        self.regularization = metadata['regularization']
+        self.alpha = metadata['alpha']
+        self.neighbor_k = metadata['neighbor_k']
+        self.trained_at = parse_datetime(metadata['trained_at'])
+        self.folded_users = OrderedDict()
+        self._build_fold_in_gram()
+
+        self.item_index = None
+        self.neighbor_table = None
+        if 'index' in metadata:
+            self.item_index = VectorIndex.from_artifact(artifact, metadata['index'])
+            self.neighbor_table = NeighborTable.from_artifact(artifact)
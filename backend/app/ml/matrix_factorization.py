@@ -3,12 +3,32 @@ Matrix Factorization for Recommendations
 Implements SVD (Singular Value Decomposition) for latent feature extraction
 """
 import numpy as np
-import pandas as pd
 from sklearn.decomposition import TruncatedSVD
-from typing import List, Tuple, Optional
-import joblib
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 
+from app.ml.artifacts import (
+    format_datetime,
+    ids_to_array,
+    load_artifact,
+    parse_datetime,
+    save_artifact
+)
+from app.ml.id_registry import IdRegistry
+from app.ml.interactions import (
+    InteractionMatrix,
+    build_interaction_matrix,
+    interaction_vector,
+    remember_fold_in
+)
+from app.ml.neighbor_table import NeighborTable, lookup_neighbors
+from app.ml.topk import top_k
+from app.ml.vector_index import VectorIndex, build_vector_index
+
+
+ARTIFACT_KIND = 'matrix_factorization'
+
 
 class MatrixFactorizationEngine:
     """
@@ -16,25 +36,42 @@ class MatrixFactorizationEngine:
     Decomposes user-item matrix into latent factors
     """
     
-    def __init__(self, n_factors: int = 50, random_state: int = 42):
+    def __init__(
+        self,
+        n_factors: int = 50,
+        random_state: int = 42,
+        index_params: Optional[Dict] = None,
+        neighbor_k: int = 50,
+        max_folded_users: int = 100000
+    ):
         """
         Initialize matrix factorization engine
         
         Args:
             n_factors: Number of latent factors
             random_state: Random seed for reproducibility
+            index_params: Options for the similar-items vector index
+            neighbor_k: Similar items precomputed per product
+            max_folded_users: Fold-in users kept until the next retrain
         """
         self.n_factors = n_factors
         self.random_state = random_state
+        self.index_params = index_params or {}
+        self.neighbor_k = neighbor_k
+        self.max_folded_users = max_folded_users
         self.model = None
         self.user_item_matrix = None
-        self.user_ids = []
-        self.product_ids = []
+        self.user_ids = IdRegistry()
+        self.product_ids = IdRegistry()
         self.user_features = None
         self.item_features = None
+        self.item_index = None
+        self.neighbor_table = None
         self.trained_at = None
+        # Users projected onto the factors since training: id -> (factors, items)
+        self.folded_users: Dict[str, Tuple[np.ndarray, np.ndarray]] = OrderedDict()
         
-    def prepare_data(self, interactions: List[dict]) -> pd.DataFrame:
+    def prepare_data(self, interactions: List[dict]) -> InteractionMatrix:
         """
         Prepare interaction matrix from raw data
         
@@ -42,47 +79,20 @@ class MatrixFactorizationEngine:
             interactions: List of interaction dictionaries
             
         Returns:
-            User-item matrix DataFrame
+            Sparse user-item InteractionMatrix
         """
-        df = pd.DataFrame(interactions)
-        
-        # Weight different interaction types
-        interaction_weights = {
-            'view': 1.0,
-            'click': 1.5,
-            'add_to_cart': 3.0,
-            'wishlist': 2.5,
-            'purchase': 5.0,
-            'review': 4.0
-        }
-        
-        df['weighted_rating'] = df.apply(
-            lambda row: interaction_weights.get(row['interaction_type'], 1.0) * 
-                       (row.get('rating', 3.0) / 3.0),
-            axis=1
-        )
-        
-        # Create user-item matrix
-        user_item_matrix = df.pivot_table(
-            index='user_id',
-            columns='product_id',
-            values='weighted_rating',
-            aggfunc='mean',
-            fill_value=0
-        )
-        
-        return user_item_matrix
+        return build_interaction_matrix(interactions)
     
-    def train(self, user_item_matrix: pd.DataFrame):
+    def train(self, interaction_matrix: InteractionMatrix):
         """
         Train SVD model on user-item matrix
         
         Args:
-            user_item_matrix: User-item interaction matrix
+            interaction_matrix: Sparse user-item interaction matrix
         """
-        self.user_item_matrix = user_item_matrix
-        self.user_ids = user_item_matrix.index.tolist()
-        self.product_ids = user_item_matrix.columns.tolist()
+        self.user_item_matrix = interaction_matrix.matrix
+        self.user_ids = interaction_matrix.user_ids
+        self.product_ids = interaction_matrix.product_ids
         
         # Apply SVD
         n_components = min(
@@ -95,12 +105,54 @@ class MatrixFactorizationEngine:
             random_state=self.random_state
         )
         
-        # Fit and transform
-        self.user_features = self.model.fit_transform(user_item_matrix.values)
+        # Fit and transform (TruncatedSVD works on the sparse matrix directly)
+        self.user_features = self.model.fit_transform(self.user_item_matrix)
         self.item_features = self.model.components_.T
+        self.item_index = build_vector_index(self.item_features, **self.index_params)
+        self.neighbor_table = NeighborTable.build(self.item_index, self.neighbor_k)
+        self.folded_users = OrderedDict()
         
         self.trained_at = datetime.utcnow()
         
+    def fold_in_user(self, user_id: str, interactions: List[dict]) -> bool:
+        """
+        Project a user's interactions onto the trained item factors
+        
+        The item factors have orthonormal columns, so x @ V is the
+        least-squares fit of the interaction row x, and is exactly what
+        training computes for users it has seen. New users become
+        servable immediately and known users pick up fresh interactions,
+        at O(|interactions| * n_factors) cost.
+        
+        Args:
+            user_id: User ID (new or already trained)
+            interactions: All of the user's interactions
+            
+        Returns:
+            True if the user now has fold-in factors
+        """
+        if self.item_features is None:
+            return False
+        
+        items, weights = interaction_vector(interactions, self.product_ids)
+        if len(items) == 0:
+            return False
+        
+        factors = weights @ self.item_features[items]
+        remember_fold_in(self.folded_users, user_id, (factors, items), self.max_folded_users)
+        return True
+    
+    def _user_state(self, user_id: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Latent factors and interacted item indices of a user, fold-ins first"""
+        folded = self.folded_users.get(user_id)
+        if folded is not None:
+            return folded
+        user_idx = self.user_ids.get(user_id)
+        if user_idx < 0:
+            return None
+        start, end = self.user_item_matrix.indptr[user_idx:user_idx + 2]
+        return self.user_features[user_idx], self.user_item_matrix.indices[start:end]
+    
     def predict_rating(self, user_id: str, product_id: str) -> float:
         """
         Predict rating for a user-product pair
@@ -112,14 +164,14 @@ class MatrixFactorizationEngine:
         Returns:
             Predicted rating
         """
-        if user_id not in self.user_ids or product_id not in self.product_ids:
+        user_state = self._user_state(user_id)
+        if user_state is None or product_id not in self.product_ids:
             return 0.0
         
-        user_idx = self.user_ids.index(user_id)
         product_idx = self.product_ids.index(product_id)
         
         # Dot product of user and item latent features
-        rating = np.dot(self.user_features[user_idx], self.item_features[product_idx])
+        rating = np.dot(user_state[0], self.item_features[product_idx])
         
         return float(rating)
     
@@ -140,32 +192,27 @@ class MatrixFactorizationEngine:
         Returns:
             List of (product_id, predicted_rating) tuples
         """
-        if self.model is None:
+        if self.item_features is None:
             raise ValueError("Model not trained. Call train() first.")
         
-        if user_id not in self.user_ids:
+        user_state = self._user_state(user_id)
+        if user_state is None:
             return []
         
-        user_idx = self.user_ids.index(user_id)
+        user_factors, interacted = user_state
         
         # Calculate predicted ratings for all items
-        predicted_ratings = np.dot(
-            self.user_features[user_idx],
-            self.item_features.T
-        )
+        predicted_ratings = np.dot(user_factors, self.item_features.T)
         
         # Exclude already interacted items if requested
-        if exclude_interacted:
-            user_interactions = self.user_item_matrix.iloc[user_idx]
-            interacted_indices = np.where(user_interactions > 0)[0]
-            predicted_ratings[interacted_indices] = -np.inf
+        exclude = interacted if exclude_interacted else None
         
         # Get top N recommendations
-        top_indices = np.argsort(predicted_ratings)[::-1][:n_recommendations]
+        top_indices, top_scores = top_k(predicted_ratings, n_recommendations, exclude=exclude)
         recommendations = [
-            (self.product_ids[idx], float(predicted_ratings[idx]))
-            for idx in top_indices
-            if predicted_ratings[idx] > 0
+            (self.product_ids[idx], float(score))
+            for idx, score in zip(top_indices, top_scores)
+            if score > 0
         ]
         
         return recommendations
@@ -188,45 +235,56 @@ class MatrixFactorizationEngine:
         if product_id not in self.product_ids:
             return []
         
+        # Cosine similarity search over item factors (excluding the item itself)
         product_idx = self.product_ids.index(product_id)
-        product_vector = self.item_features[product_idx].reshape(1, -1)
-        
-        # Calculate cosine similarities
-        from sklearn.metrics.pairwise import cosine_similarity
-        similarities = cosine_similarity(product_vector, self.item_features)[0]
+        indices, similarities = lookup_neighbors(
+            self.neighbor_table, self.item_index, product_idx, n_similar
+        )
         
-        # Get top N similar items (excluding the item itself)
-        similar_indices = np.argsort(similarities)[::-1][1:n_similar+1]
         similar_items = [
-            (self.product_ids[idx], float(similarities[idx]))
-            for idx in similar_indices
+            (self.product_ids[idx], float(similarity))
+            for idx, similarity in zip(indices, similarities)
         ]
         
         return similar_items
     
-    def save_model(self, filepath: str):
-        """Save trained model to disk"""
-        model_data = {
-            'model': self.model,
+    def save_model(self, path: str) -> str:
+        """Save factors as a memory-mappable artifact; returns the version directory"""
+        arrays = {
+            'user_ids': ids_to_array(self.user_ids),
+            'product_ids': ids_to_array(self.product_ids),
             'user_item_matrix': self.user_item_matrix,
-            'user_ids': self.user_ids,
-            'product_ids': self.product_ids,
             'user_features': self.user_features,
-            'item_features': self.item_features,
+            'item_features': self.item_features
+        }
+        metadata = {
             'n_factors': self.n_factors,
-            'trained_at': self.trained_at
+            'neighbor_k': self.neighbor_k,
+            'trained_at': format_datetime(self.trained_at)
         }
-        joblib.dump(model_data, filepath)
+        if self.item_index is not None:
+            index_arrays, metadata['index'] = self.item_index.to_artifact()
+            arrays.update(index_arrays)
+            arrays.update(self.neighbor_table.to_artifact())
+        return save_artifact(path, ARTIFACT_KIND, arrays, metadata)
     
-    def load_model(self, filepath: str):
-        """Load trained model from disk"""
-        model_data = joblib.load(filepath)
-        self.model = model_data['model']
-        self.user_item_matrix = model_data['user_item_matrix']
-        self.user_ids = model_data['user_ids']
-        self.product_ids = model_data['product_ids']
-        self.user_features = model_data['user_features']
-        self.item_features = model_data['item_features']
-        self.n_factors = model_data['n_factors']
-        self.trained_at = model_data['trained_at']
-
+    def load_model(self, path: str):
+        """Load saved factors; arrays are memory-mapped, not copied"""
+        artifact = load_artifact(path, ARTIFACT_KIND)
+        metadata = artifact.metadata
+        self.model = None  # The SVD estimator is only needed for training
+        self.user_item_matrix = artifact['user_item_matrix']
+        self.user_ids = artifact.registry('user_ids')
+        self.product_ids = artifact.registry('product_ids')
+        self.user_features = artifact['user_features']
+        self.item_features = artifact['item_features']
+        self.n_factors = metadata['n_factors']
+        self.neighbor_k = metadata['neighbor_k']
+        self.trained_at = parse_datetime(metadata['trained_at'])
+        self.folded_users = OrderedDict()
+        
+        self.item_index = None
+        self.neighbor_table = None
+        if 'index' in metadata:
+            self.item_index = VectorIndex.from_artifact(artifact, metadata['index'])
+            self.neighbor_table = NeighborTable.from_artifact(artifact)
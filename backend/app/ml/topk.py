@@ -0,0 +1,88 @@
+"""
+Top-K Selection
+argpartition-based top-k over score vectors and score matrices
+"""
+import numpy as np
+from scipy import sparse
+from typing import Tuple
+
+
+def _exclude(scores: np.ndarray, exclude) -> np.ndarray:
+    """Copy of scores with excluded entries set to -inf"""
+    scores = np.array(scores, dtype=np.result_type(scores.dtype, np.float32))
+    if sparse.issparse(exclude):
+        exclude = exclude.tocsr()
+        rows = np.repeat(np.arange(exclude.shape[0]), np.diff(exclude.indptr))
+        scores[rows, exclude.indices] = -np.inf
+    else:
+        exclude = np.asarray(exclude)
+        if exclude.dtype == bool:
+            scores[exclude] = -np.inf
+        else:
+            scores[..., exclude] = -np.inf
+    return scores
+
+
+def _top_k_1d(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top k of a vector, ties broken by lower index"""
+    n = scores.shape[0]
+    if k < n:
+        kth = scores[np.argpartition(-scores, k - 1)[:k]].min()
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.argsort(-scores[candidates], kind='stable')[:k]
+    top = candidates[order]
+    return top, scores[top]
+
+
+def top_k(
+    scores: np.ndarray,
+    k: int,
+    exclude=None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices and values of the k largest scores, best first
+
+    Works on a 1-D score vector or row-wise on a 2-D score matrix. Only
+    the k winners are sorted, so selecting a top-10 from m items costs
+    O(m) rather than the O(m log m) of a full argsort. Equal scores are
+    ordered by lower index, so results are deterministic.
+
+    Args:
+        scores: Score vector (m,) or matrix (n_rows, m)
+        k: Number of entries to select (capped at m)
+        exclude: Entries to leave out: a boolean mask shaped like scores,
+            an index array (1-D), or a sparse matrix of row-wise
+            exclusions (2-D). Excluded entries score -inf.
+
+    Returns:
+        Tuple of (indices, values) shaped (k,) or (n_rows, k)
+    """
+    scores = np.asarray(scores)
+    if exclude is not None:
+        scores = _exclude(scores, exclude)
+
+    k = max(0, min(k, scores.shape[-1]))
+    if k == 0:
+        shape = scores.shape[:-1] + (0,)
+        return np.empty(shape, dtype=np.int64), np.empty(shape, dtype=scores.dtype)
+
+    if scores.ndim == 1:
+        return _top_k_1d(scores, k)
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(scores, top, axis=1)
+
+    # Order the k winners by score, then by index
+    order = np.lexsort((top, -values), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+
+    # Rows where equal scores straddle the cut-off need the exact tie-break
+    kth = values[:, -1]
+    tied_rows = np.flatnonzero((scores >= kth[:, None]).sum(axis=1) > k)
+    for row in tied_rows:
+        top[row], values[row] = _top_k_1d(scores[row], k)
+
+    return top, values
@@ -0,0 +1,340 @@
+"""
+Vector Index for Similar-Item Lookups
+Exact blocked brute-force search and an approximate IVF index (pure numpy)
+"""
+import abc
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from typing import Optional, Tuple
+
+from app.ml.artifacts import ModelArtifact, prefixed
+from app.ml.topk import top_k
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block_size: int = 65536) -> np.ndarray:
+    """Closest centroid for each vector, computed in blocks"""
+    return np.concatenate([
+        np.argmax(vectors[start:start + block_size] @ centroids.T, axis=1)
+        for start in range(0, vectors.shape[0], block_size)
+    ]) if vectors.shape[0] else np.empty(0, dtype=np.int64)
+
+
+def _pad(indices: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pad results to k columns with index -1 / score -inf"""
+    missing = k - indices.shape[1]
+    if missing <= 0:
+        return indices, scores
+    return (
+        np.pad(indices, ((0, 0), (0, missing)), constant_values=-1),
+        np.pad(scores, ((0, 0), (0, missing)), constant_values=-np.inf)
+    )
+
+
+class VectorIndex(abc.ABC):
+    """
+    Cosine-similarity index over item vectors
+
+    Subclasses implement build() and search(). Results are returned as
+    (indices, scores) arrays of shape (n_queries, k), best match first,
+    padded with index -1 when fewer than k candidates exist.
+    """
+
+    kind = None
+
+    def __init__(self):
+        self.vectors = None
+
+    def __len__(self) -> int:
+        return 0 if self.vectors is None else self.vectors.shape[0]
+
+    @abc.abstractmethod
+    def build(self, vectors) -> 'VectorIndex':
+        """Index vectors (dense or sparse, shape (n_items, dim)); returns self"""
+
+    @abc.abstractmethod
+    def search(
+        self,
+        queries,
+        k: int,
+        exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k most similar items for each query vector
+
+        Args:
+            queries: Query vectors, shape (n_queries, dim)
+            k: Number of neighbours per query
+            exclude: Optional item index per query to leave out (-1 for none)
+
+        Returns:
+            Tuple of (indices, scores)
+        """
+
+    def search_items(self, item_indices, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Neighbours of indexed items, excluding each item itself"""
+        item_indices = np.atleast_1d(np.asarray(item_indices, dtype=np.int64))
+        return self.search(self.vectors[item_indices], k, exclude=item_indices)
+
+    def exact(self) -> 'VectorIndex':
+        """Exact index over the same vectors (for offline builds that need full recall)"""
+        return BruteForceIndex().build(self.vectors)
+
+    @abc.abstractmethod
+    def _arrays(self) -> dict:
+        """Arrays to store in a model artifact"""
+
+    @abc.abstractmethod
+    def _params(self) -> dict:
+        """Constructor arguments to store in the artifact metadata"""
+
+    @abc.abstractmethod
+    def _load_arrays(self, arrays: dict):
+        """Restore the arrays returned by _arrays()"""
+
+    def to_artifact(self, prefix: str = 'index') -> Tuple[dict, dict]:
+        """
+        Arrays and metadata for storing the index in a model artifact
+
+        Args:
+            prefix: Namespace for the index arrays inside the artifact
+
+        Returns:
+            Tuple of (arrays, metadata)
+        """
+        return prefixed(prefix, self._arrays()), {'kind': self.kind, **self._params()}
+
+    @staticmethod
+    def from_artifact(artifact: ModelArtifact, metadata: dict, prefix: str = 'index') -> 'VectorIndex':
+        """Rebuild an index stored with to_artifact() (arrays stay memory-mapped)"""
+        params = dict(metadata)
+        index = INDEX_TYPES[params.pop('kind')](**params)
+        index._load_arrays(artifact.arrays(prefix))
+        return index
+
+
+class BruteForceIndex(VectorIndex):
+    """
+    Exact cosine search in blocks of queries
+    Accepts dense or scipy sparse vectors
+    """
+
+    kind = 'exact'
+
+    def __init__(self, block_size: int = 1024, max_block_scores: int = 1 << 24):
+        """
+        Args:
+            block_size: Maximum number of queries scored per matrix product
+            max_block_scores: Cap on the size of one block's score matrix
+        """
+        super().__init__()
+        self.block_size = block_size
+        self.max_block_scores = max_block_scores
+
+    def build(self, vectors) -> 'BruteForceIndex':
+        if sparse.issparse(vectors):
+            self.vectors = normalize(sparse.csr_matrix(vectors, dtype=np.float32))
+        else:
+            self.vectors = normalize(np.asarray(vectors, dtype=np.float32))
+        return self
+
+    def exact(self) -> 'BruteForceIndex':
+        return self
+
+    def search(
+        self,
+        queries,
+        k: int,
+        exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        queries = normalize(queries)
+        indices, scores = [], []
+        block_size = max(1, min(self.block_size, self.max_block_scores // max(1, len(self))))
+
+        for start in range(0, queries.shape[0], block_size):
+            block = queries[start:start + block_size]
+            block_scores = self.vectors @ block.T
+            if sparse.issparse(block_scores):
+                block_scores = block_scores.toarray()
+            block_scores = np.asarray(block_scores, dtype=np.float32).T
+
+            if exclude is not None:
+                block_exclude = exclude[start:start + block_size]
+                rows = np.nonzero(block_exclude >= 0)[0]
+                block_scores[rows, block_exclude[rows]] = -np.inf
+
+            top, top_scores = top_k(block_scores, k)
+            indices.append(top)
+            scores.append(top_scores)
+
+        indices, scores = np.vstack(indices), np.vstack(scores)
+        dropped = ~np.isfinite(scores)
+        indices[dropped] = -1
+        return _pad(indices, scores, k)
+
+    def _arrays(self) -> dict:
+        return {'vectors': self.vectors}
+
+    def _params(self) -> dict:
+        return {'block_size': self.block_size, 'max_block_scores': self.max_block_scores}
+
+    def _load_arrays(self, arrays: dict):
+        self.vectors = arrays['vectors']
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file approximate index
+
+    Items are clustered with spherical k-means; a query is scored exactly
+    against the items of its n_probe closest clusters only. n_lists and
+    n_probe trade recall for latency: probing more lists raises recall,
+    and n_probe == n_lists is an exact search.
+    """
+
+    kind = 'ivf'
+
+    def __init__(
+        self,
+        n_lists: int = 0,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        sample_per_list: int = 64,
+        random_state: int = 42
+    ):
+        """
+        Args:
+            n_lists: Number of clusters (0 picks ~sqrt(n_items))
+            n_probe: Number of clusters scanned per query
+            n_iter: K-means iterations at build time
+            sample_per_list: Training sample size per cluster for k-means
+            random_state: Random seed for centroid initialisation
+        """
+        super().__init__()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.sample_per_list = sample_per_list
+        self.random_state = random_state
+        self.centroids = None
+        self.list_offsets = None
+        self.list_items = None
+
+    def build(self, vectors) -> 'IVFIndex':
+        self.vectors = normalize(np.asarray(vectors, dtype=np.float32))
+        n_items = self.vectors.shape[0]
+        n_lists = self.n_lists or int(np.sqrt(n_items))
+        n_lists = max(1, min(n_lists, n_items))
+
+        # Spherical k-means on a sample of the items
+        rng = np.random.default_rng(self.random_state)
+        n_sample = min(n_items, n_lists * self.sample_per_list)
+        sample = self.vectors[rng.choice(n_items, n_sample, replace=False)]
+        centroids = sample[rng.choice(n_sample, n_lists, replace=False)]
+
+        for _ in range(self.n_iter):
+            assignments = _assign(sample, centroids)
+            membership = sparse.csr_matrix(
+                (np.ones(n_sample, dtype=np.float32), (assignments, np.arange(n_sample))),
+                shape=(n_lists, n_sample)
+            )
+            sums = np.asarray(membership @ sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]  # Keep empty clusters where they were
+            centroids = normalize(sums)
+
+        assignments = _assign(self.vectors, centroids)
+        self.centroids = centroids
+        self.n_lists = n_lists
+        self.list_items = np.argsort(assignments, kind='stable').astype(np.int32)
+        self.list_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignments, minlength=n_lists))]
+        ).astype(np.int64)
+        return self
+
+    def search(
+        self,
+        queries,
+        k: int,
+        exclude: Optional[np.ndarray] = None,
+        n_probe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate search; n_probe overrides the index default per call
+        """
+        queries = normalize(np.asarray(queries, dtype=np.float32))
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probes, _ = top_k(queries @ self.centroids.T, n_probe)
+
+        indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+
+        for row, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([
+                self.list_items[self.list_offsets[l]:self.list_offsets[l + 1]]
+                for l in lists
+            ])
+            if exclude is not None and exclude[row] >= 0:
+                candidates = candidates[candidates != exclude[row]]
+            if len(candidates) == 0:
+                continue
+            top, top_scores = top_k((self.vectors[candidates] @ query)[None, :], k)
+            indices[row, :top.shape[1]] = candidates[top[0]]
+            scores[row, :top.shape[1]] = top_scores[0]
+
+        return indices, scores
+
+    def _arrays(self) -> dict:
+        return {
+            'vectors': self.vectors,
+            'centroids': self.centroids,
+            'list_offsets': self.list_offsets,
+            'list_items': self.list_items
+        }
+
+    def _params(self) -> dict:
+        return {
+            'n_lists': self.n_lists,
+            'n_probe': self.n_probe,
+            'n_iter': self.n_iter,
+            'sample_per_list': self.sample_per_list,
+            'random_state': self.random_state
+        }
+
+    def _load_arrays(self, arrays: dict):
+        self.vectors = arrays['vectors']
+        self.centroids = arrays['centroids']
+        self.list_offsets = arrays['list_offsets']
+        self.list_items = arrays['list_items']
+
+
+INDEX_TYPES = {
+    BruteForceIndex.kind: BruteForceIndex,
+    IVFIndex.kind: IVFIndex
+}
+
+
+def build_vector_index(
+    vectors,
+    kind: str = 'exact',
+    min_items: int = 0,
+    **params
+) -> VectorIndex:
+    """
+    Build a similar-item index over item vectors
+
+    Args:
+        vectors: Item vectors, dense or sparse, shape (n_items, dim)
+        kind: 'exact' or 'ivf' (sparse vectors always use 'exact')
+        min_items: Use the exact index below this many items
+        **params: Index-specific options (n_lists, n_probe, ...)
+
+    Returns:
+        Built VectorIndex
+    """
+    if sparse.issparse(vectors) or vectors.shape[0] < min_items:
+        kind = BruteForceIndex.kind
+    if kind == BruteForceIndex.kind:
+        params = {}
+    return INDEX_TYPES[kind](**params).build(vectors)
+
@@ -69,4 +69,5 @@ class ProductListResponse(BaseModel):
     page_size: int
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None  # Pass as `after` to fetch the next page
 
@@ -0,0 +1,219 @@
+"""
+Cache Codecs
+Byte encodings for cached values, chosen per key namespace
+"""
+import json
+import struct
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+# First byte of non-JSON payloads. JSON text never starts with these, so any
+# payload (including entries written before codecs existed) decodes with
+# decode_payload() whatever codec its namespace uses now.
+PACKED_MARKER = 0x01
+COMPRESSED_MARKER = 0x02
+
+_HEADER = struct.Struct("<BI")
+_COUNT = struct.Struct("<I")
+_INT64_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+# Column types: Python type -> type code stored in the header
+_COLUMN_TYPES = {float: "f", int: "i", bool: "b", str: "s"}
+
+
+class JsonCodec:
+    """UTF-8 JSON, the format RedisService has always written"""
+
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return decode_payload(data)
+
+
+class PackedCodec(JsonCodec):
+    """
+    Columnar binary layout for lists of flat records
+
+    Lists of dicts that share one key set and hold only str/float/int/bool
+    values (recommendation and similar-product lists) are stored column by
+    column: floats and ints as packed 64-bit arrays, bools as bytes, and
+    strings interned per column, so a repeated value such as the algorithm
+    name is written once. Such lists may be the value itself or fields of a
+    top-level dict (the get_or_compute envelope); anything else falls back
+    to JSON. Round trips are lossless.
+    """
+
+    name = "packed"
+
+    def encode(self, value: Any) -> bytes:
+        # root marks a bare list (stored as the single table ""); it cannot
+        # be inferred from table names, since a dict may have a "" key
+        if _is_table(value):
+            root, fields, tables = True, {}, {"": value}
+        elif isinstance(value, dict) and all(isinstance(k, str) for k in value):
+            root = False
+            fields = {k: v for k, v in value.items() if not _is_table(v)}
+            tables = {k: v for k, v in value.items() if _is_table(v)}
+        else:
+            return super().encode(value)
+
+        header = {"root": root, "fields": fields, "tables": {}}
+        sections = []
+        for name, records in tables.items():
+            columns = _table_columns(records)
+            if columns is None:
+                return super().encode(value)
+            header["tables"][name] = {
+                "rows": len(records),
+                "columns": [[column, code] for column, code, _ in columns]
+            }
+            for _, code, values in columns:
+                sections.append(_encode_column(code, values))
+
+        header_bytes = json.dumps(header, separators=(",", ":")).encode()
+        return b"".join([_HEADER.pack(PACKED_MARKER, len(header_bytes)), header_bytes, *sections])
+
+
+class CompressedCodec:
+    """zlib-compress another codec's output once it exceeds a size threshold"""
+
+    def __init__(self, codec: JsonCodec, threshold: int = 1024, level: int = 1):
+        """
+        Args:
+            codec: Codec producing the uncompressed payload
+            threshold: Payloads of at least this many bytes are compressed
+            level: zlib level (1 favours speed; cache payloads are small)
+        """
+        self.codec = codec
+        self.threshold = threshold
+        self.level = level
+        self.name = f"{codec.name}+zlib"
+
+    def encode(self, value: Any) -> bytes:
+        data = self.codec.encode(value)
+        if len(data) < self.threshold:
+            return data
+        compressed = zlib.compress(data, self.level)
+        if len(compressed) + 1 >= len(data):
+            return data
+        return bytes([COMPRESSED_MARKER]) + compressed
+
+    def decode(self, data: bytes) -> Any:
+        return decode_payload(data)
+
+
+def decode_payload(data) -> Any:
+    """Decode bytes written by any codec (or a JSON str)"""
+    if isinstance(data, str):
+        return json.loads(data)
+    if data[:1] == bytes([COMPRESSED_MARKER]):
+        return decode_payload(zlib.decompress(memoryview(data)[1:]))
+    if data[:1] == bytes([PACKED_MARKER]):
+        return _decode_packed(memoryview(data))
+    return json.loads(data)
+
+
+def _is_table(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) > 0
+        and all(type(record) is dict for record in value)
+    )
+
+
+def _table_columns(records: List[Dict]) -> Optional[List[Tuple[str, str, List]]]:
+    """(name, type code, values) per column, or None if records are not uniform"""
+    keys = list(records[0])
+    if not all(isinstance(key, str) for key in keys):
+        return None
+    key_set = set(keys)
+    if any(record.keys() != key_set for record in records):
+        return None
+
+    columns = []
+    for key in keys:
+        values = [record[key] for record in records]
+        value_type = type(values[0])
+        code = _COLUMN_TYPES.get(value_type)
+        if code is None or any(type(v) is not value_type for v in values):
+            return None
+        if code == "i" and not all(_INT64_RANGE[0] <= v <= _INT64_RANGE[1] for v in values):
+            return None
+        if code == "s" and any("\x00" in v for v in values):
+            return None
+        columns.append((key, code, values))
+    return columns
+
+
+def _index_typecode(n_unique: int) -> str:
+    if n_unique <= 0xFF:
+        return "B"
+    if n_unique <= 0xFFFF:
+        return "H"
+    return "I"
+
+
+def _encode_column(code: str, values: List) -> bytes:
+    if code == "f":
+        return array("d", values).tobytes()
+    if code == "i":
+        return array("q", values).tobytes()
+    if code == "b":
+        return bytes(values)
+
+    # Strings: per-column table of unique values (NUL-separated, so it
+    # decodes with one split), then one index per row
+    positions: Dict[str, int] = {}
+    indices = [positions.setdefault(v, len(positions)) for v in values]
+    table = "\x00".join(positions).encode()
+    return b"".join([
+        _COUNT.pack(len(positions)),
+        _COUNT.pack(len(table)),
+        table,
+        array(_index_typecode(len(positions)), indices).tobytes()
+    ])
+
+
+def _decode_column(code: str, rows: int, data: memoryview, offset: int) -> Tuple[List, int]:
+    """Column values and the offset just past them"""
+    if code in ("f", "i"):
+        values = array("d" if code == "f" else "q")
+        end = offset + rows * values.itemsize
+        values.frombytes(data[offset:end])
+        return values.tolist(), end
+    if code == "b":
+        end = offset + rows
+        return [bool(v) for v in data[offset:end]], end
+
+    (n_unique,) = _COUNT.unpack_from(data, offset)
+    (table_length,) = _COUNT.unpack_from(data, offset + _COUNT.size)
+    offset += 2 * _COUNT.size
+    strings = str(data[offset:offset + table_length], "utf-8").split("\x00")
+    offset += table_length
+    indices = array(_index_typecode(n_unique))
+    end = offset + rows * indices.itemsize
+    indices.frombytes(data[offset:end])
+    return [strings[i] for i in indices], end
+
+
+def _decode_packed(data: memoryview) -> Any:
+    _, header_length = _HEADER.unpack_from(data, 0)
+    offset = _HEADER.size + header_length
+    header = json.loads(data[_HEADER.size:offset].tobytes())
+
+    result = header["fields"]
+    for name, table in header["tables"].items():
+        names, columns = [], []
+        for column, code in table["columns"]:
+            values, offset = _decode_column(code, table["rows"], data, offset)
+            names.append(column)
+            columns.append(values)
+        records = [dict(zip(names, row)) for row in zip(*columns)]
+        if header["root"]:
+            return records
+        result[name] = records
+    return result
@@ -0,0 +1,376 @@
+"""
+Homepage Service
+Composes the personalized homepage feed from concurrently built sections
+"""
+import asyncio
+import time
+from typing import Awaitable, Dict, List, Optional
+
+from app.core.config import settings
+from app.data.mock_database import mock_db
+from app.data.product_repository import product_repository
+from app.services.recommendation_cache import (
+    get_cached_personalized,
+    get_cached_trending,
+    personalized_key
+)
+from app.services.recommendation_service import recommendation_service
+from app.services.redis_service import redis_service
+
+# Sections in priority order: a product shown in one is left out of the later ones
+SECTION_ORDER = ("for_you", "smart_picks", "trending_nearby")
+
+
+def _consume_exception(task: asyncio.Future):
+    # Failures are reported by the sections awaiting the task
+    if not task.cancelled():
+        task.exception()
+
+
+class HomepageComposer:
+    """
+    Builds every homepage section concurrently, each under its own deadline
+
+    for_you and smart_picks are both cut from one cached hybrid candidate
+    list (smart_picks re-ranks it for the request context), so the model
+    runs at most once per feed. trending_nearby comes from the cached
+    trending ids. A section that fails or misses its deadline is returned
+    empty and named in "degraded" instead of failing the whole page.
+    """
+
+    def __init__(self, section_size: int = 10, section_timeout: float = 0.3):
+        """
+        Args:
+            section_size: Items per section
+            section_timeout: Seconds each section may take
+        """
+        self.section_size = section_size
+        self.section_timeout = section_timeout
+
+    async def _run_section(
+        self,
+        name: str,
+        section: Awaitable[List[Dict]],
+        timeout: float
+    ) -> Optional[List[Dict]]:
+        """Section items, or None if it failed or missed its deadline"""
+        try:
+            return await asyncio.wait_for(section, timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"[WARNING] Homepage section {name} exceeded {timeout}s")
+        except Exception as e:
+            print(f"[WARNING] Homepage section {name} failed: {e}")
+        return None
+
+    async def _for_you(self, candidates: Awaitable[Optional[List[Dict]]]) -> List[Dict]:
+        return list((await candidates or [])[:self.section_size])
+
+    async def _smart_picks(
+        self,
+        candidates: Awaitable[Optional[List[Dict]]],
+        context: Dict
+    ) -> List[Dict]:
+        base = await candidates or []
+        # for_you already shows the head of the list; re-rank the rest
+        return recommendation_service.apply_context(
+            base[self.section_size:], context, self.section_size
+        )
+
+    async def _trending_nearby(self, county: Optional[str]) -> List[Dict]:
+        return list(await get_cached_trending(county))
+
+    async def build_sections(
+        self,
+        user_id: str,
+        county: Optional[str] = None,
+        time_of_day: str = "afternoon",
+        section_timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Build every section's recommendation items, without products
+
+        Args:
+            user_id: User ID
+            county: County for local trending and context boosts
+            time_of_day: morning, afternoon, evening or night
+            section_timeout: Deadline per section (defaults to the composer's)
+
+        Returns:
+            {"sections": {name: [items]}, "degraded": [section names]}
+        """
+        section_timeout = section_timeout or self.section_timeout
+        # Shared by two sections; shielded so one section timing out does
+        # not cancel the lookup for the other. A lookup that outlives both
+        # deadlines keeps running and warms the cache for the next request.
+        candidates = asyncio.ensure_future(get_cached_personalized(user_id, "hybrid"))
+        candidates.add_done_callback(_consume_exception)
+        context = {"county": county, "time_of_day": time_of_day}
+
+        results = await asyncio.gather(
+            self._run_section("for_you", self._for_you(asyncio.shield(candidates)), section_timeout),
+            self._run_section(
+                "smart_picks", self._smart_picks(asyncio.shield(candidates), context), section_timeout
+            ),
+            self._run_section("trending_nearby", self._trending_nearby(county), section_timeout)
+        )
+
+        degraded = [name for name, items in zip(SECTION_ORDER, results) if items is None]
+
+        # Dedupe across sections in priority order
+        seen = set()
+        sections = {}
+        for name, items in zip(SECTION_ORDER, results):
+            kept = []
+            for item in items or []:
+                product_id = item.get("product_id")
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                kept.append(item)
+                if len(kept) == self.section_size:
+                    break
+            sections[name] = kept
+
+        return {"sections": sections, "degraded": degraded}
+
+    async def hydrate(self, sections: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """Sections with "product" attached to each item, from one bulk product lookup"""
+        products = await product_repository.get_products_by_ids([
+            item.get("product_id", "") for items in sections.values() for item in items
+        ])
+        by_id = {p["id"]: p for p in products}
+        # Items may be shared cache entries, so products go on copies
+        hydrated = {
+            name: [
+                {**item, "product": by_id[item["product_id"]]}
+                for item in items
+                if item.get("product_id") in by_id
+            ]
+            for name, items in sections.items()
+        }
+        hydrated["local_vendors"] = []  # Would filter for local vendors
+        return hydrated
+
+    async def compose(
+        self,
+        user_id: str,
+        county: Optional[str] = None,
+        time_of_day: str = "afternoon"
+    ) -> Dict:
+        """
+        Build the homepage feed for a user live
+
+        Returns:
+            {"sections": {name: [items with "product"]}, "degraded": [section names]}
+        """
+        feed = await self.build_sections(user_id, county, time_of_day)
+        return {"sections": await self.hydrate(feed["sections"]), "degraded": feed["degraded"]}
+
+
+class HomepageMaterializer:
+    """
+    Precomputed homepage feeds in Redis, one per user and county
+
+    Feeds are materialized for each known user's home county, which is
+    also what a request without a county gets. Every active user's feed
+    (users with tracked activity within active_window) is rebuilt after
+    each model retrain, and a single user's feed shortly after their
+    tracked activity, with activity inside refresh_delay coalesced into
+    one rebuild. Feeds are stored as section items only and hydrated with
+    current product data on read, so a stored feed never shows a stale
+    price or stock level.
+
+    A stored feed built by an older model version counts as a miss. Reads
+    fall back to building the feed live; a live home-county feed with no
+    degraded section is stored for the next request. Feeds for other
+    counties are always built live, since nothing would rebuild them.
+    """
+
+    def __init__(
+        self,
+        composer: HomepageComposer,
+        ttl: int = 21600,
+        batch_timeout: float = 5.0,
+        concurrency: int = 8,
+        refresh_delay: float = 2.0,
+        active_window: int = 604800
+    ):
+        """
+        Args:
+            composer: Builds the feeds
+            ttl: Seconds a stored feed is served
+            batch_timeout: Section deadline when materializing
+            concurrency: Feeds built at once by materialize_all()
+            refresh_delay: Seconds between a user's activity and their rebuild
+            active_window: Seconds of inactivity before a user is skipped
+        """
+        self.composer = composer
+        self.ttl = ttl
+        self.batch_timeout = batch_timeout
+        self.concurrency = concurrency
+        self.refresh_delay = refresh_delay
+        self.active_window = active_window
+        # User -> pending activity refresh
+        self._refreshes: Dict[str, asyncio.Task] = {}
+        self._batch: Optional[asyncio.Task] = None
+        self._batch_again = False
+
+    @staticmethod
+    def _user(user_id: str) -> Optional[Dict]:
+        return mock_db.get_user_by_id(user_id)
+
+    async def _store(
+        self,
+        user_id: str,
+        county: Optional[str],
+        sections: Dict,
+        model_version: int
+    ) -> bool:
+        return await redis_service.set(
+            redis_service.homepage_key(user_id, county),
+            {
+                "sections": sections,
+                "model_version": model_version,
+                "materialized_at": time.time()
+            },
+            ttl=self.ttl
+        )
+
+    async def get_feed(self, user_id: str, county: Optional[str] = None) -> Dict:
+        """
+        Homepage feed for a user: the stored feed if there is a current one, else built live
+
+        Args:
+            user_id: User ID
+            county: County to show (defaults to the user's home county)
+
+        Returns:
+            {"sections": {name: [items with "product"]}, "degraded": [section names]}
+        """
+        user = self._user(user_id)
+        home_county = user.get("county") if user else None
+        county = county or home_county
+        model_version = recommendation_service.model_version
+        materialized = user is not None and model_version > 0 and county == home_county
+
+        if materialized:
+            stored = await redis_service.get(redis_service.homepage_key(user_id, county))
+            if stored and stored.get("model_version") == model_version:
+                return {"sections": await self.composer.hydrate(stored["sections"]), "degraded": []}
+
+        feed = await self.composer.build_sections(user_id, county)
+        if materialized and not feed["degraded"]:
+            await self._store(user_id, county, feed["sections"], model_version)
+        return {"sections": await self.composer.hydrate(feed["sections"]), "degraded": feed["degraded"]}
+
+    async def materialize(self, user_id: str) -> bool:
+        """
+        Rebuild and store one user's home-county feed from the served models
+
+        The user's cached recommendations are dropped first, since they
+        may predate the user's latest activity.
+
+        Returns:
+            True if a complete feed was stored (never for unknown users,
+            or before a bundle is serving)
+        """
+        user = self._user(user_id)
+        model_version = recommendation_service.model_version
+        if user is None or model_version == 0:
+            return False
+
+        county = user.get("county")
+        await redis_service.delete(personalized_key(user_id, "hybrid"))
+        feed = await self.composer.build_sections(
+            user_id, county, section_timeout=self.batch_timeout
+        )
+        if feed["degraded"]:
+            return False
+        # Stamped with the version it was built from: a retrain during the
+        # build leaves a feed that reads as a miss until it is rebuilt
+        return await self._store(user_id, county, feed["sections"], model_version)
+
+    async def materialize_all(self) -> int:
+        """
+        Rebuild the home-county feed of every active, known user
+
+        Returns:
+            Number of feeds stored
+        """
+        user_ids = [
+            user_id for user_id in await redis_service.get_active_users(self.active_window)
+            if self._user(user_id) is not None
+        ]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def materialize_user(user_id: str) -> bool:
+            async with semaphore:
+                try:
+                    return await self.materialize(user_id)
+                except Exception as e:
+                    print(f"[WARNING] Homepage materialization failed for {user_id}: {e}")
+                    return False
+
+        stored = sum(await asyncio.gather(*(materialize_user(u) for u in user_ids)))
+        print(f"✅ Materialized {stored}/{len(user_ids)} homepages")
+        return stored
+
+    async def _run_batches(self):
+        # A retrain that lands mid-batch gets a full batch of its own
+        while True:
+            self._batch_again = False
+            try:
+                await self.materialize_all()
+            except Exception as e:
+                print(f"[WARNING] Homepage materialization failed: {e}")
+            if not self._batch_again:
+                return
+
+    def schedule_all(self, *_):
+        """Rebuild every active feed in the background (bundle listener)"""
+        if self._batch is not None and not self._batch.done():
+            self._batch_again = True
+            return
+        self._batch = asyncio.ensure_future(self._run_batches())
+
+    async def _refresh_later(self, user_id: str):
+        try:
+            await asyncio.sleep(self.refresh_delay)
+            # Activity from here on schedules a new refresh
+            self._refreshes.pop(user_id, None)
+            await self.materialize(user_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[WARNING] Homepage refresh failed for {user_id}: {e}")
+
+    def schedule_refresh(self, user_id: str, *_):
+        """Rebuild a user's feed after refresh_delay (activity listener)"""
+        if self._user(user_id) is None:
+            return
+        if user_id not in self._refreshes:
+            self._refreshes[user_id] = asyncio.ensure_future(self._refresh_later(user_id))
+
+    async def close(self):
+        """Cancel pending refreshes and any running batch"""
+        tasks = [t for t in (self._batch, *self._refreshes.values()) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._batch = None
+        self._refreshes.clear()
+
+
+# Global instance
+homepage_composer = HomepageComposer(
+    section_size=settings.HOMEPAGE_SECTION_SIZE,
+    section_timeout=settings.HOMEPAGE_SECTION_TIMEOUT
+)
+homepage_materializer = HomepageMaterializer(
+    homepage_composer,
+    ttl=settings.HOMEPAGE_MATERIALIZED_TTL,
+    batch_timeout=settings.HOMEPAGE_MATERIALIZE_TIMEOUT,
+    concurrency=settings.HOMEPAGE_MATERIALIZE_CONCURRENCY,
+    refresh_delay=settings.HOMEPAGE_REFRESH_DELAY,
+    active_window=settings.HOMEPAGE_ACTIVE_USER_WINDOW
+)
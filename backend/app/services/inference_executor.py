@@ -0,0 +1,142 @@
+"""
+Inference Executor
+Bounded worker pool that keeps model inference off the API event loop
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class InferenceOverloaded(Exception):
+    """Raised instead of queueing an inference call when the queue is full"""
+
+
+class InferenceExecutor:
+    """
+    Runs engine calls (kneighbors, np.dot scoring, LightFM.predict) on a
+    small thread pool so one inference never stalls the event loop
+
+    Threads rather than processes: the engines live in this process and
+    are swapped on every retrain, and the heavy parts of inference (BLAS,
+    scikit-learn and LightFM kernels) release the GIL, so threads run them
+    in parallel without pickling a model per call.
+
+    At most max_workers calls run at once and at most max_queue wait for
+    a worker. Beyond that, run() raises InferenceOverloaded at once, so
+    callers can shed load (serve a fallback, or 503) instead of piling up
+    requests that would time out anyway.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64):
+        """
+        Args:
+            max_workers: Inference calls run concurrently
+            max_queue: Calls allowed to wait for a worker
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Counters are updated from worker threads as well as the event loop
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._max_queued = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference"
+            )
+        return self._executor
+
+    def _call(self, fn: Callable, submitted: float) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_seconds += started - submitted
+        failed = False
+        try:
+            return fn()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._run_seconds += time.perf_counter() - started
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on an inference worker
+
+        Returns:
+            fn's result (its exceptions are re-raised here)
+
+        Raises:
+            InferenceOverloaded: max_queue calls are already waiting
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise InferenceOverloaded(
+                    f"Inference queue full ({self._queued} waiting for {self.max_workers} workers)"
+                )
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        submitted = time.perf_counter()
+        try:
+            future = self._get_executor().submit(
+                self._call, functools.partial(fn, *args, **kwargs), submitted
+            )
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+        future.add_done_callback(self._release_cancelled)
+        # Cancelling the caller drops a call still queued; a call already
+        # running keeps its worker until it finishes
+        return await asyncio.wrap_future(future)
+
+    def _release_cancelled(self, future):
+        # A call cancelled while queued never reaches _call
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput and latency counters"""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+                "max_queued": self._max_queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_seconds / finished * 1000, 3) if finished else 0.0,
+                "avg_run_ms": round(self._run_seconds / finished * 1000, 3) if finished else 0.0
+            }
+
+    def shutdown(self):
+        """Stop the workers; calls still queued are cancelled"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
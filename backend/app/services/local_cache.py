@@ -0,0 +1,154 @@
+"""
+Local Cache
+In-process L1 cache (LRU + TTL, per-namespace limits) in front of Redis
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+# Keys are cached locally only under these prefixes: prefix -> (max entries, TTL seconds).
+# TTLs are short because L1 entries are also dropped via Redis pub/sub on writes.
+DEFAULT_NAMESPACES = {
+    "recommendations:similar": (10000, 300),
+    "recommendations:user": (10000, 60),
+    "homepage": (10000, 60),
+    "trending": (512, 60)
+}
+
+# Returned by get() on a miss, so cached falsy values ([] / None) still count as hits
+MISS = object()
+
+
+def match_prefix(key: str, prefixes: Iterable[str]) -> Optional[str]:
+    """First prefix that key falls under (whole ':'-separated segments only)"""
+    for prefix in prefixes:
+        if key.startswith(prefix) and key[len(prefix):len(prefix) + 1] in ("", ":"):
+            return prefix
+    return None
+
+
+class NamespaceCache:
+    """Size-bounded LRU map whose entries expire after a TTL"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+            ttl: Default lifetime of an entry in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISS
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISS
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class LocalCache:
+    """
+    Namespaced L1 cache keyed with the same scheme as Redis
+
+    A key belongs to the namespace whose prefix it starts with; keys
+    outside every namespace are never cached locally. Values are
+    returned by reference, so callers must not mutate them. Not
+    thread-safe: use it from the event loop only.
+    """
+
+    def __init__(self, namespaces: Optional[Dict[str, Tuple[int, float]]] = None):
+        """
+        Args:
+            namespaces: Key prefix -> (max entries, TTL seconds)
+        """
+        namespaces = DEFAULT_NAMESPACES if namespaces is None else namespaces
+        # Longest prefix first so nested namespaces win
+        self.namespaces = {
+            prefix: NamespaceCache(max_entries, ttl)
+            for prefix, (max_entries, ttl) in sorted(
+                namespaces.items(), key=lambda item: -len(item[0])
+            )
+        }
+
+    def _namespace(self, key: str) -> Optional[NamespaceCache]:
+        prefix = match_prefix(key, self.namespaces)
+        return None if prefix is None else self.namespaces[prefix]
+
+    def handles(self, key: str) -> bool:
+        """Whether key falls in a locally cached namespace"""
+        return self._namespace(key) is not None
+
+    def get(self, key: str) -> Any:
+        """Cached value, or MISS"""
+        cache = self._namespace(key)
+        return MISS if cache is None else cache.get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Cache a value (the namespace TTL caps ttl)"""
+        cache = self._namespace(key)
+        if cache is not None:
+            cache.set(key, value, ttl)
+
+    def invalidate(self, keys: Iterable[str]) -> int:
+        """Drop keys; returns how many were present"""
+        dropped = 0
+        for key in keys:
+            cache = self._namespace(key)
+            if cache is not None and cache.delete(key):
+                dropped += 1
+        return dropped
+
+    def clear(self):
+        for cache in self.namespaces.values():
+            cache.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss/eviction counters per namespace"""
+        return {prefix: cache.stats() for prefix, cache in self.namespaces.items()}
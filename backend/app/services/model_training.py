@@ -0,0 +1,325 @@
+"""
+Model Training
+Builds model bundles in a worker process, off the API event loop, and
+publishes them as on-disk artifacts every API worker memory-maps
+"""
+import json
+import os
+from typing import IO, Dict, List, Optional
+from datetime import datetime
+from app.core.config import settings
+from app.ml.artifacts import format_datetime, write_json_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Optional ML imports
+try:
+    from app.ml.interactions import build_interaction_matrix
+except ImportError as e:
+    print(f"[WARNING] Interaction matrix builder not available: {e}")
+
+try:
+    from app.ml.collaborative_filtering import CollaborativeFilteringEngine
+    CF_AVAILABLE = True
+except ImportError as e:
+    CF_AVAILABLE = False
+    print(f"[WARNING] Collaborative filtering not available: {e}")
+
+try:
+    from app.ml.matrix_factorization import MatrixFactorizationEngine
+    MF_AVAILABLE = True
+except ImportError as e:
+    MF_AVAILABLE = False
+    print(f"[WARNING] Matrix factorization not available: {e}")
+
+try:
+    from app.ml.implicit_als import ImplicitALSEngine
+    ALS_AVAILABLE = True
+except ImportError as e:
+    ALS_AVAILABLE = False
+    print(f"[WARNING] Implicit ALS not available: {e}")
+
+try:
+    from app.ml.hybrid_model import HybridRecommendationEngine
+    HYBRID_AVAILABLE = True
+except ImportError as e:
+    HYBRID_AVAILABLE = False
+    print(f"[WARNING] Hybrid model not available: {e}")
+
+
+# Artifact directory (.npy arrays + manifest.json) for each engine in a bundle
+MODEL_FILES = {
+    "cf_engine": "collaborative_filtering",
+    "mf_engine": "matrix_factorization",
+    "hybrid_engine": "hybrid_model",
+    "als_engine": "implicit_als"
+}
+# Names the engine versions making up the current bundle
+BUNDLE_MANIFEST = "bundle.json"
+TRAINING_LOCK = "training.lock"
+
+
+class ModelBundle:
+    """
+    A set of trained engines that is served as one unit
+
+    A retrain produces a new bundle and the service swaps its reference
+    to it in one step, so a request always sees engines from a single
+    training run. Between retrains the served engines do change: fold-ins
+    add users and items to them. RecommendationService runs fold-ins one
+    at a time under a lock, and each engine publishes a fold-in with a
+    single assignment (rows before ids), so inference threads reading
+    concurrently see a folded user or item either completely or not at all.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        trained_at: datetime,
+        cf_engine=None,
+        mf_engine=None,
+        hybrid_engine=None,
+        als_engine=None
+    ):
+        self.version = version
+        self.trained_at = trained_at
+        self.cf_engine = cf_engine
+        self.mf_engine = mf_engine
+        self.hybrid_engine = hybrid_engine
+        self.als_engine = als_engine
+
+
+def engine_config() -> Dict[str, Dict]:
+    """Constructor arguments for each engine, taken from settings"""
+    index_params = {
+        "kind": settings.SIMILAR_ITEMS_INDEX,
+        "min_items": settings.IVF_MIN_ITEMS,
+        "n_lists": settings.IVF_N_LISTS,
+        "n_probe": settings.IVF_N_PROBE
+    }
+    return {
+        "cf": {
+            "n_neighbors": settings.KNN_NEIGHBORS,
+            "neighbor_k": settings.NEIGHBOR_TABLE_K
+        },
+        "mf": {
+            "n_factors": settings.SVD_FACTORS,
+            "index_params": index_params,
+            "neighbor_k": settings.NEIGHBOR_TABLE_K,
+            "max_folded_users": settings.FOLD_IN_MAX_USERS
+        },
+        "hybrid": {
+            "index_params": index_params,
+            "neighbor_k": settings.NEIGHBOR_TABLE_K,
+            "max_folded_users": settings.FOLD_IN_MAX_USERS
+        },
+        "als": {
+            "n_factors": settings.ALS_FACTORS,
+            "regularization": settings.ALS_REGULARIZATION,
+            "alpha": settings.ALS_ALPHA,
+            "iterations": settings.ALS_ITERATIONS,
+            "warm_start_iterations": settings.ALS_WARM_START_ITERATIONS,
+            "cg_steps": settings.ALS_CG_STEPS,
+            "n_threads": settings.ALS_THREADS,
+            "index_params": index_params,
+            "neighbor_k": settings.NEIGHBOR_TABLE_K,
+            "max_folded_users": settings.FOLD_IN_MAX_USERS
+        }
+    }
+
+
+def create_engines(config: Optional[Dict[str, Dict]] = None) -> Dict:
+    """Fresh, untrained engines for every available algorithm"""
+    config = config or engine_config()
+    return {
+        "cf_engine": CollaborativeFilteringEngine(**config["cf"]) if CF_AVAILABLE else None,
+        "mf_engine": MatrixFactorizationEngine(**config["mf"]) if MF_AVAILABLE else None,
+        "hybrid_engine": HybridRecommendationEngine(**config["hybrid"]) if HYBRID_AVAILABLE else None,
+        "als_engine": ImplicitALSEngine(**config["als"]) if ALS_AVAILABLE else None
+    }
+
+
+def train_engines(
+    interactions: List[dict],
+    products: List[dict],
+    config: Optional[Dict[str, Dict]] = None,
+    warm_start: Optional[Dict] = None
+) -> Dict:
+    """
+    Train a fresh set of engines
+
+    Runs in a worker process: everything it needs comes in as arguments
+    and the trained engines are pickled back to the caller.
+
+    Args:
+        interactions: User-product interactions
+        products: Product metadata
+        config: Engine constructor arguments (defaults to settings)
+        warm_start: Previous ALS factors to start from (see warm_start_state)
+
+    Returns:
+        Dict of trained engines keyed like ModelBundle attributes
+    """
+    print("🤖 Training recommendation models...")
+    engines = create_engines(config)
+
+    # Build the shared sparse interaction matrix once for every engine
+    interaction_matrix = build_interaction_matrix(interactions)
+
+    # Train collaborative filtering
+    cf_engine = engines["cf_engine"]
+    if cf_engine:
+        cf_engine.train_user_based(interaction_matrix)
+        cf_engine.train_item_based(interaction_matrix)
+        print("✅ Collaborative filtering models trained")
+
+    # Train matrix factorization
+    mf_engine = engines["mf_engine"]
+    if mf_engine:
+        mf_engine.train(interaction_matrix)
+        print("✅ Matrix factorization model trained")
+
+    # Train implicit ALS
+    als_engine = engines["als_engine"]
+    if als_engine:
+        als_engine.train(interaction_matrix, warm_start=warm_start)
+        print("✅ Implicit ALS model trained")
+    
+    # Train hybrid model
+    hybrid_engine = engines["hybrid_engine"]
+    if hybrid_engine:
+        interactions_matrix, item_features = hybrid_engine.prepare_data(
+            interaction_matrix, products
+        )
+        hybrid_engine.train(interactions_matrix, item_features)
+        print("✅ Hybrid model trained")
+
+    return engines
+
+
+def read_bundle_manifest(base_path: str) -> Optional[Dict]:
+    """The published bundle's manifest, or None if nothing was saved yet"""
+    try:
+        with open(os.path.join(base_path, BUNDLE_MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_engines(
+    engines: Dict,
+    base_path: str,
+    trained_at: datetime,
+    version: Optional[int] = None
+) -> Dict:
+    """
+    Save trained engines as artifacts and publish them as one bundle
+
+    Each engine is saved as a new artifact version; bundle.json, replaced
+    atomically last, names the exact versions that belong together, so
+    readers never mix engines from two training runs.
+
+    Args:
+        engines: Trained engines keyed like ModelBundle attributes
+        base_path: Model directory
+        trained_at: Training time recorded in the manifest
+        version: Bundle version (default: the published version + 1)
+
+    Returns:
+        The published bundle manifest
+    """
+    os.makedirs(base_path, exist_ok=True)
+    if version is None:
+        previous = read_bundle_manifest(base_path)
+        version = (previous["version"] if previous else 0) + 1
+
+    saved = {}
+    for name, filename in MODEL_FILES.items():
+        engine = engines.get(name)
+        if engine:
+            version_path = engine.save_model(os.path.join(base_path, filename))
+            saved[name] = os.path.basename(version_path)
+
+    manifest = {
+        "version": version,
+        "trained_at": format_datetime(trained_at),
+        "engines": saved
+    }
+    write_json_atomic(os.path.join(base_path, BUNDLE_MANIFEST), manifest)
+    return manifest
+
+
+def load_engines(base_path: str, manifest: Dict) -> Dict:
+    """
+    Open the engine versions named by a bundle manifest
+
+    Arrays are memory-mapped, so every API worker serving the bundle
+    shares one page-cached copy.
+    """
+    engines = create_engines()
+    for name, engine in engines.items():
+        version = manifest["engines"].get(name)
+        if engine is None or version is None:
+            engines[name] = None
+        else:
+            engine.load_model(os.path.join(base_path, version))
+    return engines
+
+
+def train_and_save(
+    interactions: List[dict],
+    products: List[dict],
+    base_path: str,
+    config: Optional[Dict[str, Dict]] = None,
+    warm_start: Optional[Dict] = None
+) -> Dict:
+    """
+    Train engines and publish them to base_path (training worker entry point)
+
+    Only the small bundle manifest travels back to the caller; the API
+    workers load the engines from disk.
+
+    Returns:
+        The published bundle manifest
+    """
+    engines = train_engines(interactions, products, config, warm_start)
+    return save_engines(engines, base_path, datetime.utcnow())
+
+
+def try_lock_training(base_path: str) -> Optional[IO]:
+    """
+    Take the model directory's training lock without waiting
+
+    Only one API worker trains at a time; the others pick the published
+    bundle up from disk. The OS drops the lock if its holder dies.
+
+    Returns:
+        Open lock file to pass to unlock_training, or None if another
+        process holds the lock
+    """
+    os.makedirs(base_path, exist_ok=True)
+    lock_file = open(os.path.join(base_path, TRAINING_LOCK), "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def unlock_training(lock_file: IO):
+    """Release a lock taken with try_lock_training"""
+    try:
+        if fcntl is None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    finally:
+        lock_file.close()
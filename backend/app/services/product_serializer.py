@@ -0,0 +1,98 @@
+"""
+Product Serializer
+Cached, pre-validated ProductResponse JSON per product and language
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.data.product_view import LANGUAGES, ProductView
+from app.services.local_cache import MISS, NamespaceCache
+
+# Optional fast JSON encoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# view_count changes per request, so cached JSON is split around it
+_VIEW_COUNT_PLACEHOLDER = -7_135_792_468
+_VIEW_COUNT_FIELD = b'"view_count":'
+
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON bytes (orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class ProductSerializer:
+    """
+    Serializes ProductViews to ProductResponse JSON, validating each once
+
+    The JSON for a (view, language) pair is built through ProductResponse
+    the first time it is needed and then reused, split around view_count
+    so per-request counts are spliced in as bytes. Views are immutable and
+    replaced when a product changes, so an entry is rebuilt whenever the
+    store hands back a different view. The store also calls invalidate()
+    when it replaces a product, so the old view's JSON is not kept around.
+    """
+
+    def __init__(self, max_entries: int = 20000, ttl: float = 3600):
+        """
+        Args:
+            max_entries: (view, language) entries kept
+            ttl: Seconds before an entry is rebuilt regardless
+        """
+        self._cache = NamespaceCache(max_entries, ttl)
+
+    def _parts(self, view: ProductView, language: str) -> Tuple[bytes, bytes]:
+        language = "en" if language == "en" else "sw"
+        key = f"{view.id}:{language}"
+        entry = self._cache.get(key)
+        if entry is not MISS and entry[0] is view:
+            return entry[1], entry[2]
+
+        data = view.to_response(language, _VIEW_COUNT_PLACEHOLDER).model_dump(mode="json")
+        encoded = dumps(data)
+        prefix, suffix = encoded.split(_VIEW_COUNT_FIELD + str(_VIEW_COUNT_PLACEHOLDER).encode(), 1)
+        prefix += _VIEW_COUNT_FIELD
+        self._cache.set(key, (view, prefix, suffix))
+        return prefix, suffix
+
+    def product_json(self, view: ProductView, language: str = "en", view_count: int = 0) -> bytes:
+        """ProductResponse JSON for one product"""
+        prefix, suffix = self._parts(view, language)
+        return prefix + str(int(view_count)).encode() + suffix
+
+    def products_json(
+        self,
+        views: List[ProductView],
+        language: str = "en",
+        view_counts: Optional[Dict[str, int]] = None
+    ) -> bytes:
+        """JSON array of ProductResponse objects"""
+        view_counts = view_counts or {}
+        return b"[" + b",".join(
+            self.product_json(v, language, view_counts.get(v.id, 0)) for v in views
+        ) + b"]"
+
+    def invalidate(self, product_id: str):
+        """Drop cached JSON for a product in every language"""
+        for language in LANGUAGES:
+            self._cache.delete(f"{product_id}:{language}")
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+def response_json(products_json: bytes, **fields) -> bytes:
+    """JSON object {"products": <products_json>, **fields} without re-encoding products"""
+    if not fields:
+        return b'{"products":' + products_json + b"}"
+    return b'{"products":' + products_json + b"," + dumps(fields)[1:]
+
+
+# Global instance
+product_serializer = ProductSerializer()
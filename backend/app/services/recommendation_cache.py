@@ -0,0 +1,100 @@
+"""
+Recommendation Cache
+Cached recommendation lists shared by the API endpoints and the homepage
+"""
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.data.mock_database import mock_db
+from app.services.recommendation_service import recommendation_service
+from app.services.redis_service import redis_service
+
+
+def personalized_key(user_id: str, algorithm: str = "hybrid") -> str:
+    """Cache key of a user's recommendations from the bundle being served"""
+    return redis_service.user_recommendations_key(
+        user_id, algorithm, recommendation_service.model_version
+    )
+
+
+async def get_cached_personalized(user_id: str, algorithm: str = "hybrid") -> Optional[List[Dict]]:
+    """
+    Top RECOMMENDATION_CANDIDATES personalized recommendations through the
+    stampede-protected cache (None when there are none)
+    
+    Entries are keyed by model version, so a retrain starts a fresh set.
+    Nothing is cached until a bundle is serving, nor when the service falls
+    back to mock results, so callers see None and use their own fallback.
+    The returned list is shared with the cache and must not be modified.
+    """
+    if recommendation_service.model_version == 0:
+        return None
+    
+    async def compute():
+        recommendations = await recommendation_service.get_personalized_recommendations(
+            user_id=user_id,
+            n_recommendations=settings.RECOMMENDATION_CANDIDATES,
+            algorithm=algorithm
+        )
+        if not recommendations or any(r.get("algorithm") == "mock" for r in recommendations):
+            return None
+        return recommendations
+    
+    return await redis_service.get_or_compute(
+        personalized_key(user_id, algorithm),
+        compute,
+        ttl=settings.CACHE_TTL
+    )
+
+
+def similar_key(product_id: str, algorithm: str = "item_based") -> str:
+    """Cache key of a product's similar items from the bundle being served"""
+    return redis_service.similar_products_key(
+        product_id, algorithm, recommendation_service.model_version
+    )
+
+
+async def get_cached_similar(product_id: str, algorithm: str = "item_based") -> Optional[List[Dict]]:
+    """
+    Top RECOMMENDATION_CANDIDATES similar products through the
+    stampede-protected cache (None when there are none)
+    
+    Keyed by algorithm and model version; like get_cached_personalized,
+    nothing is cached before a bundle is serving or for mock results.
+    The returned list is shared with the cache and must not be modified.
+    """
+    if recommendation_service.model_version == 0:
+        return None
+    
+    async def compute():
+        similar = await recommendation_service.get_similar_products(
+            product_id=product_id,
+            n_similar=settings.RECOMMENDATION_CANDIDATES,
+            algorithm=algorithm
+        )
+        if not similar or any(s.get("algorithm") == "mock" for s in similar):
+            return None
+        return similar
+    
+    return await redis_service.get_or_compute(
+        similar_key(product_id, algorithm),
+        compute,
+        ttl=settings.SIMILAR_PRODUCTS_CACHE_TTL
+    )
+
+
+async def get_cached_trending(county: Optional[str] = None) -> List[Dict]:
+    """Top RECOMMENDATION_CANDIDATES trending product ids ({"product_id"} items), cached"""
+    async def compute():
+        return [
+            {"product_id": p["id"]}
+            for p in mock_db.get_trending_products(
+                county=county, limit=settings.RECOMMENDATION_CANDIDATES
+            )
+        ]
+    
+    return await redis_service.get_or_compute(
+        redis_service.trending_key(county=county),
+        compute,
+        ttl=settings.TRENDING_ITEMS_CACHE_TTL
+    )
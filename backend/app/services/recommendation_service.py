@@ -2,32 +2,31 @@
 Recommendation Service
 Orchestrates all ML models and provides unified recommendation interface
 """
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Set, Tuple
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import asyncio
+import multiprocessing
+import threading
 from app.core.config import settings
-
-# Optional ML imports
-try:
-    from app.ml.collaborative_filtering import CollaborativeFilteringEngine
-    CF_AVAILABLE = True
-except ImportError as e:
-    CF_AVAILABLE = False
-    print(f"[WARNING] Collaborative filtering not available: {e}")
-
-try:
-    from app.ml.matrix_factorization import MatrixFactorizationEngine
-    MF_AVAILABLE = True
-except ImportError as e:
-    MF_AVAILABLE = False
-    print(f"[WARNING] Matrix factorization not available: {e}")
-
-try:
-    from app.ml.hybrid_model import HybridRecommendationEngine
-    HYBRID_AVAILABLE = True
-except ImportError as e:
-    HYBRID_AVAILABLE = False
-    print(f"[WARNING] Hybrid model not available: {e}")
+from app.ml.artifacts import parse_datetime
+from app.services.inference_executor import InferenceExecutor, InferenceOverloaded
+from app.services.model_training import (
+    CF_AVAILABLE,
+    MF_AVAILABLE,
+    HYBRID_AVAILABLE,
+    ALS_AVAILABLE,
+    MODEL_FILES,
+    ModelBundle,
+    engine_config,
+    load_engines,
+    read_bundle_manifest,
+    save_engines,
+    train_and_save,
+    try_lock_training,
+    unlock_training
+)
 
 
 class RecommendationService:
@@ -36,59 +35,353 @@ class RecommendationService:
     """
     
     def __init__(self):
-        # Initialize engines only if available
-        self.cf_engine = CollaborativeFilteringEngine(
-            n_neighbors=settings.KNN_NEIGHBORS
-        ) if CF_AVAILABLE else None
-        
-        self.mf_engine = MatrixFactorizationEngine(
-            n_factors=settings.SVD_FACTORS
-        ) if MF_AVAILABLE else None
-        
-        self.hybrid_engine = HybridRecommendationEngine() if HYBRID_AVAILABLE else None
-        
-        self.models_trained = False
-        self.last_training = None
+        # Currently served engines; replaced wholesale after each retrain
+        self._bundle: Optional[ModelBundle] = None
+        self._training: Optional[asyncio.Future] = None
+        self._training_executor: Optional[Executor] = None
+        self._retrain_task: Optional[asyncio.Task] = None
+        # Fold-ins since the served bundle's training data was read,
+        # replayed onto the next bundle
+        self._fold_in_log: Dict[str, Tuple[List[dict], List[dict]]] = OrderedDict()
+        # Fold-ins write to the served engines one at a time
+        self._fold_in_lock = threading.Lock()
+        # User -> products of interactions waiting for a scheduled fold-in
+        self._pending_fold_ins: Dict[str, List[dict]] = {}
+        self._fold_in_tasks: Set[asyncio.Task] = set()
+        # Callbacks run with each newly trained bundle once it is serving
+        self._bundle_listeners: List[Callable[[ModelBundle], None]] = []
+        # Every engine call made while serving runs here, off the event loop
+        self.inference = InferenceExecutor(
+            max_workers=settings.INFERENCE_WORKERS,
+            max_queue=settings.INFERENCE_MAX_QUEUE
+        )
         
-        if not any([CF_AVAILABLE, MF_AVAILABLE, HYBRID_AVAILABLE]):
+        if not any([CF_AVAILABLE, MF_AVAILABLE, HYBRID_AVAILABLE, ALS_AVAILABLE]):
             print("[WARNING] No ML models available - using mock recommendations")
     
+    @property
+    def models_trained(self) -> bool:
+        return self._bundle is not None
+    
+    @property
+    def last_training(self) -> Optional[datetime]:
+        return self._bundle.trained_at if self._bundle else None
+    
+    @property
+    def model_version(self) -> int:
+        return self._bundle.version if self._bundle else 0
+    
+    @property
+    def cf_engine(self):
+        return self._bundle.cf_engine if self._bundle else None
+    
+    @property
+    def mf_engine(self):
+        return self._bundle.mf_engine if self._bundle else None
+    
+    @property
+    def hybrid_engine(self):
+        return self._bundle.hybrid_engine if self._bundle else None
+    
+    @property
+    def als_engine(self):
+        return self._bundle.als_engine if self._bundle else None
+    
+    def _get_training_executor(self) -> Executor:
+        """Worker pool that runs model fitting away from the event loop"""
+        if self._training_executor is None:
+            if settings.MODEL_TRAINING_EXECUTOR == "process":
+                self._training_executor = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._training_executor = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix="model-training"
+                )
+        return self._training_executor
+    
+    def _swap_bundle(self, engines: Dict, trained_at: datetime, version: int) -> ModelBundle:
+        """Publish a newly trained set of engines"""
+        bundle = ModelBundle(
+            version=version,
+            trained_at=trained_at,
+            **engines
+        )
+        # A single reference assignment: requests see the old or the new bundle
+        self._bundle = bundle
+        print(f"✅ Model bundle v{bundle.version} is now serving")
+        return bundle
+    
     async def train_models(
         self, 
         interactions: List[dict],
         products: List[dict]
-    ):
+    ) -> Optional[ModelBundle]:
         """
-        Train all ML models
+        Train all ML models in a background worker and swap them in
+        
+        The training worker saves the engines under MODEL_ARTIFACTS_DIR and
+        this process serves them memory-mapped from there. Serving continues
+        on the current bundle while training runs. Concurrent calls share
+        the training run already in progress, and across API workers only
+        the one holding the training lock trains; the others load its
+        bundle in sync_models().
         
         Args:
             interactions: User-product interactions
             products: Product metadata
+            
+        Returns:
+            The newly served ModelBundle, or None if another worker is training
         """
-        print("🤖 Training recommendation models...")
+        if not any([CF_AVAILABLE, MF_AVAILABLE, HYBRID_AVAILABLE, ALS_AVAILABLE]):
+            return None
         
-        # Prepare data
-        cf_matrix = self.cf_engine.prepare_interaction_matrix(interactions)
-        mf_matrix = self.mf_engine.prepare_data(interactions)
+        if self._training is None or self._training.done():
+            self._training = asyncio.ensure_future(
+                self._train_and_swap(interactions, products)
+            )
+        return await asyncio.shield(self._training)
+    
+    async def _train_and_swap(
+        self,
+        interactions: List[dict],
+        products: List[dict]
+    ) -> Optional[ModelBundle]:
+        base_path = settings.MODEL_ARTIFACTS_DIR
+        lock = await asyncio.to_thread(try_lock_training, base_path)
+        if lock is None:
+            print("[INFO] Another worker is training the models")
+            return None
         
-        # Train collaborative filtering
-        self.cf_engine.train_user_based(cf_matrix)
-        self.cf_engine.train_item_based(cf_matrix)
-        print("✅ Collaborative filtering models trained")
+        try:
+            # A worker that trained just before we took the lock already
+            # published a fresh bundle
+            manifest = await asyncio.to_thread(read_bundle_manifest, base_path)
+            if manifest and not self._is_stale(parse_datetime(manifest["trained_at"])):
+                if manifest["version"] == self.model_version:
+                    return self._bundle
+                return await self._load_and_swap(base_path, manifest)
+            
+            with self._fold_in_lock:
+                self._fold_in_log = OrderedDict()
+            
+            # ALS refits start from the factors currently being served
+            warm_start = None
+            if self.als_engine is not None:
+                warm_start = self.als_engine.warm_start_state()
+            
+            loop = asyncio.get_running_loop()
+            manifest = await loop.run_in_executor(
+                self._get_training_executor(),
+                train_and_save,
+                interactions,
+                products,
+                base_path,
+                engine_config(),
+                warm_start
+            )
+        finally:
+            unlock_training(lock)
+        
+        bundle = await self._load_and_swap(base_path, manifest)
+        
+        # Listeners run once, in the worker that trained the bundle
+        for listener in self._bundle_listeners:
+            try:
+                listener(bundle)
+            except Exception as e:
+                print(f"[WARNING] Bundle listener failed: {e}")
+        return bundle
+    
+    async def _load_and_swap(self, base_path: str, manifest: Dict) -> ModelBundle:
+        """Serve the engines named by a bundle manifest"""
+        engines = await asyncio.to_thread(load_engines, base_path, manifest)
+        bundle = self._swap_bundle(
+            engines, parse_datetime(manifest["trained_at"]), manifest["version"]
+        )
         
-        # Train matrix factorization
-        self.mf_engine.train(mf_matrix)
-        print("✅ Matrix factorization model trained")
+        # The training data predates these interactions
+        await asyncio.to_thread(self._replay_fold_ins, bundle)
+        return bundle
+    
+    async def sync_models(self) -> Optional[ModelBundle]:
+        """
+        Serve the bundle published in MODEL_ARTIFACTS_DIR if it is not
+        the one being served (after a restart, or a retrain by another
+        API worker)
         
-        # Train hybrid model
-        dataset, interactions_matrix, item_features = self.hybrid_engine.prepare_data(
-            interactions, products
-        )
-        self.hybrid_engine.train(interactions_matrix, item_features)
-        print("✅ Hybrid model trained")
+        Returns:
+            The newly served ModelBundle, or None if nothing changed
+        """
+        base_path = settings.MODEL_ARTIFACTS_DIR
+        manifest = await asyncio.to_thread(read_bundle_manifest, base_path)
+        if manifest is None or manifest["version"] == self.model_version:
+            return None
+        return await self._load_and_swap(base_path, manifest)
+    
+    def add_bundle_listener(self, listener: Callable[[ModelBundle], None]):
+        """Register a callback for newly trained bundles (e.g. homepage materialization)"""
+        self._bundle_listeners.append(listener)
+    
+    async def run_retrain_loop(
+        self,
+        load_training_data: Callable[[], Tuple[List[dict], List[dict]]],
+        check_interval: Optional[int] = None
+    ):
+        """
+        Load newly published bundles, and retrain whenever should_retrain()
+        says the models are stale
+        
+        Args:
+            load_training_data: Returns (interactions, products) to train on
+            check_interval: Seconds between staleness checks
+        """
+        check_interval = check_interval or settings.MODEL_RETRAIN_CHECK_INTERVAL
+        while True:
+            try:
+                await self.sync_models()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WARNING] Could not load published models: {e}")
+            if self.should_retrain():
+                try:
+                    interactions, products = load_training_data()
+                    await self.train_models(interactions, products)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"[WARNING] Background model training failed: {e}")
+            await asyncio.sleep(check_interval)
+    
+    def start_background_training(
+        self,
+        load_training_data: Callable[[], Tuple[List[dict], List[dict]]]
+    ) -> asyncio.Task:
+        """Start the retrain loop on the running event loop"""
+        if self._retrain_task is None or self._retrain_task.done():
+            self._retrain_task = asyncio.create_task(
+                self.run_retrain_loop(load_training_data)
+            )
+        return self._retrain_task
+    
+    async def stop_background_training(self):
+        """Stop the retrain loop and release the training worker"""
+        if self._retrain_task is not None:
+            self._retrain_task.cancel()
+            try:
+                await self._retrain_task
+            except asyncio.CancelledError:
+                pass
+            self._retrain_task = None
+        if self._training_executor is not None:
+            self._training_executor.shutdown(wait=False, cancel_futures=True)
+            self._training_executor = None
+    
+    def fold_in(
+        self,
+        user_id: str,
+        user_interactions: List[dict],
+        products: Optional[List[dict]] = None
+    ) -> bool:
+        """
+        Make a user's latest interactions count without a full retrain
+        
+        Projects the user onto the served models' existing factors, so a
+        new user gets personalised results right away. Runs a few small
+        solves; call it from a worker thread (see schedule_fold_in), since
+        fold-ins are serialized and block until the previous one finishes.
+        
+        Args:
+            user_id: User whose interactions changed
+            user_interactions: All of the user's interactions
+            products: Products of the new interactions, folded into the
+                hybrid model from their metadata if the model has not seen them
+            
+        Returns:
+            True if any model folded the user in
+        """
+        products = products or []
+        with self._fold_in_lock:
+            _, logged_products = self._fold_in_log.pop(user_id, (None, []))
+            self._fold_in_log[user_id] = (user_interactions, logged_products + products)
+            # Oldest users are dropped; the next retrain covers them
+            while len(self._fold_in_log) > settings.FOLD_IN_MAX_USERS:
+                self._fold_in_log.popitem(last=False)
+            
+            bundle = self._bundle
+            if bundle is None:
+                return False
+            return self._fold_in_bundle(bundle, user_id, user_interactions, products)
+    
+    def schedule_fold_in(
+        self,
+        user_id: str,
+        load_interactions: Callable[[], List[dict]],
+        product: Optional[dict] = None
+    ):
+        """
+        Fold a user in on an inference worker (interaction listener)
         
-        self.models_trained = True
-        self.last_training = datetime.utcnow()
+        Interactions arriving before the fold-in starts are coalesced into
+        it. When the inference queue is full the fold-in is skipped; the
+        next interaction or retrain picks the user up.
+        
+        Args:
+            user_id: User whose interactions changed
+            load_interactions: Returns all of the user's interactions
+            product: Product of the new interaction
+        """
+        pending = self._pending_fold_ins.get(user_id)
+        if pending is not None:
+            if product:
+                pending.append(product)
+            return
+        
+        self._pending_fold_ins[user_id] = [product] if product else []
+        task = asyncio.ensure_future(self._run_fold_in(user_id, load_interactions))
+        self._fold_in_tasks.add(task)
+        task.add_done_callback(self._fold_in_tasks.discard)
+    
+    async def _run_fold_in(self, user_id: str, load_interactions: Callable[[], List[dict]]):
+        products = self._pending_fold_ins.pop(user_id, [])
+        try:
+            await self.inference.run(self.fold_in, user_id, load_interactions(), products)
+        except InferenceOverloaded:
+            print(f"[WARNING] Fold-in skipped for user {user_id}: inference queue full")
+        except Exception as e:
+            print(f"[WARNING] Fold-in failed for user {user_id}: {e}")
+    
+    def _replay_fold_ins(self, bundle: ModelBundle):
+        """Apply fold-ins logged during training to the newly served bundle"""
+        with self._fold_in_lock:
+            fold_in_log, self._fold_in_log = self._fold_in_log, OrderedDict()
+            for user_id, (user_interactions, products) in fold_in_log.items():
+                self._fold_in_bundle(bundle, user_id, user_interactions, products)
+    
+    def _fold_in_bundle(
+        self,
+        bundle: ModelBundle,
+        user_id: str,
+        user_interactions: List[dict],
+        products: List[dict]
+    ) -> bool:
+        folded = False
+        try:
+            if bundle.hybrid_engine:
+                for product in products:
+                    bundle.hybrid_engine.fold_in_item(product)
+                folded |= bundle.hybrid_engine.fold_in_user(user_id, user_interactions)
+            if bundle.mf_engine:
+                folded |= bundle.mf_engine.fold_in_user(user_id, user_interactions)
+            if bundle.als_engine:
+                folded |= bundle.als_engine.fold_in_user(user_id, user_interactions)
+        except Exception as e:
+            print(f"[WARNING] Fold-in failed for user {user_id}: {e}")
+        return folded
     
     async def get_personalized_recommendations(
         self,
@@ -102,32 +395,40 @@ class RecommendationService:
         Args:
             user_id: Target user ID
             n_recommendations: Number of recommendations
-            algorithm: Algorithm to use (user_based, item_based, hybrid, matrix_factorization)
+            algorithm: Algorithm to use (user_based, item_based, hybrid, matrix_factorization, als)
             
         Returns:
             List of recommended products with scores
+            
+        Raises:
+            InferenceOverloaded: The inference queue is full
         """
         # Return mock recommendations if no models available
-        if not any([CF_AVAILABLE, MF_AVAILABLE, HYBRID_AVAILABLE]):
+        if not any([CF_AVAILABLE, MF_AVAILABLE, HYBRID_AVAILABLE, ALS_AVAILABLE]):
             return self._get_mock_recommendations(user_id, n_recommendations)
         
-        if not self.models_trained:
+        bundle = self._bundle
+        if bundle is None:
             return self._get_mock_recommendations(user_id, n_recommendations)
         
         try:
-            if algorithm == "user_based" and self.cf_engine:
-                recommendations = self.cf_engine.recommend_user_based(
-                    user_id, n_recommendations
+            if algorithm == "user_based" and bundle.cf_engine:
+                recommendations = await self.inference.run(
+                    bundle.cf_engine.recommend_user_based, user_id, n_recommendations
                 )
-            elif algorithm == "item_based" and self.cf_engine:
+            elif algorithm == "item_based" and bundle.cf_engine:
                 recommendations = []
-            elif algorithm == "matrix_factorization" and self.mf_engine:
-                recommendations = self.mf_engine.recommend(
-                    user_id, n_recommendations
+            elif algorithm == "matrix_factorization" and bundle.mf_engine:
+                recommendations = await self.inference.run(
+                    bundle.mf_engine.recommend, user_id, n_recommendations
+                )
+            elif algorithm == "hybrid" and bundle.hybrid_engine:
+                recommendations = await self.inference.run(
+                    bundle.hybrid_engine.recommend, user_id, n_recommendations
                 )
-            elif algorithm == "hybrid" and self.hybrid_engine:
-                recommendations = self.hybrid_engine.recommend(
-                    user_id, n_recommendations
+            elif algorithm == "als" and bundle.als_engine:
+                recommendations = await self.inference.run(
+                    bundle.als_engine.recommend, user_id, n_recommendations
                 )
             else:
                 return self._get_mock_recommendations(user_id, n_recommendations)
@@ -137,6 +438,8 @@ class RecommendationService:
                 for pid, score in recommendations
             ]
         
+        except InferenceOverloaded:
+            raise
         except Exception as e:
             print(f"Error generating recommendations: {e}")
             return self._get_mock_recommendations(user_id, n_recommendations)
@@ -170,25 +473,33 @@ class RecommendationService:
             
         Returns:
             List of similar products with similarity scores
+            
+        Raises:
+            InferenceOverloaded: The inference queue is full
         """
-        if not any([CF_AVAILABLE, MF_AVAILABLE, HYBRID_AVAILABLE]):
+        if not any([CF_AVAILABLE, MF_AVAILABLE, HYBRID_AVAILABLE, ALS_AVAILABLE]):
             return self._get_mock_similar_products(product_id, n_similar)
             
-        if not self.models_trained:
+        bundle = self._bundle
+        if bundle is None:
             return self._get_mock_similar_products(product_id, n_similar)
         
         try:
-            if algorithm == "item_based" and self.cf_engine:
-                similar_products = self.cf_engine.recommend_item_based(
-                    product_id, n_similar
+            if algorithm == "item_based" and bundle.cf_engine:
+                similar_products = await self.inference.run(
+                    bundle.cf_engine.recommend_item_based, product_id, n_similar
                 )
-            elif algorithm == "matrix_factorization" and self.mf_engine:
-                similar_products = self.mf_engine.get_similar_items(
-                    product_id, n_similar
+            elif algorithm == "matrix_factorization" and bundle.mf_engine:
+                similar_products = await self.inference.run(
+                    bundle.mf_engine.get_similar_items, product_id, n_similar
                 )
-            elif algorithm == "hybrid" and self.hybrid_engine:
-                similar_products = self.hybrid_engine.recommend_similar_items(
-                    product_id, n_similar
+            elif algorithm == "hybrid" and bundle.hybrid_engine:
+                similar_products = await self.inference.run(
+                    bundle.hybrid_engine.recommend_similar_items, product_id, n_similar
+                )
+            elif algorithm == "als" and bundle.als_engine:
+                similar_products = await self.inference.run(
+                    bundle.als_engine.get_similar_items, product_id, n_similar
                 )
             else:
                 return self._get_mock_similar_products(product_id, n_similar)
@@ -198,6 +509,8 @@ class RecommendationService:
                 for pid, score in similar_products
             ]
         
+        except InferenceOverloaded:
+            raise
         except Exception as e:
             print(f"Error finding similar products: {e}")
             return self._get_mock_similar_products(product_id, n_similar)
@@ -228,13 +541,17 @@ class RecommendationService:
             
         Returns:
             List of recommended bundle products
+            
+        Raises:
+            InferenceOverloaded: The inference queue is full
         """
-        if not self.models_trained:
+        bundle = self._bundle
+        if bundle is None:
             return []
         
         try:
-            recommendations = self.cf_engine.recommend_for_basket(
-                product_ids, n_recommendations
+            recommendations = await self.inference.run(
+                bundle.cf_engine.recommend_for_basket, product_ids, n_recommendations
             )
             
             return [
@@ -242,6 +559,8 @@ class RecommendationService:
                 for pid, score in recommendations
             ]
         
+        except InferenceOverloaded:
+            raise
         except Exception as e:
             print(f"Error finding bundle recommendations: {e}")
             return []
@@ -337,7 +656,28 @@ class RecommendationService:
         base_recs = await self.get_personalized_recommendations(
             user_id, n_recommendations * 2, "hybrid"
         )
+        return self.apply_context(base_recs, context, n_recommendations)
+    
+    @staticmethod
+    def apply_context(
+        base_recs: List[Dict],
+        context: Dict,
+        n_recommendations: int = 10
+    ) -> List[Dict]:
+        """
+        Re-rank recommendations for a context
+        
+        Base recommendations are not modified (they may be shared cache
+        entries); boosted copies are returned.
         
+        Args:
+            base_recs: Candidate recommendations with scores
+            context: Context data (time_of_day, county, season, weather, etc.)
+            n_recommendations: Number of recommendations
+            
+        Returns:
+            Top n_recommendations candidates by boosted score
+        """
         # Apply context filters and boost
         # This is a simplified version - in production, train separate models
         # or add context features to the hybrid model
@@ -347,6 +687,7 @@ class RecommendationService:
         season = context.get('season')  # rainy, dry, festive
         
         # Context boost factors
+        boosted = []
         for rec in base_recs:
             boost = 1.0
             
@@ -367,46 +708,57 @@ class RecommendationService:
             elif season == "festive":
                 boost *= 1.3  # Boost gifts, decorations
             
-            rec['score'] *= boost
-            rec['context_boost'] = boost
+            boosted.append({**rec, 'score': rec['score'] * boost, 'context_boost': boost})
         
         # Re-sort and return top N
-        sorted_recs = sorted(base_recs, key=lambda x: x['score'], reverse=True)
+        sorted_recs = sorted(boosted, key=lambda x: x['score'], reverse=True)
         return sorted_recs[:n_recommendations]
     
     def should_retrain(self) -> bool:
         """Check if models should be retrained"""
         if not self.models_trained:
             return True
-        
-        if self.last_training is None:
+        return self._is_stale(self.last_training)
+    
+    def _is_stale(self, trained_at: Optional[datetime]) -> bool:
+        if trained_at is None:
             return True
-        
-        time_since_training = datetime.utcnow() - self.last_training
+        time_since_training = datetime.utcnow() - trained_at
         return time_since_training.total_seconds() > settings.MODEL_RETRAIN_INTERVAL
     
-    async def save_models(self, base_path: str = "models"):
-        """Save all trained models"""
-        import os
-        os.makedirs(base_path, exist_ok=True)
-        
-        self.cf_engine.save_model(f"{base_path}/collaborative_filtering.joblib")
-        self.mf_engine.save_model(f"{base_path}/matrix_factorization.joblib")
-        self.hybrid_engine.save_model(f"{base_path}/hybrid_model.joblib")
+    async def save_models(self, base_path: Optional[str] = None):
+        """Save the served models as a bundle under base_path"""
+        base_path = base_path or settings.MODEL_ARTIFACTS_DIR
+        bundle = self._bundle
+        if bundle is None:
+            print("[WARNING] No trained models to save")
+            return
+        
+        engines = {name: getattr(bundle, name) for name in MODEL_FILES}
+        await asyncio.to_thread(
+            save_engines, engines, base_path, bundle.trained_at, bundle.version
+        )
         print("✅ Models saved successfully")
     
-    async def load_models(self, base_path: str = "models"):
-        """Load trained models"""
+    async def load_models(self, base_path: Optional[str] = None):
+        """Load saved models and swap them in as a new bundle"""
+        base_path = base_path or settings.MODEL_ARTIFACTS_DIR
         try:
-            self.cf_engine.load_model(f"{base_path}/collaborative_filtering.joblib")
-            self.mf_engine.load_model(f"{base_path}/matrix_factorization.joblib")
-            self.hybrid_engine.load_model(f"{base_path}/hybrid_model.joblib")
-            self.models_trained = True
-            self.last_training = self.hybrid_engine.trained_at
+            manifest = await asyncio.to_thread(read_bundle_manifest, base_path)
+            if manifest is None:
+                # Engines saved one by one, before bundle manifests
+                engines = await asyncio.to_thread(
+                    load_engines, base_path, {"engines": MODEL_FILES}
+                )
+                trained_at = max(
+                    engine.trained_at for engine in engines.values() if engine
+                )
+                self._swap_bundle(engines, trained_at, self.model_version + 1)
+            else:
+                await self._load_and_swap(base_path, manifest)
             print("✅ Models loaded successfully")
         except Exception as e:
             print(f"[WARNING] Could not load models: {e}")
-            self.models_trained = False
 
 
 # Global instance
@@ -2,58 +2,221 @@
 Redis Caching Service
 For fast access to recommendations and trending items
 """
+import asyncio
 import json
-from typing import Optional, List, Dict, Any
+import math
+import random
+import time
+import uuid
+from typing import Optional, List, Dict, Any, Awaitable, Callable
 from datetime import timedelta, datetime
 from app.core.config import settings
+from app.services.cache_codecs import CompressedCodec, JsonCodec, PackedCodec
+from app.services.local_cache import DEFAULT_NAMESPACES, MISS, LocalCache, match_prefix
+from app.services.suggestion_index import SuggestionIndex, query_prefixes
 
 # Optional Redis import
 try:
-    import redis
+    import redis.asyncio as aioredis
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from redis.exceptions import TimeoutError as RedisTimeoutError
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
     print("⚠️  Redis not available - caching disabled")
 
 
+def default_codecs() -> Dict[str, JsonCodec]:
+    """Key prefix -> codec; keys under no prefix are stored as plain JSON"""
+    packed = CompressedCodec(PackedCodec(), settings.CACHE_COMPRESSION_THRESHOLD)
+    return {
+        "recommendations": packed,
+        "trending": packed
+    }
+
+
 class RedisService:
-    """Redis caching service for recommendations and trending data"""
+    """
+    Redis caching service for recommendations and trending data
+    
+    Uses the asyncio client over a shared connection pool, so cache calls
+    never block the event loop. Connection health is checked by a
+    background task rather than a PING before every command; commands
+    short-circuit while Redis is known to be down.
+    
+    Hot namespaces (similar products, user recommendations, trending) are
+    also kept in an in-process L1 cache. Writes and deletes publish the
+    key on a Redis channel so other workers drop their stale L1 copies.
     
-    def __init__(self):
-        self.redis_client = None
-        self.connect()
+    get_or_compute() protects expensive entries from stampedes: one
+    recompute per key per process (single-flight), one per key across
+    workers (a Redis lock), expired values served while a background task
+    refreshes them, and XFetch early expiration so refreshes of a popular
+    key are spread out instead of all landing on its expiry.
     
-    def connect(self):
-        """Connect to Redis"""
+    Values are stored as bytes by the codec registered for the key's
+    namespace (see cache_codecs); every codec's output is readable by
+    decode_payload, so changing a namespace's codec needs no migration.
+    """
+    
+    # Sorted set of user id -> time of last tracked activity
+    ACTIVE_USERS_KEY = "activity:active_users"
+    
+    def __init__(
+        self,
+        client: Optional[Any] = None,
+        local_cache: Optional[LocalCache] = None,
+        codecs: Optional[Dict[str, JsonCodec]] = None
+    ):
+        """
+        Args:
+            client: Existing redis.asyncio client to use instead of
+                building one from settings (e.g. fakeredis in benchmarks);
+                it must not set decode_responses, as values are binary
+            local_cache: L1 cache to use (defaults to DEFAULT_NAMESPACES,
+                or none when LOCAL_CACHE_ENABLED is off)
+            codecs: Key prefix -> codec (defaults to default_codecs())
+        """
+        self.redis_client = client if client is not None else self._create_client()
+        # Longest prefix first so nested namespaces win
+        codecs = default_codecs() if codecs is None else codecs
+        self.codecs = dict(sorted(codecs.items(), key=lambda item: -len(item[0])))
+        self._json_codec = JsonCodec()
+        if local_cache is None:
+            local_cache = LocalCache(DEFAULT_NAMESPACES if settings.LOCAL_CACHE_ENABLED else {})
+        self.local_cache = local_cache
+        self._healthy = False
+        self._health_task: Optional[asyncio.Task] = None
+        self._invalidation_task: Optional[asyncio.Task] = None
+        # Identifies this worker's own invalidation messages
+        self._instance_id = uuid.uuid4().hex
+        # Cache key -> recompute task shared by every waiter in this process
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Language -> in-process autocomplete index, and its rebuild task
+        self._suggestion_indexes: Dict[str, SuggestionIndex] = {}
+        self._suggestion_refreshes: Dict[str, asyncio.Task] = {}
+        # Callbacks run with (user_id, activity) for each tracked activity
+        self._activity_listeners: List[Callable[[str, Dict], None]] = []
+    
+    def _create_client(self):
+        """Client over a shared connection pool (no connection is opened yet)"""
         if not REDIS_AVAILABLE:
             print("[WARNING] Redis package not installed - caching disabled")
-            self.redis_client = None
-            return
-            
-        try:
-            self.redis_client = redis.from_url(
-                settings.REDIS_URL,
-                password=settings.REDIS_PASSWORD,
-                db=settings.REDIS_DB,
-                decode_responses=True
-            )
-            # Test connection
-            self.redis_client.ping()
+            return None
+        
+        pool = aioredis.ConnectionPool.from_url(
+            settings.REDIS_URL,
+            password=settings.REDIS_PASSWORD,
+            db=settings.REDIS_DB,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT
+        )
+        return aioredis.Redis(connection_pool=pool)
+    
+    async def connect(self) -> bool:
+        """Check the connection once and start background health checks"""
+        if await self.check_health():
             print("[SUCCESS] Connected to Redis")
-        except Exception as e:
-            print(f"[WARNING] Redis connection failed: {e}")
-            print("   App will run without caching")
-            self.redis_client = None
+        elif self.redis_client is not None:
+            print("[WARNING] Redis connection failed")
+            print("   App will run without caching until Redis is reachable")
+        self.start_health_checks()
+        return self._healthy
     
-    def is_connected(self) -> bool:
-        """Check if Redis is connected"""
+    async def check_health(self) -> bool:
+        """PING Redis and record the result"""
         if self.redis_client is None:
+            self._healthy = False
             return False
         try:
-            self.redis_client.ping()
-            return True
-        except:
-            return False
+            await self.redis_client.ping()
+            self._healthy = True
+        except Exception:
+            self._healthy = False
+        return self._healthy
+    
+    def start_health_checks(self):
+        """Start the health check and L1 invalidation loops on the running event loop"""
+        if self.redis_client is None:
+            return
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_check_loop())
+        if self.local_cache.namespaces and (
+            self._invalidation_task is None or self._invalidation_task.done()
+        ):
+            self._invalidation_task = asyncio.create_task(self._invalidation_loop())
+    
+    async def _health_check_loop(self):
+        while True:
+            await asyncio.sleep(settings.REDIS_HEALTH_CHECK_INTERVAL)
+            was_healthy = self._healthy
+            if await self.check_health() != was_healthy:
+                state = "reconnected" if self._healthy else "connection lost"
+                print(f"[INFO] Redis {state}")
+    
+    async def _invalidation_loop(self):
+        """Apply other workers' L1 invalidations received over pub/sub"""
+        channel = settings.LOCAL_CACHE_INVALIDATION_CHANNEL
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(channel)
+                # Anything published while we were not subscribed was missed
+                self.local_cache.clear()
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Retry the subscription after the next health check interval
+                self.local_cache.clear()
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(settings.REDIS_HEALTH_CHECK_INTERVAL)
+    
+    def _apply_invalidation(self, data: str):
+        message = json.loads(data)
+        if message.get("origin") != self._instance_id:
+            self.local_cache.invalidate(message.get("keys", []))
+    
+    def _publish_invalidation(self, pipe, keys: List[str]):
+        """Queue an L1 invalidation for other workers on a pipeline"""
+        keys = [key for key in keys if self.local_cache.handles(key)]
+        if keys:
+            pipe.publish(
+                settings.LOCAL_CACHE_INVALIDATION_CHANNEL,
+                json.dumps({"origin": self._instance_id, "keys": keys})
+            )
+    
+    def _codec(self, key: str) -> JsonCodec:
+        prefix = match_prefix(key, self.codecs)
+        return self._json_codec if prefix is None else self.codecs[prefix]
+    
+    def _encode(self, key: str, value: Any) -> bytes:
+        return self._codec(key).encode(value)
+    
+    def _decode(self, key: str, data: bytes) -> Any:
+        return self._codec(key).decode(data)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """L1 hit/miss counters per namespace"""
+        return self.local_cache.stats()
+    
+    def is_connected(self) -> bool:
+        """Last known connection state (no network round-trip)"""
+        return self.redis_client is not None and self._healthy
+    
+    def _handle_error(self, operation: str, error: Exception):
+        """Log a failed command; connection failures pause caching until the next health check"""
+        print(f"Redis {operation} error: {error}")
+        if isinstance(error, (RedisConnectionError, RedisTimeoutError, OSError)):
+            self._healthy = False
     
     async def get(self, key: str) -> Optional[Any]:
         """
@@ -65,16 +228,22 @@ class RedisService:
         Returns:
             Cached value or None
         """
+        value = self.local_cache.get(key)
+        if value is not MISS:
+            return value
+        
         if not self.is_connected():
             return None
         
         try:
-            value = self.redis_client.get(key)
+            value = await self.redis_client.get(key)
             if value:
-                return json.loads(value)
+                value = self._decode(key, value)
+                self.local_cache.set(key, value)
+                return value
             return None
         except Exception as e:
-            print(f"Redis GET error: {e}")
+            self._handle_error("GET", e)
             return None
     
     async def set(
@@ -94,40 +263,312 @@ class RedisService:
         Returns:
             Success status
         """
+        self.local_cache.set(key, value, ttl)
+        
         if not self.is_connected():
             return False
         
         try:
-            serialized = json.dumps(value)
-            if ttl:
-                self.redis_client.setex(key, ttl, serialized)
-            else:
-                self.redis_client.set(key, serialized)
+            serialized = self._encode(key, value)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                if ttl:
+                    pipe.setex(key, ttl, serialized)
+                else:
+                    pipe.set(key, serialized)
+                self._publish_invalidation(pipe, [key])
+                await pipe.execute()
+            return True
+        except Exception as e:
+            self._handle_error("SET", e)
+            return False
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Get many values in one round trip
+        
+        Args:
+            keys: Cache keys
+            
+        Returns:
+            Cached values in key order (None for misses)
+        """
+        values = [self.local_cache.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is MISS]
+        for i in missing:
+            values[i] = None
+        if not missing or not self.is_connected():
+            return values
+        
+        try:
+            fetched = await self.redis_client.mget([keys[i] for i in missing])
+            for i, value in zip(missing, fetched):
+                if value:
+                    values[i] = self._decode(keys[i], value)
+                    self.local_cache.set(keys[i], values[i])
+            return values
+        except Exception as e:
+            self._handle_error("MGET", e)
+            return values
+    
+    async def mset(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Set many values in one round trip (pipelined SET/SETEX)
+        
+        Args:
+            items: Cache key -> value
+            ttl: Time to live in seconds, applied to every key
+            
+        Returns:
+            Success status
+        """
+        for key, value in items.items():
+            self.local_cache.set(key, value, ttl)
+        
+        if not items or not self.is_connected():
+            return False
+        
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    serialized = self._encode(key, value)
+                    if ttl:
+                        pipe.setex(key, ttl, serialized)
+                    else:
+                        pipe.set(key, serialized)
+                self._publish_invalidation(pipe, list(items))
+                await pipe.execute()
             return True
         except Exception as e:
-            print(f"Redis SET error: {e}")
+            self._handle_error("MSET", e)
             return False
     
     async def delete(self, key: str) -> bool:
         """Delete key from cache"""
+        self.local_cache.invalidate([key])
+        
         if not self.is_connected():
             return False
         
         try:
-            self.redis_client.delete(key)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(key)
+                self._publish_invalidation(pipe, [key])
+                await pipe.execute()
             return True
         except Exception as e:
-            print(f"Redis DELETE error: {e}")
+            self._handle_error("DELETE", e)
             return False
     
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: Optional[int] = None
+    ) -> Any:
+        """
+        Cached value for key, computing and caching it when missing
+        
+        Entries are stored as {"value", "expires_at", "delta"} envelopes
+        (delta is how long the last compute took), so keys used here must
+        not also be read with get(). An entry is considered expired early
+        with a probability that grows as expiry approaches and with delta
+        (XFetch); an expired entry younger than ttl + stale_ttl is returned
+        as-is while a single background task refreshes it.
+        
+        Args:
+            key: Cache key
+            compute: Coroutine function producing the value (None results
+                are returned but not cached)
+            ttl: Seconds the value is fresh
+            stale_ttl: Extra seconds an expired value may be served
+                (defaults to CACHE_STALE_TTL, 0 to always wait for a recompute)
+            
+        Returns:
+            Cached or freshly computed value
+        """
+        if stale_ttl is None:
+            stale_ttl = settings.CACHE_STALE_TTL
+        
+        entry = self._unwrap(await self.get(key))
+        if entry is not None:
+            # XFetch: -log(U) is exponential, so most requests see the entry
+            # as fresh until just before expiry and a few refresh it early
+            early = entry["delta"] * settings.CACHE_XFETCH_BETA * -math.log(1.0 - random.random())
+            if time.time() + early < entry["expires_at"]:
+                return entry["value"]
+            if stale_ttl > 0:
+                self._recompute(key, compute, ttl, stale_ttl, have_stale=True)
+                return entry["value"]
+        
+        return await asyncio.shield(self._recompute(key, compute, ttl, stale_ttl))
+    
+    @staticmethod
+    def _unwrap(entry: Any) -> Optional[Dict]:
+        if isinstance(entry, dict) and "expires_at" in entry and "value" in entry:
+            return entry
+        return None
+    
+    def _recompute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        have_stale: bool = False
+    ) -> asyncio.Task:
+        """The in-flight recompute task for key, starting one if needed"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._compute_and_store(key, compute, ttl, stale_ttl, have_stale)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._recompute_done(key, t))
+        return task
+    
+    def _recompute_done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Background refreshes have no awaiter to report errors to
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[WARNING] Cache recompute failed for {key}: {task.exception()}")
+    
+    async def _compute_and_store(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        have_stale: bool
+    ) -> Any:
+        lock_key = f"lock:{key}"
+        token = await self._acquire_lock(lock_key)
+        if token is None:
+            # Another worker is recomputing: keep serving stale, or wait for its result
+            if have_stale:
+                return None
+            entry = await self._wait_for_entry(key)
+            if entry is not None:
+                return entry["value"]
+        
+        try:
+            start = time.time()
+            value = await compute()
+            delta = time.time() - start
+            if value is not None:
+                await self.set(
+                    key,
+                    {"value": value, "expires_at": start + delta + ttl, "delta": delta},
+                    ttl + stale_ttl
+                )
+            return value
+        finally:
+            if token is not None:
+                await self._release_lock(lock_key, token)
+    
+    async def _acquire_lock(self, lock_key: str) -> Optional[str]:
+        """
+        Take a cross-worker recompute lock
+        
+        Returns:
+            Lock token, "" when Redis is unavailable (compute without a
+            lock), or None when another worker holds the lock
+        """
+        if not self.is_connected():
+            return ""
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis_client.set(
+                lock_key, token, nx=True, ex=settings.CACHE_LOCK_TIMEOUT
+            )
+            return token if acquired else None
+        except Exception as e:
+            self._handle_error("LOCK", e)
+            return ""
+    
+    async def _release_lock(self, lock_key: str, token: str):
+        """Delete the lock only if it is still ours (it may have timed out)"""
+        if not token or not self.is_connected():
+            return
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                await pipe.watch(lock_key)
+                if await pipe.get(lock_key) == token.encode():
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    await pipe.execute()
+        except Exception as e:
+            self._handle_error("UNLOCK", e)
+    
+    async def _wait_for_entry(self, key: str, poll_interval: float = 0.05) -> Optional[Dict]:
+        """
+        Poll for the entry another worker is computing
+        
+        Waits at most CACHE_LOCK_WAIT (a request budget, far shorter than
+        the lock timeout); None means the caller should compute itself.
+        """
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(poll_interval, max(deadline - time.monotonic(), 0)))
+            if not self.is_connected():
+                return None
+            try:
+                value = await self.redis_client.get(key)
+                entry = self._unwrap(self._decode(key, value)) if value else None
+                if entry is not None and entry["expires_at"] > time.time():
+                    self.local_cache.set(key, entry)
+                    return entry
+                if not await self.redis_client.exists(f"lock:{key}"):
+                    # Lock released without a fresh entry (e.g. a None result)
+                    return None
+            except Exception as e:
+                self._handle_error("lock wait", e)
+                return None
+        return None
+    
+    @staticmethod
+    def user_recommendations_key(
+        user_id: str,
+        algorithm: str = "hybrid",
+        model_version: Optional[int] = None
+    ) -> str:
+        key = f"recommendations:user:{user_id}:{algorithm}"
+        return key if model_version is None else f"{key}:v{model_version}"
+    
+    @staticmethod
+    def similar_products_key(
+        product_id: str,
+        algorithm: str = "item_based",
+        model_version: Optional[int] = None
+    ) -> str:
+        key = f"recommendations:similar:{product_id}:{algorithm}"
+        return key if model_version is None else f"{key}:v{model_version}"
+    
+    @staticmethod
+    def homepage_key(user_id: str, county: Optional[str] = None) -> str:
+        return f"homepage:user:{user_id}:{county or 'all'}"
+    
+    @staticmethod
+    def trending_key(
+        category: Optional[str] = None,
+        county: Optional[str] = None,
+        time_window: str = "24h"
+    ) -> str:
+        key_parts = ["trending", time_window]
+        if category:
+            key_parts.append(f"cat:{category}")
+        if county:
+            key_parts.append(f"county:{county}")
+        return ":".join(key_parts)
+    
     async def get_user_recommendations(
         self,
         user_id: str,
         algorithm: str = "hybrid"
     ) -> Optional[List[Dict]]:
         """Get cached user recommendations"""
-        key = f"recommendations:user:{user_id}:{algorithm}"
-        return await self.get(key)
+        return await self.get(self.user_recommendations_key(user_id, algorithm))
     
     async def cache_user_recommendations(
         self,
@@ -137,25 +578,27 @@ class RedisService:
         ttl: int = 3600
     ) -> bool:
         """Cache user recommendations"""
-        key = f"recommendations:user:{user_id}:{algorithm}"
-        return await self.set(key, recommendations, ttl)
+        return await self.set(self.user_recommendations_key(user_id, algorithm), recommendations, ttl)
     
     async def get_similar_products(
         self,
-        product_id: str
+        product_id: str,
+        algorithm: str = "item_based",
+        model_version: Optional[int] = None
     ) -> Optional[List[Dict]]:
         """Get cached similar products"""
-        key = f"recommendations:similar:{product_id}"
-        return await self.get(key)
+        return await self.get(self.similar_products_key(product_id, algorithm, model_version))
     
     async def cache_similar_products(
         self,
         product_id: str,
         similar_products: List[Dict],
+        algorithm: str = "item_based",
+        model_version: Optional[int] = None,
         ttl: int = 7200
     ) -> bool:
         """Cache similar products"""
-        key = f"recommendations:similar:{product_id}"
+        key = self.similar_products_key(product_id, algorithm, model_version)
         return await self.set(key, similar_products, ttl)
     
     async def get_trending_products(
@@ -165,13 +608,7 @@ class RedisService:
         time_window: str = "24h"
     ) -> Optional[List[Dict]]:
         """Get cached trending products"""
-        key_parts = ["trending", time_window]
-        if category:
-            key_parts.append(f"cat:{category}")
-        if county:
-            key_parts.append(f"county:{county}")
-        key = ":".join(key_parts)
-        return await self.get(key)
+        return await self.get(self.trending_key(category, county, time_window))
     
     async def cache_trending_products(
         self,
@@ -182,13 +619,7 @@ class RedisService:
         ttl: int = 300
     ) -> bool:
         """Cache trending products"""
-        key_parts = ["trending", time_window]
-        if category:
-            key_parts.append(f"cat:{category}")
-        if county:
-            key_parts.append(f"county:{county}")
-        key = ":".join(key_parts)
-        return await self.set(key, trending_products, ttl)
+        return await self.set(self.trending_key(category, county, time_window), trending_products, ttl)
     
     async def increment_view_count(self, product_id: str) -> int:
         """Increment product view count"""
@@ -197,32 +628,75 @@ class RedisService:
         
         try:
             key = f"views:product:{product_id}"
-            count = self.redis_client.incr(key)
-            # Set expiry of 24 hours if new key
-            if count == 1:
-                self.redis_client.expire(key, 86400)
+            # One MULTI: create the counter with a 24 hour expiry if new, then count
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.set(key, 0, ex=86400, nx=True)
+                pipe.incr(key)
+                _, count = await pipe.execute()
             return count
         except Exception as e:
-            print(f"Redis INCR error: {e}")
+            self._handle_error("INCR", e)
             return 0
     
+    async def get_view_counts(self, product_ids: List[str]) -> Dict[str, int]:
+        """24 hour view counts for many products in one round trip"""
+        if not product_ids:
+            return {}
+        if not self.is_connected():
+            return {product_id: 0 for product_id in product_ids}
+        
+        try:
+            counts = await self.redis_client.mget(
+                [f"views:product:{product_id}" for product_id in product_ids]
+            )
+            return {
+                product_id: int(count) if count else 0
+                for product_id, count in zip(product_ids, counts)
+            }
+        except Exception as e:
+            self._handle_error("MGET", e)
+            return {product_id: 0 for product_id in product_ids}
+    
     async def add_to_search_suggestions(
         self,
         query: str,
         language: str = "en"
     ):
-        """Add search query to suggestions"""
-        if not self.is_connected() or not REDIS_AVAILABLE:
+        """
+        Count a search query towards suggestions
+        
+        search_suggestions:{language} holds every tracked query scored by
+        its count. Each prefix of the query also has a bucket ZSET
+        (search_suggestions:{language}:prefix:{prefix}) holding only its
+        top completions, written with the query's absolute count so bucket
+        rankings always match the global one.
+        
+        One MULTI round trip: ZINTERSTORE copies the query's new count into
+        a one-member scratch ZSET, and ZUNIONSTORE ... AGGREGATE MAX merges
+        it into each bucket server-side, so the count never travels back to
+        the client between the increment and the bucket writes.
+        """
+        query = query.strip().lower()
+        if not query or not self.is_connected() or not REDIS_AVAILABLE:
             return
         
         try:
             key = f"search_suggestions:{language}"
-            # Use sorted set with score being the count
-            self.redis_client.zincrby(key, 1, query.lower())
-            # Keep only top 1000 suggestions
-            self.redis_client.zremrangebyrank(key, 0, -1001)
+            scratch = f"{key}:incr"
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.zincrby(key, 1, query)
+                pipe.zadd(scratch, {query: 0})
+                pipe.zinterstore(scratch, {scratch: 0, key: 1})
+                pipe.zremrangebyrank(key, 0, -settings.SEARCH_SUGGESTIONS_MAX_QUERIES - 1)
+                for prefix in query_prefixes(query, settings.SEARCH_SUGGESTIONS_PREFIX_LENGTH):
+                    bucket = f"{key}:prefix:{prefix}"
+                    pipe.zunionstore(bucket, [bucket, scratch], aggregate="MAX")
+                    pipe.zremrangebyrank(bucket, 0, -settings.SEARCH_SUGGESTIONS_PER_PREFIX - 1)
+                    pipe.expire(bucket, settings.SEARCH_SUGGESTIONS_TTL)
+                pipe.delete(scratch)
+                await pipe.execute()
         except Exception as e:
-            print(f"Redis search suggestion error: {e}")
+            self._handle_error("search suggestion", e)
     
     async def get_search_suggestions(
         self,
@@ -230,22 +704,71 @@ class RedisService:
         language: str = "en",
         limit: int = 5
     ) -> List[str]:
-        """Get search suggestions"""
-        if not self.is_connected() or not REDIS_AVAILABLE:
+        """
+        Most popular tracked queries starting with prefix
+        
+        Served from the in-process SuggestionIndex for the language, which
+        is rebuilt in the background every SEARCH_SUGGESTIONS_REFRESH_INTERVAL
+        seconds from the top SEARCH_SUGGESTIONS_INDEX_QUERIES queries. A
+        fresh index is authoritative, even when it has fewer than limit
+        completions for the prefix: queries outside the indexed top, or
+        added since the last build, show up after the next rebuild. Only
+        while the index is missing or stale is the Redis prefix bucket,
+        which every search updates, read instead. Either way the cost is
+        O(limit), not O(tracked queries).
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
             return []
         
+        index = self._suggestion_indexes.get(language)
+        stale = index is None or index.age > settings.SEARCH_SUGGESTIONS_REFRESH_INTERVAL
+        if stale:
+            self._refresh_suggestion_index(language)
+        local = index.lookup(prefix, limit) if index is not None else []
+        if not stale:
+            return local
+        
+        if not self.is_connected() or not REDIS_AVAILABLE:
+            return local
+        
         try:
-            key = f"search_suggestions:{language}"
-            # Get all suggestions and filter by prefix
-            all_suggestions = self.redis_client.zrevrange(key, 0, -1)
-            matching = [
-                s for s in all_suggestions
-                if s.startswith(prefix.lower())
-            ]
-            return matching[:limit]
+            bucket_prefix = prefix[:settings.SEARCH_SUGGESTIONS_PREFIX_LENGTH]
+            suggestions = await self.redis_client.zrevrange(
+                f"search_suggestions:{language}:prefix:{bucket_prefix}", 0, -1
+            )
+            matching = [s.decode() for s in suggestions]
+            return [s for s in matching if s.startswith(prefix)][:limit]
         except Exception as e:
-            print(f"Redis get suggestions error: {e}")
-            return []
+            self._handle_error("get suggestions", e)
+            return local
+    
+    def _refresh_suggestion_index(self, language: str):
+        """Start rebuilding the language's index unless a rebuild is running"""
+        task = self._suggestion_refreshes.get(language)
+        if (task is None or task.done()) and self.is_connected():
+            self._suggestion_refreshes[language] = asyncio.create_task(
+                self._build_suggestion_index(language)
+            )
+    
+    async def _build_suggestion_index(self, language: str):
+        try:
+            queries = await self.redis_client.zrevrange(
+                f"search_suggestions:{language}",
+                0,
+                settings.SEARCH_SUGGESTIONS_INDEX_QUERIES - 1,
+                withscores=True
+            )
+            queries = [(query.decode(), score) for query, score in queries]
+            # Building touches every prefix of every query; keep it off the event loop
+            self._suggestion_indexes[language] = await asyncio.to_thread(
+                SuggestionIndex,
+                queries,
+                settings.SEARCH_SUGGESTIONS_PER_PREFIX,
+                settings.SEARCH_SUGGESTIONS_PREFIX_LENGTH
+            )
+        except Exception as e:
+            self._handle_error("suggestion index", e)
     
     async def track_user_activity(
         self,
@@ -253,7 +776,7 @@ class RedisService:
         activity_type: str,
         product_id: Optional[str] = None
     ):
-        """Track user activity in real-time"""
+        """Track user activity in real-time and notify activity listeners"""
         if not self.is_connected() or not REDIS_AVAILABLE:
             return
         
@@ -265,18 +788,100 @@ class RedisService:
                 "product_id": product_id,
                 "timestamp": str(datetime.now())
             }
-            self.redis_client.lpush(key, json.dumps(activity))
-            # Keep only last 100 activities
-            self.redis_client.ltrim(key, 0, 99)
-            # Set expiry of 7 days
-            self.redis_client.expire(key, 604800)
+            now = time.time()
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.lpush(key, json.dumps(activity))
+                # Keep only last 100 activities
+                pipe.ltrim(key, 0, 99)
+                # Set expiry of 7 days
+                pipe.expire(key, 604800)
+                # Last activity time per user, for batch jobs over active users
+                pipe.zadd(self.ACTIVE_USERS_KEY, {user_id: now})
+                pipe.zremrangebyscore(self.ACTIVE_USERS_KEY, "-inf", now - 604800)
+                await pipe.execute()
+        except Exception as e:
+            self._handle_error("activity tracking", e)
+            return
+        
+        for listener in self._activity_listeners:
+            try:
+                listener(user_id, activity)
+            except Exception as e:
+                print(f"[WARNING] Activity listener failed: {e}")
+    
+    async def allow_event(self, key: str, limit: int, window: int = 60) -> bool:
+        """
+        Fixed-window rate limit shared by every worker
+        
+        Args:
+            key: What is limited (e.g. a user ID)
+            limit: Events allowed per window
+            window: Window length in seconds
+            
+        Returns:
+            False once limit events were counted in the current window;
+            True when Redis is unavailable (fails open)
+        """
+        if not self.is_connected():
+            return True
+        
+        counter = f"ratelimit:{key}:{int(time.time() // window)}"
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.incr(counter)
+                pipe.expire(counter, window)
+                count, _ = await pipe.execute()
+            return count <= limit
+        except Exception as e:
+            self._handle_error("rate limit", e)
+            return True
+    
+    def add_activity_listener(self, listener: Callable[[str, Dict], None]):
+        """Register a callback for tracked activity (e.g. homepage refresh)"""
+        self._activity_listeners.append(listener)
+    
+    async def get_active_users(self, window: int = 604800) -> List[str]:
+        """
+        Users with tracked activity in the last window seconds
+        
+        Args:
+            window: Seconds to look back
+            
+        Returns:
+            User IDs, most recently active first
+        """
+        if not self.is_connected():
+            return []
+        
+        try:
+            user_ids = await self.redis_client.zrevrangebyscore(
+                self.ACTIVE_USERS_KEY, "+inf", time.time() - window
+            )
+            return [u.decode() if isinstance(u, bytes) else u for u in user_ids]
         except Exception as e:
-            print(f"Redis activity tracking error: {e}")
+            self._handle_error("ZREVRANGEBYSCORE", e)
+            return []
     
-    def close(self):
-        """Close Redis connection"""
-        if self.redis_client:
-            self.redis_client.close()
+    async def close(self):
+        """Stop background tasks and close the connection pool"""
+        for task in (
+            self._health_task,
+            self._invalidation_task,
+            *self._inflight.values(),
+            *self._suggestion_refreshes.values()
+        ):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._health_task = None
+        self._invalidation_task = None
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+            await self.redis_client.connection_pool.disconnect()
+        self._healthy = False
 
 
 # Global instance
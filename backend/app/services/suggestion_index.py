@@ -0,0 +1,65 @@
+"""
+Suggestion Index
+In-process autocomplete index over the most popular search queries
+"""
+import time
+from typing import Dict, Iterable, List, Tuple
+
+
+def query_prefixes(query: str, max_length: int) -> List[str]:
+    """Every prefix of query up to max_length characters, shortest first"""
+    return [query[:i] for i in range(1, min(len(query), max_length) + 1)]
+
+
+class SuggestionIndex:
+    """
+    Flattened trie of search queries with precomputed completions
+
+    Each prefix (up to max_prefix_length characters) maps straight to its
+    top completions in popularity order, so a lookup is one dict access
+    plus copying at most per_prefix items, whatever the number of
+    queries. Prefixes longer than max_prefix_length are answered by
+    filtering the completions of their first max_prefix_length characters.
+    Immutable once built; refresh by building a new one.
+    """
+
+    def __init__(
+        self,
+        queries: Iterable[Tuple[str, float]],
+        per_prefix: int = 10,
+        max_prefix_length: int = 20
+    ):
+        """
+        Args:
+            queries: (query, popularity) pairs, most popular first
+            per_prefix: Completions kept for each prefix
+            max_prefix_length: Longest prefix indexed directly
+        """
+        self.per_prefix = per_prefix
+        self.max_prefix_length = max_prefix_length
+        self.built_at = time.monotonic()
+        self._completions: Dict[str, List[str]] = {}
+
+        # Queries arrive in popularity order, so the first per_prefix
+        # completions seen for a prefix are its top per_prefix
+        for query, _ in queries:
+            for prefix in query_prefixes(query, max_prefix_length):
+                completions = self._completions.setdefault(prefix, [])
+                if len(completions) < per_prefix:
+                    completions.append(query)
+
+    def __len__(self) -> int:
+        return len(self._completions)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the index was built"""
+        return time.monotonic() - self.built_at
+
+    def lookup(self, prefix: str, limit: int = 5) -> List[str]:
+        """Most popular queries starting with prefix"""
+        if len(prefix) <= self.max_prefix_length:
+            return self._completions.get(prefix, [])[:limit]
+
+        completions = self._completions.get(prefix[:self.max_prefix_length], [])
+        return [query for query in completions if query.startswith(prefix)][:limit]
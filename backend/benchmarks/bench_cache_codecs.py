@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: JSON vs packed vs packed+zlib cache payloads
+Run from the backend directory: python benchmarks/bench_cache_codecs.py
+"""
+import json
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.data.mock_database import mock_db
+from app.services.cache_codecs import CompressedCodec, PackedCodec, decode_payload
+
+
+class LegacyJson:
+    """What RedisService.set/get did before codecs"""
+
+    def encode(self, value):
+        return json.dumps(value)
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+def recommendations(n: int):
+    return [
+        {"product_id": f"prod_{random.randrange(100_000):06d}", "score": random.random(), "algorithm": "hybrid"}
+        for _ in range(n)
+    ]
+
+
+def check_round_trips(codecs):
+    """Edge cases every codec must decode back unchanged"""
+    records = recommendations(3)
+    cases = [
+        records,
+        {"": records, "total": 3},
+        {"": records, "other": records},
+        {"value": [], "expires_at": 1.0},
+        [{"a": 1}, {"b": 2}],
+        {"nested": {"value": records}}
+    ]
+    for codec_name, codec in codecs.items():
+        for value in cases:
+            assert decode_payload(codec.encode(value)) == value, (codec_name, value)
+
+
+def best_of(stmt, number: int = 2000, repeat: int = 5) -> float:
+    """Best per-call time in microseconds"""
+    return min(timeit.repeat(stmt, number=number, repeat=repeat)) / number * 1e6
+
+
+def main():
+    random.seed(42)
+    payloads = {
+        "10 recs": recommendations(10),
+        "50 recs": recommendations(50),
+        "50 recs envelope": {"value": recommendations(50), "expires_at": time.time(), "delta": 0.01},
+        "similar (20)": [
+            {"product_id": f"prod_{i:03d}", "similarity": random.random()} for i in range(20)
+        ],
+        "trending products": mock_db.get_trending_products(limit=50)
+    }
+    codecs = {
+        "json": LegacyJson(),
+        "packed": PackedCodec(),
+        "packed+zlib": CompressedCodec(PackedCodec(), threshold=1024)
+    }
+
+    check_round_trips(codecs)
+
+    print("\n" + "=" * 72)
+    print("CACHE CODEC BENCHMARK")
+    print("=" * 72)
+    print(f"{'payload':<20} {'codec':<12} {'bytes':>8} {'encode us':>10} {'decode us':>10}")
+
+    for name, value in payloads.items():
+        for codec_name, codec in codecs.items():
+            data = codec.encode(value)
+            assert decode_payload(data) == value
+            encode = best_of(lambda: codec.encode(value))
+            decode = best_of(lambda: codec.decode(data))
+            print(f"{name:<20} {codec_name:<12} {len(data):>8,} {encode:>10.1f} {decode:>10.1f}")
+        print()
+
+    print("=" * 72 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: event-loop stalls from inline inference vs InferenceExecutor
+Run from the backend directory: python benchmarks/bench_inference.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.ml.topk import top_k
+from app.services.inference_executor import InferenceExecutor, InferenceOverloaded
+
+N_ITEMS = 200_000
+N_FACTORS = 64
+N_REQUESTS = 64
+
+
+def make_scorer():
+    """Dense dot-product scoring + top-k, like MatrixFactorizationEngine.recommend"""
+    rng = np.random.default_rng(42)
+    item_factors = rng.standard_normal((N_ITEMS, N_FACTORS), dtype=np.float32)
+    user_factors = rng.standard_normal((1000, N_FACTORS), dtype=np.float32)
+
+    def recommend(user_idx: int, n: int = 50):
+        scores = np.dot(user_factors[user_idx], item_factors.T)
+        return top_k(scores, n)
+
+    return recommend
+
+
+async def heartbeat(lags: list, stop: asyncio.Event, interval: float = 0.001):
+    """Record how late each 1ms tick fires (event loop responsiveness)"""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - expected)
+
+
+async def run(label: str, call):
+    lags = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(0.01)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(i) for i in range(N_REQUESTS)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+
+    rejected = sum(isinstance(r, InferenceOverloaded) for r in results)
+    lags_ms = np.array(lags) * 1000
+    print(
+        f"{label:<28} {elapsed * 1000:>9.1f} {N_REQUESTS / elapsed:>9.1f} "
+        f"{np.percentile(lags_ms, 99):>9.2f} {lags_ms.max():>9.2f} {rejected:>9}"
+    )
+
+
+async def main():
+    recommend = make_scorer()
+
+    print("\n" + "=" * 80)
+    print(f"INFERENCE OFFLOAD BENCHMARK ({N_REQUESTS} concurrent requests, {N_ITEMS:,} items)")
+    print("=" * 80)
+    print(f"{'mode':<28} {'total ms':>9} {'req/s':>9} {'p99 lag':>9} {'max lag':>9} {'rejected':>9}")
+
+    async def inline(i):
+        return recommend(i)
+
+    await run("inline (event loop)", inline)
+
+    for workers in (1, 2, 4):
+        executor = InferenceExecutor(max_workers=workers, max_queue=N_REQUESTS)
+        await run(f"executor, {workers} workers", lambda i: executor.run(recommend, i))
+        executor.shutdown()
+
+    executor = InferenceExecutor(max_workers=4, max_queue=16)
+    await run("executor, 4 workers, queue 16", lambda i: executor.run(recommend, i))
+    print(f"\nstats: {executor.stats()}")
+    executor.shutdown()
+    print("(lag = how late a 1ms event-loop tick fired while requests were served)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
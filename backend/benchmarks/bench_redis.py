@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: blocking redis client with PING-per-call vs pooled redis.asyncio
+Run from the backend directory: python benchmarks/bench_redis.py
+
+Uses a real Redis when REDIS_URL is set, otherwise a fakeredis TCP server
+on localhost so requests still pay socket round-trips.
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.redis_service import RedisService
+
+N_REQUESTS = 2000
+CONCURRENCY = [1, 16, 64]
+KEY = "recommendations:user:user_001:hybrid"
+VALUE = [{"product_id": f"prod_{i:03d}", "score": 1.0 / (i + 1)} for i in range(20)]
+
+
+class LegacyRedisCache:
+    """The previous RedisService.get: sync client, PING before every GET"""
+
+    def __init__(self, url: str):
+        self.redis_client = redis.from_url(url, decode_responses=True)
+
+    def is_connected(self) -> bool:
+        try:
+            self.redis_client.ping()
+            return True
+        except Exception:
+            return False
+
+    async def get(self, key: str):
+        if not self.is_connected():
+            return None
+        value = self.redis_client.get(key)
+        return json.loads(value) if value else None
+
+
+def start_fake_server() -> str:
+    """fakeredis TCP server on a free local port"""
+    from fakeredis import TcpFakeServer
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}"
+
+
+async def run(cache, concurrency: int):
+    """
+    Issue N_REQUESTS gets with at most `concurrency` in flight
+
+    A 1 ms heartbeat task measures how long the event loop is stalled:
+    that is the delay every other request on the worker would see.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    stalls = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - start - 0.001)
+
+    async def request():
+        async with semaphore:
+            await cache.get(KEY)
+
+    monitor = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(N_REQUESTS)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await monitor
+
+    stalls = np.array(stalls) * 1000
+    return N_REQUESTS / elapsed, np.percentile(stalls, 99), stalls.max()
+
+
+async def main():
+    url = os.environ.get("REDIS_URL") or start_fake_server()
+
+    legacy = LegacyRedisCache(url)
+    legacy.redis_client.set(KEY, json.dumps(VALUE))
+
+    service = RedisService(aioredis.from_url(url, max_connections=64))
+    await service.check_health()
+
+    print("\n" + "=" * 60)
+    print(f"REDIS CACHE GET BENCHMARK ({N_REQUESTS} requests, {url})")
+    print("=" * 60)
+    print(f"{'client':<10} {'in flight':>9} {'req/s':>9} {'loop stall p99 ms':>18} {'max ms':>8}")
+
+    for concurrency in CONCURRENCY:
+        for name, cache in (("legacy", legacy), ("async", service)):
+            await run(cache, concurrency)  # warm up connections
+            throughput, stall_p99, stall_max = await run(cache, concurrency)
+            print(f"{name:<10} {concurrency:>9} {throughput:>9,.0f} {stall_p99:>18.2f} {stall_max:>8.2f}")
+
+    print("=" * 60 + "\n")
+    await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: full argsort vs argpartition top-k
+Run from the backend directory: python benchmarks/bench_topk.py
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.ml.topk import top_k
+
+K = 10
+SIZES = [10_000, 100_000, 1_000_000]
+BATCH_ROWS = 64
+
+
+def best_of(stmt, number: int, repeat: int = 5) -> float:
+    """Best per-call time in milliseconds"""
+    return min(timeit.repeat(stmt, number=number, repeat=repeat)) / number * 1000
+
+
+def main():
+    rng = np.random.default_rng(42)
+
+    print("\n" + "=" * 60)
+    print(f"TOP-{K} SELECTION BENCHMARK")
+    print("=" * 60)
+    print(f"{'items':>10} {'argsort ms':>12} {'top_k ms':>10} {'speedup':>9}")
+
+    for n_items in SIZES:
+        scores = rng.random(n_items, dtype=np.float32)
+        number = max(1, 2_000_000 // n_items)
+        full = best_of(lambda: np.argsort(scores)[::-1][:K], number)
+        partial = best_of(lambda: top_k(scores, K), number)
+        print(f"{n_items:>10,} {full:>12.3f} {partial:>10.3f} {full / partial:>8.1f}x")
+
+    print(f"\nBatched ({BATCH_ROWS} rows per call)")
+    print(f"{'items':>10} {'argsort ms':>12} {'top_k ms':>10} {'speedup':>9}")
+
+    for n_items in SIZES[:2]:
+        scores = rng.random((BATCH_ROWS, n_items), dtype=np.float32)
+        number = max(1, 200_000 // n_items)
+        full = best_of(lambda: np.argsort(-scores, axis=1)[:, :K], number)
+        partial = best_of(lambda: top_k(scores, K), number)
+        print(f"{n_items:>10,} {full:>12.3f} {partial:>10.3f} {full / partial:>8.1f}x")
+
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    main()